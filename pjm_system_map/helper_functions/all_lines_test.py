@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# functions uses relative imports, run from pjm_system_map
+from helper_functions.functions import PJMSystemMap
+from helper_functions.synthetic import generateSystemMap
+from helper_functions.geodesy import getGeodesicLengths, KM_PER_MILE
+
+
+class AllLinesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        generateSystemMap(self.temporary.name, scale=1, seed=0)
+        self.cache_directory = os.path.join(self.temporary.name, "cache_data")
+        os.makedirs(self.cache_directory)
+        directories = {"SYSTEM_MAP_DATA_DIRECTORY": os.path.join(self.temporary.name, "pjm_system_map_export"),
+                       "CACHE_DATA_DIRECTORY": self.cache_directory}
+        self.system_map = PJMSystemMap(load=False, directories=directories)
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def loadAllLines(self):
+        system_map = self.system_map
+        system_map.pjm_zones = system_map.loadPJMZones()
+        system_map.all_substations_and_taps = system_map.loadAllSubstationsAndTaps()
+        system_map.buildIdIndexes()
+        system_map.all_substation_labels = system_map.loadAllSubstationLabels()
+        system_map.yards = system_map.loadYards()
+        system_map.all_lines = system_map.loadAllLines()
+        return system_map.all_lines
+
+    def testMissingExports(self):
+        # lower voltage layers are skipped, other layers are required
+        lines = self.system_map.makeGeoDataFrame("all_lines", self.system_map.OPTIONAL_EXPORTS)
+        self.assertEqual(lines.shape[0], 0)
+        os.remove(os.path.join(self.system_map.SYSTEM_MAP_DATA_DIRECTORY, "non_member_backbone_lines.json"))
+        with self.assertRaises(FileNotFoundError):
+            self.system_map.makeGeoDataFrame("all_lines", self.system_map.FILE_NAME["all_lines"])
+
+    def testLineLength(self):
+        lines = self.loadAllLines()
+        # lengths of all lines are geodesic, also where they were published
+        published = lines["published_length_km"].notnull()
+        self.assertTrue(published.any() and not published.all())
+        np.testing.assert_allclose(lines["LENGTH_KM"],
+                                   getGeodesicLengths(lines.geometry, self.system_map.SYSTEM_MAP_CRS) / 1000)
+        np.testing.assert_allclose(lines["MILES"], lines["LENGTH_KM"] / KM_PER_MILE)
+
+    def testLineRatings(self):
+        lines = self.loadAllLines()
+        self.assertGreater(lines.shape[0], self.system_map.loadPJMBackboneLines().shape[0])
+
+        # equiplist lines of two map lines at 345 kV only, so choices run out
+        # at 345 kV and there are none at other voltages
+        names = self.system_map.getSubstationEntities().getEndpointAttributes(lines, ["label_name"])
+        names = (names["label_name_SUBSTATION_A"] + " " + names["label_name_SUBSTATION_B"]).str.upper()
+        matched = names[(lines["VOLTAGE"] == 345) & names.notnull()].index[:2]
+        self.assertEqual(len(matched), 2)
+        pd.DataFrame({"VOLTAGE": 345.0, "cleaned_long_name": names[matched].values, "day_normal": [1500.0, 1600.0]}).to_pickle(
+            os.path.join(self.cache_directory, "line_equiplist_rating_subs.pkl"))
+
+        rated = self.system_map.getLineRatings(lines)
+        self.assertEqual(rated.shape[0], lines.shape[0])
+        self.assertEqual(list(rated.loc[matched, "line_rating"]), [1500.0, 1600.0])
+        others = rated.drop(index=matched)
+        self.assertTrue((others.loc[others["VOLTAGE"] == 345, "line_rating"] == 1250.0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+Benchmark of the PJMSystemMap pipeline on synthetic exports.
+
+Synthetic exports of each scale (see synthetic.py) are loaded stage by
+stage with profiling on, followed by the matching and graph algorithms.
+Results are tagged with the git commit and can be appended to a history
+csv, so the scaling of each stage can be compared across commits.
+
+Run from pjm_system_map, e.g.
+
+    python -m helper_functions.benchmark --scales 1 10 100 --history benchmark.csv
+"""
+
+import os
+import sys
+import argparse
+import datetime
+import tempfile
+
+import pandas as pd
+
+from .functions import PJMSystemMap
+from .dfs import DFSGraph
+from .profiling import StageProfiler, getGitCommit
+from .branch_resolver import parseEquipListBranches
+from .synthetic import generateSystemMap
+
+
+SCALES = [1, 10, 100]
+ALGORITHMS = ["dfs", "branch_resolver", "pnode_matching"]
+# pnode matching compares every pnode with every label in pure python,
+# larger scales take hours and are only run if asked for
+PNODE_MATCHING_MAX_SCALE = 10
+
+
+def loadSystemMap(system_map):
+    """
+    load layers of system_map one by one, in the order of the constructor.
+        planning queue, states, pnode list and EIA data depend on files
+        that are not generated and are skipped.
+    """
+    system_map.pjm_zones = system_map.loadPJMZones()
+    system_map.all_substations_and_taps = system_map.loadAllSubstationsAndTaps()
+    system_map.buildIdIndexes()
+    system_map.all_substation_labels = system_map.loadAllSubstationLabels()
+    system_map.pjm_backbone_lines = system_map.loadPJMBackboneLines()
+    system_map.yards = system_map.loadYards()
+    system_map.all_lines = system_map.loadAllLines()
+
+
+def runAlgorithm(system_map, algorithm, pnode_list):
+    """
+    run an algorithm on the loaded system_map as a profiled stage
+    """
+    profiler = system_map.profiler
+    lines = system_map.all_lines
+
+    if algorithm == "dfs":
+        connected = lines[lines["SUBSTATION_A_GLOBALID"].notnull() & lines["SUBSTATION_B_GLOBALID"].notnull()]
+        with profiler.stage("DFSGraph.getConnectedComponents", rows_in=connected.shape[0]) as record:
+            graph = DFSGraph()
+            for a, b in zip(connected["SUBSTATION_A_GLOBALID"], connected["SUBSTATION_B_GLOBALID"]):
+                graph.addEdge(a, b)
+            record["rows_out"] = len(graph.getConnectedComponents())
+
+    elif algorithm == "branch_resolver":
+        with profiler.stage("getBranchResolver", rows_in=lines.shape[0]) as record:
+            resolver = system_map.getBranchResolver(lines)
+            record["rows_out"] = len(resolver.element_ids)
+        equiplist = system_map.loadOasisEquipList("LINE")
+        elements = parseEquipListBranches(equiplist)
+        elements["voltage"] = equiplist["VOLTAGE"]
+        with profiler.stage("BranchResolver.resolveMany", rows_in=elements.shape[0]) as record:
+            record["rows_out"] = resolver.resolveMany(elements).shape[0]
+
+    elif algorithm == "pnode_matching":
+        system_map.matchPnodeWithMapSubstations(pnode_list, use_cache=False)
+
+    else:
+        raise(ValueError("Unknown algorithm: {}".format(algorithm)))
+
+
+def runScale(scale, directory, algorithms=ALGORITHMS, seed=0, trace_memory=False, full=False):
+    """
+    generate exports of a given scale in directory and profile loading them
+        and running algorithms on them.
+
+    a failing stage is recorded with its error. return DataFrame of stages.
+    """
+    generated = generateSystemMap(directory, scale=scale, seed=seed)
+    directories = {"SYSTEM_MAP_DATA_DIRECTORY": os.path.join(directory, "pjm_system_map_export"),
+                   "OASIS_DATA_DIRECTORY": os.path.join(directory, "oasis"),
+                   "CACHE_DATA_DIRECTORY": os.path.join(directory, "cache_data")}
+    system_map = PJMSystemMap(directories=directories, load=False)
+    system_map.profiler = StageProfiler(trace_memory=trace_memory)
+
+    try:
+        loadSystemMap(system_map)
+        for algorithm in algorithms:
+            if algorithm == "pnode_matching" and scale > PNODE_MATCHING_MAX_SCALE and not full:
+                continue
+            try:
+                runAlgorithm(system_map, algorithm, generated["pnode_list"])
+            except Exception as e:
+                print("{} failed at scale {}: {}".format(algorithm, scale, e))
+    except Exception as e:
+        print("loading failed at scale {}: {}".format(scale, e))
+
+    report = system_map.profiler.report()
+    report.insert(0, "scale", scale)
+    return report
+
+
+def runBenchmark(scales=SCALES, algorithms=ALGORITHMS, directory=None, seed=0, trace_memory=False,
+                 full=False, history=None):
+    """
+    run benchmark at each scale. exports are generated in directory, or in
+        a temporary directory if None.
+
+    if history, results are appended to that csv. return DataFrame of
+        stages of all scales, tagged with commit and time.
+    """
+    commit = getGitCommit()
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            scale_directory = os.path.join(directory or tmp, "scale_{}".format(scale))
+            results.append(runScale(scale, scale_directory, algorithms=algorithms, seed=seed,
+                                    trace_memory=trace_memory, full=full))
+    results = pd.concat(results, ignore_index=True)
+    results.insert(0, "commit", commit)
+    results.insert(1, "timestamp", timestamp)
+
+    if history is not None:
+        results.to_csv(history, mode="a", index=False, header=not os.path.exists(history))
+    return results
+
+
+def compareCommits(history, base, head, metric="wall_s"):
+    """
+    compare a metric of stages between two commits in a history csv, using
+        the latest run of each commit.
+
+    return DataFrame indexed by stage and scale with base, head and ratio.
+    """
+    history = pd.read_csv(history)
+    values = {}
+    for commit in [base, head]:
+        runs = history[history["commit"] == commit]
+        if runs.shape[0] == 0:
+            raise(ValueError("Commit not in history: {}".format(commit)))
+        runs = runs[runs["timestamp"] == runs["timestamp"].max()]
+        values[commit] = runs.groupby(["stage", "scale"])[metric].sum()
+
+    comparison = pd.DataFrame({"base": values[base], "head": values[head]})
+    comparison["ratio"] = comparison["head"] / comparison["base"]
+    return comparison.sort_values("ratio", ascending=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PJMSystemMap on synthetic exports.")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--algorithms", nargs="*", default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument("--directory", help="directory of generated exports, temporary if not given")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="trace peak memory, slows down stages")
+    parser.add_argument("--full", action="store_true",
+                        help="run pnode matching above scale {}".format(PNODE_MATCHING_MAX_SCALE))
+    parser.add_argument("--history", help="csv to append results to")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"),
+                        help="compare two commits in the history instead of running")
+    args = parser.parse_args(argv)
+
+    pd.set_option("display.width", 200)
+    if args.compare:
+        if args.history is None:
+            parser.error("--compare requires --history")
+        print(compareCommits(args.history, *args.compare))
+        return
+
+    results = runBenchmark(args.scales, args.algorithms, directory=args.directory, seed=args.seed,
+                           trace_memory=args.trace_memory, full=args.full, history=args.history)
+    columns = ["scale", "stage", "depth", "wall_s", "cpu_s", "peak_mb", "rows_in", "rows_out", "error"]
+    print(results[columns].to_string(index=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Resolve contingency elements to system map lines and equiplist entries.
+
+Every branch is indexed on its (station, station, voltage) triple. Lookups
+first try the exact and then the normalized form of the triple in hash maps,
+and only the residuals are fuzzy matched, one batch per voltage level.
+"""
+
+import re
+from collections import defaultdict
+
+import pandas as pd
+from fuzzywuzzy import fuzz, process
+
+
+# equiplist station names are truncated to 8 characters
+STATION_NAME_LENGTH = 8
+
+
+def exactStationName(name):
+    """
+    exact form of a station name: upper case with collapsed white space.
+    """
+    if not isinstance(name, str):
+        return None
+    return re.sub(r"\s+", " ", name.strip().upper())
+
+
+def normalizeStationName(name):
+    """
+    normalized form of a station name: upper case alphanumerics only,
+        truncated to the equiplist station name length.
+    """
+    if not isinstance(name, str):
+        return None
+    name = re.sub(r"[^A-Z0-9]", "", name.upper())
+    return name[:STATION_NAME_LENGTH] if name else None
+
+
+def branchKey(station_a, station_b, voltage, normalize):
+    """
+    key of a branch. station order is irrelevant, so stations are sorted.
+    """
+    form = normalizeStationName if normalize else exactStationName
+    a = form(station_a)
+    b = form(station_b)
+    if a is None or b is None or pd.isnull(voltage):
+        return None
+    a, b = sorted([a, b])
+    return (a, b, float(voltage))
+
+
+def parseEquipListBranches(equiplist):
+    """
+    get both end stations of equiplist entries.
+
+    lines carry both stations in the LONG NAME, e.g. "ABSECON-CARDIFF 0781".
+    transformers connect the station with itself.
+    """
+    stations = equiplist["LONG NAME"].str.extract(r"^\s*([^-]+?)\s*-\s*([^\s-]+)")
+    stations.columns = ["station_a", "station_b"]
+    is_xfmr = (equiplist["TYPE"] == "XFMR").values
+    stations.loc[is_xfmr, "station_a"] = equiplist.loc[is_xfmr, "STATION"]
+    stations.loc[is_xfmr, "station_b"] = equiplist.loc[is_xfmr, "STATION"]
+    return stations
+
+
+def equipListElementIds(equiplist):
+    """
+    stable element ids for equiplist entries: type, company, station, voltage and name.
+    """
+    voltage = equiplist["VOLTAGE"].map(lambda x: "{:g}".format(x))
+    return (equiplist["TYPE"].astype(str) + ":" + equiplist["COMPANY"].astype(str) + ":" +
+            equiplist["STATION"].astype(str).str.strip() + ":" + voltage + ":" +
+            equiplist["NAME"].astype(str).str.strip())
+
+
+def parseContingencyBranches(names):
+    """
+    parse contingency line names such as "L345.BRANDONS-DOUBS" into
+        stations and voltage.
+    """
+    parsed = pd.Series(names).str.extract(r"^L(\d+)\.\s*([^-]+?)\s*-\s*(.+?)\s*$")
+    parsed.columns = ["voltage", "station_a", "station_b"]
+    parsed["voltage"] = parsed["voltage"].astype(float)
+    return parsed[["station_a", "station_b", "voltage"]]
+
+
+class BranchResolver:
+    """
+    index over (station, station, voltage) triples of branches.
+    """
+
+    def __init__(self, fuzzy_threshold=85):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.element_ids = []
+        self.sources = []
+        self.names = []
+        self.exact_index = defaultdict(list)
+        self.normalized_index = defaultdict(list)
+        # fuzzy choices per voltage level, built lazily
+        self.voltage_elements = defaultdict(list)
+        self.fuzzy_choices = {}
+
+
+    def addElements(self, element_ids, stations_a, stations_b, voltages, source):
+        """
+        add branches to the index. entries without both stations or voltage are skipped.
+        """
+        for element_id, a, b, v in zip(element_ids, stations_a, stations_b, voltages):
+            exact_key = branchKey(a, b, v, normalize=False)
+            normalized_key = branchKey(a, b, v, normalize=True)
+            if exact_key is None or normalized_key is None:
+                continue
+
+            position = len(self.element_ids)
+            self.element_ids.append(element_id)
+            self.sources.append(source)
+            self.names.append(normalized_key[0] + " " + normalized_key[1])
+            self.exact_index[exact_key].append(position)
+            self.normalized_index[normalized_key].append(position)
+            self.voltage_elements[normalized_key[2]].append(position)
+
+        # invalidate fuzzy choices
+        self.fuzzy_choices = {}
+
+
+    def getFuzzyChoices(self, voltage):
+        """
+        get fuzzy match choices of a voltage level as {choice name: [positions]}
+        """
+        if voltage not in self.fuzzy_choices:
+            choices = defaultdict(list)
+            for position in self.voltage_elements.get(voltage, []):
+                choices[self.names[position]].append(position)
+            self.fuzzy_choices[voltage] = dict(choices)
+        return self.fuzzy_choices[voltage]
+
+
+    def resolve(self, station_a, station_b, voltage):
+        """
+        resolve a single branch. return list of (element_id, match_type, match_score).
+        """
+        elements = pd.DataFrame({"station_a": [station_a], "station_b": [station_b], "voltage": [voltage]})
+        matches = self.resolveMany(elements)
+        return list(zip(matches.element_id, matches.match_type, matches.match_score))
+
+
+    def resolveMany(self, elements):
+        """
+        resolve branches in a dataframe with columns station_a, station_b and voltage.
+
+        return one row per matched element, with the index of the input element,
+            element id, source, match type (exact, normalized or fuzzy) and match score.
+        parallel circuits between the same stations all match.
+        """
+        result = {"element_index": [], "element_id": [], "source": [], "match_type": [], "match_score": []}
+
+        def record(index, positions, match_type, score):
+            for p in positions:
+                result["element_index"].append(index)
+                result["element_id"].append(self.element_ids[p])
+                result["source"].append(self.sources[p])
+                result["match_type"].append(match_type)
+                result["match_score"].append(score)
+
+        # exact and normalized lookups
+        residuals = defaultdict(list)
+        for index, a, b, v in zip(elements.index, elements["station_a"], elements["station_b"], elements["voltage"]):
+            exact_key = branchKey(a, b, v, normalize=False)
+            if exact_key in self.exact_index:
+                record(index, self.exact_index[exact_key], "exact", 100)
+                continue
+
+            normalized_key = branchKey(a, b, v, normalize=True)
+            if normalized_key is None:
+                continue
+            if normalized_key in self.normalized_index:
+                record(index, self.normalized_index[normalized_key], "normalized", 100)
+                continue
+
+            residuals[normalized_key[2]].append((index, normalized_key[0] + " " + normalized_key[1]))
+
+        # fuzzy match residuals, batched by voltage level
+        for voltage, queries in residuals.items():
+            choices = self.getFuzzyChoices(voltage)
+            if len(choices) == 0:
+                continue
+            choice_names = list(choices)
+            for index, name in queries:
+                match = process.extractOne(name, choice_names, scorer=fuzz.token_sort_ratio,
+                                           score_cutoff=self.fuzzy_threshold)
+                if match is not None:
+                    record(index, choices[match[0]], "fuzzy", match[1])
+
+        return pd.DataFrame(result)
@@ -0,0 +1,66 @@
+import unittest
+
+import pandas as pd
+
+from branch_resolver import BranchResolver, parseEquipListBranches, parseContingencyBranches, normalizeStationName
+
+
+class BranchResolverTest(unittest.TestCase):
+
+    def makeResolver(self):
+        resolver = BranchResolver()
+        resolver.addElements(["{LINE-1}", "{LINE-2}", "{LINE-3}"],
+                             ["Brandon Shores", "Doubs", "Doubs"],
+                             ["Waugh Chapel", "Mount Storm", "Mount Storm"],
+                             [500.0, 500.0, 500.0], source="system_map")
+        return resolver
+
+    def testNormalizeStationName(self):
+        self.assertEqual(normalizeStationName("Brandon Shores"), "BRANDONS")
+        self.assertEqual(normalizeStationName("cape may"), "CAPEMAY")
+        self.assertIsNone(normalizeStationName(float("nan")))
+
+    def testExactMatch(self):
+        resolver = self.makeResolver()
+        matches = resolver.resolve("BRANDON SHORES", "WAUGH CHAPEL", 500.0)
+        self.assertEqual(matches, [("{LINE-1}", "exact", 100)])
+
+    def testNormalizedMatchIgnoresOrder(self):
+        resolver = self.makeResolver()
+        matches = resolver.resolve("WAUGHCHA", "BRANDONS", 500.0)
+        self.assertEqual(matches, [("{LINE-1}", "normalized", 100)])
+
+    def testParallelCircuits(self):
+        resolver = self.makeResolver()
+        matches = resolver.resolve("Mount Storm", "Doubs", 500.0)
+        self.assertEqual(sorted(m[0] for m in matches), ["{LINE-2}", "{LINE-3}"])
+
+    def testVoltageMustMatch(self):
+        resolver = self.makeResolver()
+        self.assertEqual(resolver.resolve("Doubs", "Mount Storm", 230.0), [])
+
+    def testFuzzyMatch(self):
+        resolver = self.makeResolver()
+        matches = resolver.resolve("Brandn Shores", "Waugh Chapel", 500.0)
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0][0], "{LINE-1}")
+        self.assertEqual(matches[0][1], "fuzzy")
+
+    def testResolveMany(self):
+        resolver = self.makeResolver()
+        elements = parseContingencyBranches(["L500.BRANDONS-WAUGHCHA", "L500.DOUBS-MTSTORM", "L230.NOWHERE-NOPE"])
+        matches = resolver.resolveMany(elements)
+        self.assertEqual(matches[matches.element_index == 0].element_id.to_list(), ["{LINE-1}"])
+        self.assertNotIn(2, matches.element_index.to_list())
+
+    def testParseEquipListBranches(self):
+        equiplist = pd.DataFrame({"TYPE": ["LINE", "XFMR"],
+                                  "STATION": ["CAPEMAY", "CARDIFF"],
+                                  "LONG NAME": ["CAPE MAY- RIOGRAND5 0735-3", "CARDIFF TRAN 1"]})
+        stations = parseEquipListBranches(equiplist)
+        self.assertEqual(stations.station_a.to_list(), ["CAPE MAY", "CARDIFF"])
+        self.assertEqual(stations.station_b.to_list(), ["RIOGRAND5", "CARDIFF"])
+
+
+if __name__ == '__main__':
+    unittest.main()
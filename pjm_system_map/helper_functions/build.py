@@ -0,0 +1,465 @@
+"""
+Headless build of the cleaned model into versioned artifacts.
+
+Layers are loaded in dependency order, independent layers and artifacts in
+parallel worker processes. Each build is written to its own version
+directory under the output directory, with a manifest of inputs, stage
+timings and artifact checksums; LATEST names the last successful build.
+
+Builds are incremental. Every layer and artifact has a fingerprint of the
+digests of its input files, the fingerprints of the layers it depends on
+and the code commit. Stages whose fingerprint is unchanged since the
+latest build are reused from it, so republishing one export only rebuilds
+what depends on it. The planning queue is matched row by row, so a queue
+refresh only matches new or moved projects.
+
+Run from pjm_system_map, e.g.
+
+    python -m helper_functions.build --input /data/pjm --output /data/builds --jobs 4
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import datetime
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .functions import PJMSystemMap
+from .profiling import StageProfiler, getGitCommit
+
+
+# input directories relative to --input, by PJMSystemMap attribute
+INPUT_LAYOUT = {
+    "SYSTEM_MAP_DATA_DIRECTORY": "pjm_system_map_export",
+    "OTHER_DATA_DIRECTORY": "pjm_other_data",
+    "CACHE_DATA_DIRECTORY": "cache_data",
+    "DATA_DIRECTORY": "data",
+    "OASIS_DATA_DIRECTORY": os.path.join("data", "oasis")
+}
+
+
+def exportFiles(*names):
+    "input files of system map exports, by FILE_NAME key"
+    return [("SYSTEM_MAP_DATA_DIRECTORY", x + ".json") for name in names for x in PJMSystemMap.FILE_NAME[name]]
+
+
+# layer: (loader, layers it depends on, input files)
+LAYERS = {
+    "pjm_zones": ("loadPJMZones", [], exportFiles("pjm_zones")),
+    "all_substations_and_taps": ("loadAllSubstationsAndTaps", ["pjm_zones"], exportFiles("all_substations", "taps")),
+    "all_substation_labels": ("loadAllSubstationLabels", ["pjm_zones"], exportFiles("all_substation_labels")),
+    "pjm_backbone_lines": ("loadPJMBackboneLines", ["all_substations_and_taps"], exportFiles("pjm_backbone_lines")),
+    "yards": ("loadYards", [], exportFiles("yards")),
+    "all_lines": ("loadAllLines", ["all_substations_and_taps", "yards"], exportFiles("all_lines")),
+    "planning_queue": ("loadPlanningQueue", [],
+                       exportFiles("planning_queue") + [("OTHER_DATA_DIRECTORY", "PlanningQueues.xlsx")]),
+    "pjm_states": ("loadPJMStates", [], exportFiles("pjm_states")),
+    "pnode_list": ("loadPnodeList", ["all_substations_and_taps", "all_substation_labels"],
+                   [("OTHER_DATA_DIRECTORY", "lmp-bus-model.xlsx"),
+                    ("CACHE_DATA_DIRECTORY", "pnode_substation_match.pkl")]),
+    "eia_plant": ("loadEIAPlantData", [],
+                  [("OTHER_DATA_DIRECTORY", os.path.join("eia8602018", "2___Plant_Y2018.xlsx")),
+                   ("OTHER_DATA_DIRECTORY", os.path.join("eia8602018", "3_1_Generator_Y2018.xlsx"))])
+}
+
+TRANSFORMER_FILES = [("OASIS_DATA_DIRECTORY", "equiplist_XFMR.csv"), ("OASIS_DATA_DIRECTORY", "equiplist_LINE.csv"),
+                     ("CACHE_DATA_DIRECTORY", "ratings.csv")]
+
+# artifact: (layers it depends on besides the lines the model is built of, input files)
+ARTIFACTS = {
+    "lines": (["all_substation_labels"],
+              [("OTHER_DATA_DIRECTORY", "equiplist.csv"), ("CACHE_DATA_DIRECTORY", "ratings.csv"),
+               ("CACHE_DATA_DIRECTORY", "line_equiplist_rating_subs.pkl")]),
+    "buses": (["all_substations_and_taps"], []),
+    "generators": (["all_substations_and_taps", "pnode_list", "eia_plant"], []),
+    "pnode_match": (["pnode_list"], []),
+    "transformers": (["all_substations_and_taps", "pnode_list"], TRANSFORMER_FILES),
+    "transformer_buses": (["all_substations_and_taps", "pnode_list"], TRANSFORMER_FILES),
+    "line_buses": (["all_substations_and_taps", "pnode_list"], TRANSFORMER_FILES),
+    "queue": (["planning_queue", "pjm_zones", "all_substations_and_taps"], []),
+    "interfaces": (["pjm_zones", "all_substations_and_taps"], [])
+}
+LINES = ["pjm_backbone_lines", "all_lines"]
+
+# artifacts of getTransformers, in order
+TRANSFORMER_ARTIFACTS = ["transformers", "transformer_buses", "line_buses"]
+
+# artifacts that are updated row by row if only this layer changed
+ROW_LEVEL = {"queue": "planning_queue"}
+
+
+def getRequiredLayers(layers):
+    """
+    get layers and the layers they depend on, in an order where every layer
+        comes after those it depends on.
+    """
+    required = set()
+    pending = list(layers)
+    while pending:
+        layer = pending.pop()
+        if layer not in required:
+            required.add(layer)
+            pending += LAYERS[layer][1]
+    return [x for x in LAYERS if x in required]
+
+
+def getArtifactLayers(artifact, lines):
+    "layers an artifact depends on"
+    return [lines] + ARTIFACTS[artifact][0]
+
+
+def getFileDigest(path):
+    "get sha256 of a file"
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def getInputDigests(directories, files, previous=None):
+    """
+    get size, modification time and sha256 of input files. missing files have
+        no digest. files whose size and modification time are unchanged
+        since previous keep their digest.
+
+    return dictionary keyed by directory attribute and file name.
+    """
+    previous = previous or {}
+    inputs = {}
+    for name, fileName in files:
+        key = os.path.join(name, fileName)
+        if key in inputs:
+            continue
+        path = os.path.join(directories[name], fileName)
+        if not os.path.isfile(path):
+            inputs[key] = {"size": None, "mtime_ns": None, "sha256": None}
+            continue
+        stat = os.stat(path)
+        known = previous.get(key, {})
+        if known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+            inputs[key] = known
+        else:
+            inputs[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": getFileDigest(path)}
+    return inputs
+
+
+def getFingerprint(*parts):
+    "get sha256 of json serializable parts"
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def getFingerprints(inputs, layers, artifacts, lines, commit):
+    """
+    get fingerprints of layers and artifacts, and the context fingerprints of
+        row level artifacts, i.e. excluding the layer updated row by row.
+    """
+    def digests(files):
+        return [inputs[os.path.join(name, fileName)]["sha256"] for name, fileName in files]
+
+    fingerprints = {"layers": {}, "artifacts": {}, "contexts": {}}
+    for layer in layers:
+        loader, dependencies, files = LAYERS[layer]
+        fingerprints["layers"][layer] = getFingerprint(commit, layer, digests(files),
+                                                       [fingerprints["layers"][x] for x in dependencies])
+    for artifact in artifacts:
+        dependencies = getArtifactLayers(artifact, lines)
+        files = ARTIFACTS[artifact][1]
+        fingerprints["artifacts"][artifact] = getFingerprint(commit, artifact, lines, digests(files),
+                                                             [fingerprints["layers"][x] for x in dependencies])
+        if artifact in ROW_LEVEL:
+            context = [fingerprints["layers"][x] for x in dependencies if x != ROW_LEVEL[artifact]]
+            fingerprints["contexts"][artifact] = getFingerprint(commit, artifact, lines, digests(files), context)
+    return fingerprints
+
+
+def getPreviousBuild(output):
+    """
+    get directory and manifest of the latest successful build in output,
+        or (None, None).
+    """
+    latest = os.path.join(output, "LATEST")
+    if not os.path.exists(latest):
+        return None, None
+    with open(latest) as f:
+        directory = os.path.join(output, f.read().strip())
+    manifestPath = os.path.join(directory, "manifest.json")
+    if not os.path.exists(manifestPath):
+        return None, None
+    with open(manifestPath) as f:
+        return directory, json.load(f)
+
+
+def getReusable(previous_directory, entries, fingerprints, key="fingerprint"):
+    """
+    get paths of previous layers or artifacts whose fingerprint is unchanged
+    """
+    reusable = {}
+    for name, entry in entries.items():
+        path = os.path.join(previous_directory, entry["file"])
+        if name in fingerprints and entry.get(key) == fingerprints[name] and os.path.exists(path):
+            reusable[name] = path
+    return reusable
+
+
+def linkFile(source, destination):
+    "hard link source to destination, or copy if linking fails"
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def buildArtifact(system_map, artifact, lines, use_cache, previous=None):
+    """
+    build an artifact from the loaded layers of system_map. previous is
+        the path of the previous artifact, used by row level artifacts.
+    """
+    lines = getattr(system_map, lines)
+    if artifact == "lines":
+        return system_map.getLineRatings(lines, use_cache=use_cache)
+    elif artifact == "buses":
+        return system_map.getLineSubstationsTaps(lines)
+    elif artifact == "generators":
+        return system_map.matchEIAPlantWithLineSubstationsTaps(lines)
+    elif artifact == "pnode_match":
+        return system_map.pnode_list
+    elif artifact in TRANSFORMER_ARTIFACTS:
+        # buses of voltage levels tied by transformers, and lines re-pointed to them
+        return system_map.getTransformers(lines)[TRANSFORMER_ARTIFACTS.index(artifact)]
+    elif artifact == "queue":
+        previous = pd.read_pickle(previous) if previous is not None else None
+        return system_map.matchQueueWithLineSubstationsTaps(lines, previous=previous)
+    elif artifact == "interfaces":
+        return system_map.getTieLines(lines)
+    raise(ValueError("Unknown artifact: {}".format(artifact)))
+
+
+def runStage(system_map, stage, options):
+    """
+    run a stage, i.e. load a layer or build an artifact, as a profiled stage.
+        layers in options["reuse"] are read from a previous build instead.
+
+    runs in worker processes, so the records of the stage are returned
+        along with its result.
+    """
+    profiler = system_map.profiler
+    system_map.profiler = StageProfiler(trace_memory=profiler.trace_memory)
+    try:
+        with system_map.profiler.stage(stage) as record:
+            if stage in options["reuse"]:
+                result = pd.read_pickle(options["reuse"][stage])
+            elif stage in LAYERS:
+                loader = getattr(system_map, LAYERS[stage][0])
+                result = loader(use_cache=options["use_cache"]) if stage == "pnode_list" else loader()
+            else:
+                result = buildArtifact(system_map, stage, options["lines"], options["use_cache"],
+                                       previous=options["previous"].get(stage))
+            record["rows_out"] = len(result)
+        return result, system_map.profiler.records
+    except Exception as e:
+        # keep records of the failing stage for the manifest
+        e.records = system_map.profiler.records
+        raise
+    finally:
+        system_map.profiler = profiler
+
+
+def runStages(system_map, stages, options, executor):
+    """
+    run independent stages, in worker processes if executor is given.
+        reused layers are always read in this process. loaded layers are
+        set on system_map.
+
+    return dictionary of stage results.
+    """
+    local = [x for x in stages if executor is None or x in options["reuse"]]
+    try:
+        outputs = {x: runStage(system_map, x, options) for x in local}
+        futures = {x: executor.submit(runStage, system_map, x, options) for x in stages if x not in local}
+        outputs.update({x: future.result() for x, future in futures.items()})
+    except Exception as e:
+        system_map.profiler.records += getattr(e, "records", [])
+        raise
+
+    results = {}
+    for stage in stages:
+        result, records = outputs[stage]
+        system_map.profiler.records += records
+        results[stage] = result
+        if stage in LAYERS:
+            setattr(system_map, stage, result)
+            if stage == "all_substations_and_taps":
+                system_map.buildIdIndexes()
+    return results
+
+
+def writeManifest(path, manifest):
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+
+def build(directories, output, artifacts=list(ARTIFACTS), lines="pjm_backbone_lines", jobs=1,
+          use_cache=True, trace_memory=False, incremental=True):
+    """
+    build artifacts from input directories into a new version directory
+        under output.
+
+    artifacts and layers are pickled GeoDataFrames or DataFrames. the
+        manifest lists inputs, fingerprints, timings of each stage and row
+        counts and checksums of artifacts.
+    if incremental, stages unchanged since the latest build are reused.
+        without use_cache matches are recomputed, so nothing is reused.
+    return path of the version directory.
+    """
+    commit = getGitCommit()
+    created = datetime.datetime.now()
+    version = "{:%Y%m%dT%H%M%S%f}".format(created) + ("-" + commit if commit else "")
+    version_directory = os.path.join(output, version)
+    os.makedirs(os.path.join(version_directory, "layers"))
+
+    previous_directory, previous = getPreviousBuild(output) if incremental and use_cache else (None, None)
+    previous = previous or {}
+
+    # fingerprints of all stages, from digests of their input files
+    layers = getRequiredLayers(sum([getArtifactLayers(x, lines) for x in artifacts], []))
+    files = sum([LAYERS[x][2] for x in layers], []) + sum([ARTIFACTS[x][1] for x in artifacts], [])
+    inputs = getInputDigests(directories, files, previous.get("inputs"))
+    fingerprints = getFingerprints(inputs, layers, artifacts, lines, commit)
+
+    reused_artifacts = {}
+    reused_layers = {}
+    previous_artifacts = {}
+    if previous_directory is not None:
+        reused_artifacts = getReusable(previous_directory, previous.get("artifacts", {}), fingerprints["artifacts"])
+        reused_layers = getReusable(previous_directory, previous.get("layers", {}), fingerprints["layers"])
+        previous_artifacts = getReusable(previous_directory, previous.get("artifacts", {}),
+                                         fingerprints["contexts"], key="context")
+
+    # only layers of artifacts that are built are needed
+    built = [x for x in artifacts if x not in reused_artifacts]
+    needed = getRequiredLayers(sum([getArtifactLayers(x, lines) for x in built], []))
+
+    system_map = PJMSystemMap(directories=directories, load=False)
+    system_map.profiler = StageProfiler(trace_memory=trace_memory)
+    options = {"lines": lines, "use_cache": use_cache, "reuse": reused_layers,
+               "previous": {x: y for x, y in previous_artifacts.items() if x in built}}
+    manifest = {"version": version, "commit": commit, "created": created.isoformat(timespec="seconds"),
+                "status": "running", "artifacts_requested": list(artifacts), "lines": lines,
+                "jobs": jobs, "use_cache": use_cache, "directories": directories,
+                "previous": os.path.basename(previous_directory) if previous_directory else None,
+                "inputs": inputs, "stages": [], "layers": {}, "artifacts": {}}
+
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        # load layers in waves of those whose dependencies are loaded
+        pending = list(needed)
+        while pending:
+            wave = [x for x in pending if all(y not in pending for y in LAYERS[x][1])]
+            for layer, result in runStages(system_map, wave, options, executor).items():
+                path = os.path.join(version_directory, "layers", layer + ".pkl")
+                if layer in reused_layers:
+                    linkFile(reused_layers[layer], path)
+                else:
+                    result.to_pickle(path)
+            pending = [x for x in pending if x not in wave]
+
+        # unchanged layers that are not needed are carried over for later builds
+        for layer in layers:
+            path = os.path.join(version_directory, "layers", layer + ".pkl")
+            if layer not in needed and layer in reused_layers:
+                linkFile(reused_layers[layer], path)
+            if os.path.exists(path):
+                manifest["layers"][layer] = {"file": os.path.join("layers", layer + ".pkl"),
+                                             "fingerprint": fingerprints["layers"][layer],
+                                             "reused": layer in reused_layers}
+
+        results = runStages(system_map, built, options, executor)
+        for artifact in artifacts:
+            path = os.path.join(version_directory, artifact + ".pkl")
+            if artifact in reused_artifacts:
+                linkFile(reused_artifacts[artifact], path)
+                entry = dict(previous["artifacts"][artifact], reused=True, row_level=False)
+            else:
+                results[artifact].to_pickle(path)
+                entry = {"file": artifact + ".pkl", "rows": len(results[artifact]),
+                         "columns": [str(x) for x in results[artifact].columns],
+                         "sha256": getFileDigest(path), "reused": False,
+                         "row_level": artifact in options["previous"]}
+            entry["fingerprint"] = fingerprints["artifacts"][artifact]
+            entry["context"] = fingerprints["contexts"].get(artifact)
+            manifest["artifacts"][artifact] = entry
+        manifest["status"] = "succeeded"
+    except Exception as e:
+        manifest["status"] = "failed"
+        manifest["error"] = "".join(traceback.format_exception_only(type(e), e)).strip()
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        stages = system_map.profiler.report()
+        manifest["stages"] = stages.astype(object).where(stages.notnull(), None).to_dict(orient="records")
+        writeManifest(os.path.join(version_directory, "manifest.json"), manifest)
+
+    with open(os.path.join(output, "LATEST"), "w") as f:
+        f.write(version + "\n")
+    return version_directory
+
+
+def getDirectories(args):
+    """
+    get input directories from --input and per directory overrides
+    """
+    directories = {}
+    for name, relative in INPUT_LAYOUT.items():
+        override = getattr(args, name.lower())
+        if override is not None:
+            directories[name] = override
+        elif args.input is not None:
+            directories[name] = os.path.join(args.input, relative)
+    return directories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the cleaned PJM model into versioned artifacts.")
+    parser.add_argument("--input", help="input directory laid out as {}".format(
+        ", ".join("{}/".format(x) for x in INPUT_LAYOUT.values())))
+    parser.add_argument("--output", required=True, help="directory of versioned builds")
+    for name, relative in INPUT_LAYOUT.items():
+        parser.add_argument("--" + name.lower().replace("_directory", "").replace("_", "-") + "-dir",
+                            dest=name.lower(), help="overrides INPUT/{}".format(relative))
+    parser.add_argument("--stages", nargs="+", default=list(ARTIFACTS), choices=list(ARTIFACTS),
+                        help="artifacts to build, layers they need are loaded")
+    parser.add_argument("--lines", default="pjm_backbone_lines", choices=LINES,
+                        help="lines the model is built of")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="recompute pnode and equiplist matches instead of loading them from cache")
+    parser.add_argument("--full", action="store_true", help="rebuild all stages instead of reusing the latest build")
+    parser.add_argument("--trace-memory", action="store_true", help="trace peak memory of stages")
+    args = parser.parse_args(argv)
+
+    directories = getDirectories(args)
+    missing = [x for x in INPUT_LAYOUT if x not in directories]
+    if missing:
+        parser.error("--input or directories for {} are required".format(", ".join(missing)))
+
+    try:
+        version_directory = build(directories, args.output, artifacts=args.stages, lines=args.lines,
+                                  jobs=args.jobs, use_cache=not args.no_cache,
+                                  trace_memory=args.trace_memory, incremental=not args.full)
+    except Exception as e:
+        print("build failed: {}".format(e), file=sys.stderr)
+        return 1
+    print(version_directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import os
+import json
+import tempfile
+import unittest
+
+import pandas as pd
+
+# build uses relative imports, run from pjm_system_map
+from helper_functions.build import (build, getInputDigests, getFingerprints, getRequiredLayers, getArtifactLayers,
+                                    getPreviousBuild, INPUT_LAYOUT, LAYERS)
+from helper_functions.synthetic import generateSystemMap, makeFeature, writeExport
+from helper_functions.json_reader import readExports
+
+
+class BuildTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        directory = self.temporary.name
+        generateSystemMap(directory, scale=1, seed=0)
+        # inputs of the other directories are not needed by the artifacts built here
+        self.directories = {x: os.path.join(directory, "missing") for x in INPUT_LAYOUT}
+        self.directories["SYSTEM_MAP_DATA_DIRECTORY"] = os.path.join(directory, "pjm_system_map_export")
+        self.directories["OASIS_DATA_DIRECTORY"] = os.path.join(directory, "oasis")
+        self.output = os.path.join(directory, "builds")
+        self.artifacts = ["buses", "interfaces"]
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def getExportPath(self, name):
+        return os.path.join(self.directories["SYSTEM_MAP_DATA_DIRECTORY"], name + ".json")
+
+    def touchExport(self, name):
+        # republish an export with the same features
+        with open(self.getExportPath(name), "a") as f:
+            f.write("\n")
+
+    def build(self):
+        version_directory = build(self.directories, self.output, artifacts=self.artifacts)
+        with open(os.path.join(version_directory, "manifest.json")) as f:
+            return version_directory, json.load(f)
+
+    def writeQueue(self, points):
+        """
+        write a planning queue export of projects at points, with their
+            project details
+        """
+        ids = ["Q{}".format(i) for i in range(len(points))]
+        features = [makeFeature({"QUEUE_ID": x, "QUEUE_GLOBALID": "{" + x + "}", "VOLTAGE": "138kV"},
+                                "esriGeometryPoint", {"x": point[0], "y": point[1]}) for x, point in zip(ids, points)]
+        writeExport(self.directories["SYSTEM_MAP_DATA_DIRECTORY"], "planning_queue", features)
+
+        directory = os.path.join(self.temporary.name, "other")
+        self.directories["OTHER_DATA_DIRECTORY"] = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        pd.DataFrame({"Queue Number": ids, "Name": ids, "MFO": 10.0, "MW Energy": 10.0, "MW Capacity": 5.0,
+                      "MW In Service": 0.0, "Project Type": "Generation Interconnection", "Fuel": "Solar",
+                      "Status": "Active", "Revised In Service Date": "2025-06-01",
+                      "Actual In Service Date": None}).to_excel(os.path.join(directory, "PlanningQueues.xlsx"),
+                                                                 index=False)
+
+    def getFingerprints(self):
+        layers = getRequiredLayers(sum([getArtifactLayers(x, "pjm_backbone_lines") for x in self.artifacts], []))
+        files = sum([LAYERS[x][2] for x in layers], [])
+        inputs = getInputDigests(self.directories, files)
+        return getFingerprints(inputs, layers, self.artifacts, "pjm_backbone_lines", "commit")
+
+    def testFingerprints(self):
+        before = self.getFingerprints()
+        self.assertEqual(before, self.getFingerprints())
+        self.touchExport("pjm_backbone_lines")
+        after = self.getFingerprints()
+        self.assertEqual(before["layers"]["pjm_zones"], after["layers"]["pjm_zones"])
+        self.assertEqual(before["layers"]["all_substations_and_taps"], after["layers"]["all_substations_and_taps"])
+        self.assertNotEqual(before["layers"]["pjm_backbone_lines"], after["layers"]["pjm_backbone_lines"])
+        for artifact in self.artifacts:
+            self.assertNotEqual(before["artifacts"][artifact], after["artifacts"][artifact])
+
+        # a change propagates to the layers that depend on it
+        self.touchExport("pjm_zones")
+        changed = self.getFingerprints()
+        for layer in ["pjm_zones", "all_substations_and_taps", "pjm_backbone_lines"]:
+            self.assertNotEqual(after["layers"][layer], changed["layers"][layer])
+
+    def testReuse(self):
+        first_directory, first = self.build()
+        self.assertFalse(any(x["reused"] for x in first["artifacts"].values()))
+
+        second_directory, second = self.build()
+        self.assertEqual(second["previous"], first["version"])
+        for artifact in self.artifacts:
+            self.assertTrue(second["artifacts"][artifact]["reused"])
+            self.assertEqual(second["artifacts"][artifact]["sha256"], first["artifacts"][artifact]["sha256"])
+            pd.testing.assert_frame_equal(pd.read_pickle(os.path.join(second_directory, artifact + ".pkl")),
+                                          pd.read_pickle(os.path.join(first_directory, artifact + ".pkl")))
+        self.assertTrue(all(x["reused"] for x in second["layers"].values()))
+
+        # only what depends on the changed export is rebuilt
+        self.touchExport("pjm_backbone_lines")
+        third_directory, third = self.build()
+        self.assertFalse(third["artifacts"]["buses"]["reused"])
+        self.assertTrue(third["layers"]["pjm_zones"]["reused"])
+        self.assertTrue(third["layers"]["all_substations_and_taps"]["reused"])
+        self.assertFalse(third["layers"]["pjm_backbone_lines"]["reused"])
+        self.assertEqual(third["artifacts"]["buses"]["sha256"], first["artifacts"]["buses"]["sha256"])
+
+    def testLatest(self):
+        self.assertEqual(getPreviousBuild(self.output), (None, None))
+        first_directory, first = self.build()
+        self.assertEqual(getPreviousBuild(self.output)[0], first_directory)
+
+        # a failed build keeps its manifest but does not move LATEST
+        os.remove(self.getExportPath("pjm_backbone_lines"))
+        with self.assertRaises(FileNotFoundError):
+            self.build()
+        failed = [x for x in os.listdir(self.output) if x not in ["LATEST", first["version"]]]
+        self.assertEqual(len(failed), 1)
+        with open(os.path.join(self.output, failed[0], "manifest.json")) as f:
+            self.assertEqual(json.load(f)["status"], "failed")
+        self.assertEqual(getPreviousBuild(self.output)[0], first_directory)
+
+        generateSystemMap(self.temporary.name, scale=1, seed=0)
+        second_directory, second = self.build()
+        self.assertEqual(second["previous"], first["version"])
+        self.assertEqual(getPreviousBuild(self.output)[0], second_directory)
+
+    def testRowLevelQueue(self):
+        substations = readExports([self.getExportPath("pjm_substations")])
+        points = [(x.x + 500.0, x.y + 500.0) for x in substations.geometry[:6]]
+        self.artifacts = ["queue"]
+        self.writeQueue(points)
+        self.build()
+
+        # one project moves next to another substation
+        points[2] = (substations.geometry[10].x, substations.geometry[10].y - 300.0)
+        self.writeQueue(points)
+        version_directory, manifest = self.build()
+        self.assertTrue(manifest["artifacts"]["queue"]["row_level"])
+        self.assertFalse(manifest["artifacts"]["queue"]["reused"])
+        # only the new location is matched to zones
+        matches = [x for x in manifest["stages"] if x["stage"] == "geoMatchZones"]
+        self.assertEqual([x["rows_in"] for x in matches], [1])
+
+        queue = pd.read_pickle(os.path.join(version_directory, "queue.pkl"))
+        self.assertEqual(queue.loc[2, "nearest_substation"], substations.loc[10, "SUBSTATION_GLOBALID"])
+        full_directory = build(self.directories, self.output, artifacts=self.artifacts, incremental=False)
+        pd.testing.assert_frame_equal(queue, pd.read_pickle(os.path.join(full_directory, "queue.pkl")))
+
+    def testAllLinesRatings(self):
+        # there are fewer equiplist lines than lines of all_lines at 345 kV, and none at other voltages
+        directory = os.path.join(self.temporary.name, "cache")
+        self.directories["CACHE_DATA_DIRECTORY"] = directory
+        os.makedirs(directory)
+        pd.DataFrame({"VOLTAGE": [345.0], "cleaned_long_name": ["ALPHA BRAVO"], "day_normal": [1500.0]}).to_pickle(
+            os.path.join(directory, "line_equiplist_rating_subs.pkl"))
+        version_directory = build(self.directories, self.output, artifacts=["lines"], lines="all_lines")
+        lines = pd.read_pickle(os.path.join(version_directory, "lines.pkl"))
+        all_lines = pd.read_pickle(os.path.join(version_directory, "layers", "all_lines.pkl"))
+        self.assertEqual(lines.shape[0], all_lines.shape[0])
+        # lines without a match are given the rating of their voltage
+        self.assertTrue((lines.loc[lines["VOLTAGE"] == 345, "line_rating"] == 1250.0).all())
+        self.assertTrue((lines.loc[lines["VOLTAGE"] == 500, "line_rating"] == 3000.0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
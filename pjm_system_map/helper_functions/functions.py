@@ -8,19 +8,37 @@ TODO:
 """
 
 import os
-import json
 import re
-import uuid
 
 import pandas as pd
 import geopandas as gpd
 import numpy as np
 from fuzzywuzzy import fuzz, process
 from weighted_levenshtein import lev
-from shapely.ops import nearest_points, linemerge
+from shapely.ops import linemerge
 from shapely.geometry import Point, LineString
+from scipy.spatial import cKDTree
 
 from .dfs import DFSGraph
+from .json_reader import readExports
+from .branch_resolver import BranchResolver, parseEquipListBranches, equipListElementIds
+from .transformer_inventory import (getTransformerInventory, makePyPSATransformers, tieVoltageLevels,
+                                    makePyPSATransformerBuses)
+from .rating_table import RatingTable
+from .load import getLoadAllocation
+from .location_lookup import LocationIndex, ingestZipCodeMapping, ingestPnodeByState
+from .schema import compactFrames, getMemoryUsage
+from .id_index import IdIndex, getIntegrityReport
+from .geodesy import getGeodesicLengths, KM_PER_MILE
+from .projection import LayerProjections, getTransformer
+from .profiling import StageProfiler, profiled
+from .identity import getDerivedId, getMergedLineId, getParentKey
+from .name_index import NameIndex, makeNameRecords, stripZonePrefix
+from .pnode_designation import matchDesignations
+from .geometry_keys import getGeometryKeys, dropDuplicateGeometries, dropDuplicateRows
+from .substation_entities import SubstationEntities, buildSubstationEntities
+from .interfaces import getEndpointZones, findTieLines, InterfaceAggregator
+from .topology import Topology
 
 
 class PJMSystemMap:
@@ -28,111 +46,147 @@ class PJMSystemMap:
     SYSTEM_MAP_DATA_DIRECTORY = "/Users/hanhuilong/Desktop/power_simulation/pjm_system_map/helper_functions/pjm_system_map_export"
     OTHER_DATA_DIRECTORY = "/Users/hanhuilong/Desktop/power_simulation/pjm_system_map/helper_functions/pjm_other_data"
     CACHE_DATA_DIRECTORY = "/Users/hanhuilong/Desktop/power_simulation/pjm_system_map/helper_functions/cache_data"
+    DATA_DIRECTORY = "/Users/hanhuilong/Desktop/power_simulation/pjm_system_map/data"
+    OASIS_DATA_DIRECTORY = "/Users/hanhuilong/Desktop/power_simulation/pjm_system_map/data/oasis"
+    # system map exports are in web mercator, i.e. ESRI wkid 102100
+    # all layers are held in this CRS, see getLayer for other projections
+    SYSTEM_MAP_CRS = "EPSG:3857"
     FILE_NAME = {
         "pjm_backbone_lines": ["pjm_backbone_lines"],
         "all_substations": ["pjm_substations", "non_pjm_substations"],
         "taps": ["taps"],
         "all_substation_labels": ["pjm_substation_labels", "non_pjm_substation_labels"],
         "pjm_zones": ["pjm_zones"],
-        # "all_pjm_lines": ["pjm_backbone_lines", "pjm_non_backbone_lines_120_138_161_230_kv","pjm_non_backbone_lines_69_115_kv"],
-        # "non_pjm_backbone_lines": [],
-        # "all_non_pjm_lines": [],
-        # "all_lines",
+        "all_lines": ["pjm_backbone_lines", "non_member_backbone_lines",
+                      "pjm_non_backbone_lines_120_138_161_230_kv", "pjm_non_backbone_lines_69_115_kv"],
+        "yards": ["yards"],
         "planning_queue": ["planning_queue"],
         "pjm_states": ["pjm_states"]
     }
+    # lower voltage layers are not always exported
+    OPTIONAL_EXPORTS = ["pjm_non_backbone_lines_120_138_161_230_kv", "pjm_non_backbone_lines_69_115_kv"]
 
 
-    def __init__(self):
+    # GeoDataFrames whose dtypes are compacted, see schema.py
+    COMPACT_FRAMES = ["pjm_zones", "all_substations_and_taps", "all_substation_labels",
+                      "pjm_backbone_lines", "yards", "all_lines", "planning_queue", "pjm_states"]
+
+    # merged lines and the lines they are merged from, see connectBrokenLines
+    LINEAGE_COLUMNS = ["TRANSMISSION_LINE_GLOBALID", "PARENT_GLOBALID", "PARENT_KEY"]
+
+    # names most similar by trigrams that the matchers score, see NameIndex
+    MATCH_CANDIDATES = 10
+
+    def __init__(self, compact_dtypes=False, profile=False, directories=None, load=True):
         """
         Initialize class instance.
         When initializing. Automatically load the following GeoDataFrames:
+
+        if compact_dtypes, GeoDataFrames use categoricals, float32 and int32
+            surrogate keys for GLOBALIDs once loaded.
+        if profile, time, memory and row counts of loaders and cleaning
+            stages are recorded, see getProfileReport.
+        directories overrides data directories of the class by attribute
+            name, e.g. {"SYSTEM_MAP_DATA_DIRECTORY": path}.
+        if not load, nothing is loaded and loaders can be called one by one.
         """
+        for name, directory in (directories or {}).items():
+            if not name.endswith("_DIRECTORY") or not hasattr(self, name):
+                raise(ValueError("Unknown data directory: {}".format(name)))
+            setattr(self, name, directory)
+
+        self.profiler = StageProfiler(enabled=bool(profile))
+        self.id_registry = None
+        self.projections = LayerProjections(self.SYSTEM_MAP_CRS)
+        self.line_lineage = pd.DataFrame(columns=self.LINEAGE_COLUMNS)
+        self.substation_entities = None
+        if not load:
+            return
+
         self.pjm_zones = self.loadPJMZones()
         self.all_substations_and_taps = self.loadAllSubstationsAndTaps()
+        self.buildIdIndexes()
         self.all_substation_labels = self.loadAllSubstationLabels()
         self.pjm_backbone_lines = self.loadPJMBackboneLines()
+        self.yards = self.loadYards()
+        self.all_lines = self.loadAllLines()
         self.planning_queue = self.loadPlanningQueue()
         self.pjm_states = self.loadPJMStates()
         self.pnode_list = self.loadPnodeList()
         self.eia_plant = self.loadEIAPlantData()
+        if compact_dtypes:
+            self.compactDtypes()
 
 
-    def makeGeoDataFrame(self, outputFileName, inputFiles):
+    @profiled
+    def buildIdIndexes(self):
         """
-        Make GeoJSON file based on raw JSON export
-        from PJM system map.
+        build hash indexes of substation and tap ids and zones, used by
+            membership checks and integrity reports.
         """
-        # initialize geojson
-        geojson = {
-            "type": "FeatureCollection",
-            "crs": { "type": "name", "properties": { "name": "urn:ogc:def:crs:OGC:1.3:CRS84" } },
-            "features": []
-        }
+        self.substation_index = IdIndex(self.all_substations_and_taps["SUBSTATION_GLOBALID"])
+        self.zone_index = IdIndex(self.all_substations_and_taps["PLANNING_ZONE_NAME"])
 
-        # name the output file
-        outputFileName = outputFileName + ".geojson"
 
-        for fileName in inputFiles:
-            # name the input file
-            inputFileName = fileName + ".json"
-
-            # load data
-            with open(os.path.join(self.SYSTEM_MAP_DATA_DIRECTORY, inputFileName)) as f:
-                data = json.load(f)
-
-            # iterate over the json and format it into geojson to be added
-            for x in data["results"]:
-                # initialize dictionary to be appended to geojson
-                tmp = {"type": "Feature", "properties" : x["attributes"], "geometry":{"type": None, "coordinates": None}}
-
-                # handle lines
-                if x["geometryType"] == "esriGeometryPolyline":
-                    if len(x["geometry"]["paths"]) == 1:
-                        tmp["geometry"]["type"] = "LineString"
-                        tmp["geometry"]["coordinates"] = x["geometry"]["paths"][0]
-                    else:
-                        raise(ValueError("Unrecognized line geometry type. MultiLineString is detected but LineString is expected."))
-
-                # handle points
-                elif x["geometryType"] == "esriGeometryPoint":
-                    tmp["geometry"]["type"] = "Point"
-                    tmp["geometry"]["coordinates"] = [x["geometry"]["x"], x["geometry"]["y"]]
-
-                # handle polygons
-                elif x["geometryType"] == "esriGeometryPolygon":
-                    if len(x["geometry"]["rings"]) == 1 or x["value"] == "EKPC": #TODO: hardcoding EKPC for now, which is a donut shape
-                        tmp["geometry"]["type"] = "Polygon"
-                        tmp["geometry"]["coordinates"] = x["geometry"]["rings"]
-                    else:
-                        tmp["geometry"]["type"] = "MultiPolygon"
-                        tmp["geometry"]["coordinates"] = [[d] for d in x["geometry"]["rings"]]
+    @profiled
+    def compactDtypes(self):
+        """
+        compact dtypes of loaded GeoDataFrames. GLOBALIDs of all of them
+            share self.id_registry.
+        """
+        frames = {name: getattr(self, name) for name in self.COMPACT_FRAMES}
+        frames, self.id_registry = compactFrames(frames, self.id_registry)
+        for name, df in frames.items():
+            setattr(self, name, df)
 
-                # else, unrecognizable geometry shape
-                else:
-                    raise(ValueError("Unrecognized geometry type: {}".format(x["geometryType"])))
 
-                # append tmp to geojson
-                geojson["features"].append(tmp)
+    def getMemoryUsage(self):
+        """
+        return memory usage in bytes of loaded GeoDataFrames, excluding geometry
+        """
+        frames = {name: getattr(self, name) for name in self.COMPACT_FRAMES}
+        return getMemoryUsage(frames, self.id_registry)
+
 
+    def getProfileReport(self, path=None):
+        """
+        return DataFrame of recorded stages, one row per call.
+        if path, also export it as csv or json.
+        """
+        if path is not None:
+            self.profiler.export(path)
+        return self.profiler.report()
+
+
+    @profiled
+    def makeGeoDataFrame(self, outputFileName, inputFiles):
+        """
+        Make GeoDataFrame based on raw JSON export
+        from PJM system map.
 
-        # write geojson to disk
-        filePath = os.path.join(self.SYSTEM_MAP_DATA_DIRECTORY, outputFileName)
-        output = open(filePath, "w")
-        json.dump(geojson, output)
-        output.close()
+        exports are streamed feature by feature into coordinate arrays
+            and attribute columns, see json_reader.py.
+        """
+        # skip optional exports that are missing, see OPTIONAL_EXPORTS
+        existingFiles = [x for x in inputFiles if os.path.exists(os.path.join(self.SYSTEM_MAP_DATA_DIRECTORY, x + ".json"))]
+        for fileName in inputFiles:
+            if fileName in existingFiles:
+                continue
+            if fileName not in self.OPTIONAL_EXPORTS:
+                raise(FileNotFoundError("Missing system map export: {}".format(
+                    os.path.join(self.SYSTEM_MAP_DATA_DIRECTORY, fileName + ".json"))))
+            print("the following export is missing and skipped: {}".format(fileName))
 
         # load as a GeoDataFrame and do basic cleaning
-        df = gpd.read_file(os.path.join(self.SYSTEM_MAP_DATA_DIRECTORY, outputFileName))
+        filePaths = [os.path.join(self.SYSTEM_MAP_DATA_DIRECTORY, x + ".json") for x in existingFiles]
+        df = readExports(filePaths, crs=self.SYSTEM_MAP_CRS)
         df = df.replace({"Null": np.nan, None: np.nan, "":np.nan})
-        df = df.drop_duplicates()
-
-        # remove the geojson file on disk
-        os.remove(filePath)
+        df = dropDuplicateRows(df)
 
         return df
 
 
+    @profiled
     def loadPJMBackboneLines(self):
         """
         load PJM backbone line data as a GeoDataFrame
@@ -140,6 +194,32 @@ class PJMSystemMap:
         name = "pjm_backbone_lines"
         # make GeoJSON based on raw JSON export from PJM system map
         lines = self.makeGeoDataFrame(name, self.FILE_NAME[name])
+        return self.cleanLines(lines)
+
+
+    @profiled
+    def loadAllLines(self):
+        """
+        load all line layers, i.e. PJM and non-member backbone lines and
+            PJM lower voltage lines where exported, as a GeoDataFrame.
+
+        yards are used in addition to substations to find line endpoints.
+        """
+        name = "all_lines"
+        # make GeoJSON based on raw JSON export from PJM system map
+        lines = self.makeGeoDataFrame(name, self.FILE_NAME[name])
+        lines = lines.reset_index(drop=True)
+        return self.cleanLines(lines, yards=self.yards, strict=False)
+
+
+    @profiled
+    def cleanLines(self, lines, yards=None, strict=True):
+        """
+        clean lines made from raw JSON export.
+
+        if strict, raise on ambiguous broken line pairs; otherwise only the
+            closest pair is connected.
+        """
         # convert various columns to float
         lines.LENGTH_KM = lines.LENGTH_KM.astype(float)
         lines.MILES = lines.MILES.astype(float)
@@ -148,15 +228,18 @@ class PJMSystemMap:
         lines = self.geoCheckLineSubstations(lines)
         # fill missing substations
         lines = self.fillMissingSubstations(lines)
+        if yards is not None:
+            lines = self.fillSubstationsFromYards(lines, yards)
         # connect broken lines
-        lines = self.connectBrokenLines(lines)
+        lines = self.connectBrokenLines(lines, strict=strict)
         # handle special cases
         lines = self.fixLineSpecialCases(lines)
-        # get length for missing lines
-        lines = self.fillMissingLineLength(lines)
+        # get geodesic length of lines
+        lines = self.setGeodesicLineLength(lines)
         return lines
 
 
+    @profiled
     def loadPJMZones(self):
         """
         load PJM transmission zone.
@@ -169,6 +252,7 @@ class PJMSystemMap:
         return pjm_zones
 
 
+    @profiled
     def loadAllSubstationsAndTaps(self):
         """
         load all substations, whether inside PJM or not.
@@ -180,7 +264,7 @@ class PJMSystemMap:
         # concat
         substations = pd.concat([substations, taps])
         # TODO: dropping duplicates currently, not sure if it's the most optimal
-        substations = substations.drop_duplicates(subset=["geometry"], keep="first")
+        substations = dropDuplicateGeometries(substations, keep="first")
         # add missing substations and taps
         substations = self.addToSubstationsAndTaps(substations)
         # convert various columns to float
@@ -216,6 +300,7 @@ class PJMSystemMap:
         return substations
 
 
+    @profiled
     def loadAllSubstationLabels(self):
         """
         load all substation labels data, whether inside PJM or not.
@@ -256,6 +341,19 @@ class PJMSystemMap:
         return substation_labels
 
 
+    @profiled
+    def loadYards(self):
+        """
+        load substation yards, i.e. polygons of substations at each voltage.
+        """
+        name = "yards"
+        # make GeoJSON based on raw JSON export from PJM system map
+        yards = self.makeGeoDataFrame(name, self.FILE_NAME[name])
+        yards.VOLTAGE = yards.VOLTAGE.astype(float)
+        return yards
+
+
+    @profiled
     def loadPlanningQueue(self):
         """
         load PJM planning queue
@@ -279,6 +377,7 @@ class PJMSystemMap:
         return queue_merged
 
 
+    @profiled
     def loadPJMStates(self):
         """
         load PJM states
@@ -291,9 +390,13 @@ class PJMSystemMap:
         return states
 
 
-    def loadPnodeList(self, use_cache=True, only_match_high_confidence=True):
+    @profiled
+    def loadPnodeList(self, use_cache=True, only_match_high_confidence=True, incremental=False):
         """
         load PJM pnode list
+
+        if incremental, pnodes are matched with substations reusing the
+            previous matches, see matchPnodeWithMapSubstations.
         """
         # load pnode_list
         filePath = os.path.join(self.OTHER_DATA_DIRECTORY, "lmp-bus-model.xlsx")
@@ -311,17 +414,16 @@ class PJMSystemMap:
         node_list.zone = node_list.zone.replace(zonalMap)
         # match pnode with system substations
         node_list = self.matchPnodeWithMapSubstations(node_list, use_cache=use_cache,
-                        only_match_high_confidence=only_match_high_confidence)
+                        only_match_high_confidence=only_match_high_confidence, incremental=incremental)
         # check that zone are one-one match between node list and substations
-        for x in node_list.zone.unique():
-            if x not in self.all_substations_and_taps.PLANNING_ZONE_NAME.to_list():
-                print("the following zone is in node list but not in substations: {}".format(x))
-        for x in self.all_substations_and_taps.PLANNING_ZONE_NAME.dropna().unique():
-            if x not in node_list.zone.to_list():
-                print("the following zone is in substations but not in node list: {}".format(x))
+        for x in self.zone_index.missing(node_list.zone):
+            print("the following zone is in node list but not in substations: {}".format(x))
+        for x in IdIndex(node_list.zone).missing(self.zone_index.index):
+            print("the following zone is in substations but not in node list: {}".format(x))
         return node_list
 
 
+    @profiled
     def loadEIAPlantData(self, year="2018"):
         """
         load EIA 860 data.
@@ -370,12 +472,10 @@ class PJMSystemMap:
         # TODO: figure out if there is some way to get coordinates
         # plants = plants[(plants.Longitude != " ") & (plants.Latitude != " ")]
 
-        # construct geodataframe
-        plants = gpd.GeoDataFrame(plants, geometry=gpd.points_from_xy(plants.Longitude, plants.Latitude))
-
-        # convert projection
-        plants.crs = 4326
-        plants = plants.to_crs(epsg = 3857)
+        # construct geodataframe, converting coordinates to system map projection
+        transformer = getTransformer("EPSG:4326", self.SYSTEM_MAP_CRS)
+        x, y = transformer.transform(plants.Longitude.astype(float).values, plants.Latitude.astype(float).values)
+        plants = gpd.GeoDataFrame(plants, geometry=gpd.points_from_xy(x, y), crs=self.SYSTEM_MAP_CRS)
 
         # drop original coordinates
         plants = plants.drop(columns=["Latitude", "Longitude"])
@@ -391,6 +491,12 @@ class PJMSystemMap:
     def getPJMBackboneLines(self):
         "return pjm backbone line data"
         return self.pjm_backbone_lines
+    def getAllLines(self):
+        "return all line data"
+        return self.all_lines
+    def getYards(self):
+        "return substation yards"
+        return self.yards
     def getAllSubstationsAndTaps(self):
         "return all substations and taps data"
         return self.all_substations_and_taps
@@ -412,6 +518,36 @@ class PJMSystemMap:
     def getEIAPlantData(self):
         "return EIA 860 plant data"
         return self.eia_plant
+    def getLineLineage(self):
+        "return merged lines and the lines they are merged from"
+        return self.line_lineage
+
+
+    def getSubstationEntities(self):
+        """
+        get substation entity table of substations and taps, labels, matched
+            pnodes and zones, see substation_entities.py.
+
+        rebuilt if any of the layers it is built of changed. labels and
+            pnodes are linked once loaded.
+        """
+        sources = (self.all_substations_and_taps, getattr(self, "all_substation_labels", None),
+                   getattr(self, "pnode_list", None))
+        cached = self.substation_entities
+        if cached is None or any(x is not y for x, y in zip(cached[0], sources)):
+            entities = SubstationEntities(buildSubstationEntities(*sources))
+            self.substation_entities = (sources, entities)
+        return self.substation_entities[1]
+
+
+    def getLayer(self, name, crs=None):
+        """
+        return a loaded layer, e.g. "all_substations_and_taps", in crs.
+        layers are held in SYSTEM_MAP_CRS; other projections are memoized.
+
+        e.g. getLayer("all_substations_and_taps", "EPSG:4326") for lon/lat
+        """
+        return self.projections.project(name, getattr(self, name), crs)
 
 
     def addToSubstationsAndTaps(self, substations_and_taps):
@@ -422,59 +558,78 @@ class PJMSystemMap:
         TODO: figure out an algorithm way to do this.
         """
 
+        geometry = Point(-9819520.7577, 5136039.221299998)
         substations_and_taps = substations_and_taps.append(
                                     {"NAME": "TAP",
-                                    "SUBSTATION_GLOBALID": str(uuid.uuid1()),
+                                    "SUBSTATION_GLOBALID": getDerivedId("substation", "missing_substation_1", geometry),
                                     "SUBSTATION_TYPE": "1",
                                     "SYM_CODE": "TAP",
                                     "VOLTAGE": 345.0,
                                     "SHAPE": "Point",
                                     "SUBSTATION_KEY": "missing_substation_1",
-                                    "geometry": Point(-9819520.7577, 5136039.221299998)
+                                    "geometry": geometry
                                     }, ignore_index=True, verify_integrity=True)
+        # appending a dict drops the CRS
+        substations_and_taps = substations_and_taps.set_crs(self.SYSTEM_MAP_CRS, allow_override=True)
 
         return substations_and_taps
 
 
+    @profiled
     def geoCheckLineSubstations(self, lines):
         """
         check substations in the line to see if they are part of the line based on
             shapely geo distance. remove if it's not part of the line.
         """
-        locations = dict(zip(self.all_substations_and_taps["SUBSTATION_GLOBALID"],
-                            self.all_substations_and_taps["geometry"]))
-
-        # iterate over lines to get rid of substations not contained in the line
-        for index, row in lines.iterrows():
-            line = row["geometry"]
+        locations = self.all_substations_and_taps.drop_duplicates(subset=["SUBSTATION_GLOBALID"])
+        locations = locations.set_index("SUBSTATION_GLOBALID").geometry
 
-            for column in ["SUBSTATION_A_GLOBALID", "SUBSTATION_B_GLOBALID"]:
-                if row[column] is np.nan:
-                    # skip is substation is nan
-                    continue
-                elif row[column] not in locations.keys():
-                    # replace sub to nan if sub doesn't exist in sub table
-                    lines.loc[index, column] = np.nan
-                    continue
-                else:
-                    sub_geo = locations[row[column]]
+        for column in ["SUBSTATION_A_GLOBALID", "SUBSTATION_B_GLOBALID"]:
+            # replace sub to nan if sub doesn't exist in sub table
+            sub_geo = lines[column].map(locations)
+            lines.loc[sub_geo.isnull(), column] = np.nan
 
-                # replace substation with nan if not contained in line
-                if line.distance(sub_geo) != 0:
-                    lines.loc[index, column] = np.nan
+            # replace substation with nan if not contained in line
+            found = sub_geo.notnull()
+            distance = lines.geometry[found].distance(gpd.GeoSeries(sub_geo[found], index=lines.index[found]))
+            lines.loc[distance[distance != 0].index, column] = np.nan
 
         return lines
 
 
+    def getSubstationsOnLines(self, lines):
+        """
+        get substations and taps on each line, i.e. those with zero distance to the line.
+
+        return dictionary of line index to list of SUBSTATION_GLOBALID in the
+            order of substations and taps.
+        """
+        substations = self.all_substations_and_taps.reset_index(drop=True)
+        line_positions, sub_positions = substations.sindex.query_bulk(lines.geometry, predicate="intersects")
+        order = np.lexsort((sub_positions, line_positions))
+        line_positions = line_positions[order]
+        sub_positions = sub_positions[order]
+
+        sub_ids = substations["SUBSTATION_GLOBALID"].values
+        matched = {}
+        for line_position, sub_position in zip(line_positions, sub_positions):
+            matched.setdefault(lines.index[line_position], []).append(sub_ids[sub_position])
+        return matched
+
+
+    @profiled
     def fillMissingSubstations(self, lines):
         """
         Certain lines don't have corresponding substations.
         Fill these missing substations using distance based matching.
         """
+        # substations on lines with missing substations, found with a spatial index
+        missing = lines.SUBSTATION_A_GLOBALID.isnull() | lines.SUBSTATION_B_GLOBALID.isnull()
+        on_lines = self.getSubstationsOnLines(lines[missing])
+
         # first, do matching for those with only 1 substation missing
         for index, row in lines[lines.SUBSTATION_A_GLOBALID.isnull() ^ lines.SUBSTATION_B_GLOBALID.isnull()].iterrows():
-            matched_subs = self.all_substations_and_taps[self.all_substations_and_taps.geometry.apply(lambda x: x.distance(lines.geometry.loc[index])) == 0]
-            matched_subs = matched_subs["SUBSTATION_GLOBALID"].to_list()
+            matched_subs = on_lines.get(index, [])
 
             for sub in matched_subs:
                 if sub == row["SUBSTATION_A_GLOBALID"] or sub == row["SUBSTATION_B_GLOBALID"]:
@@ -490,8 +645,7 @@ class PJMSystemMap:
 
         # second, do matching for those with both substations missing
         for index, row in lines[lines.SUBSTATION_A_GLOBALID.isnull() & lines.SUBSTATION_B_GLOBALID.isnull()].iterrows():
-            matched_subs = self.all_substations_and_taps[self.all_substations_and_taps.geometry.apply(lambda x: x.distance(lines.geometry.loc[index])) == 0]
-            matched_subs = matched_subs["SUBSTATION_GLOBALID"].to_list()
+            matched_subs = on_lines.get(index, [])
 
             # insert match information into dataframe
             if len(matched_subs) > 0:
@@ -501,74 +655,106 @@ class PJMSystemMap:
                 lines.loc[index, "SUBSTATION_B_GLOBALID"] = matched_subs[1]
 
             if len(matched_subs) > 2: # TODO: might not be necessary
-                print(sub)
                 print(matched_subs)
                 raise(ValueError("There are too many matches. Line index: {}".format(index)))
 
         return lines
 
 
-    def connectBrokenLines(self, lines):
+    @profiled
+    def fillSubstationsFromYards(self, lines, yards):
         """
-        Certain lines are broken/disconnected.
-        Find these lines and connect them.
+        fill missing substations with the substation of the yard a line ends in.
         """
-        # get lines that are broken/disconnected
-        # these are those that don't have corresponding substation based on geomatch
-        problematic_lines = lines[lines["SUBSTATION_A_GLOBALID"].isnull() |
-                                    lines["SUBSTATION_B_GLOBALID"].isnull()].copy(deep=True)
-
-        # initialize a list to store matching pairs
-        pairs = []
+        known = self.all_substations_and_taps["SUBSTATION_GLOBALID"]
+        yards = yards[yards["SUBSTATION_GLOBALID"].isin(known)].reset_index(drop=True)
 
-        # iterate over the problematic lines to find pairs
-        # pairs are those that are very close to each other
-        # here, defined as less than 500 meters apart
-        for index, row in problematic_lines.iterrows():
-            choices = problematic_lines[problematic_lines.index != index]
-            choices = dict(zip(choices.index, choices["geometry"]))
+        for column, end in [("SUBSTATION_A_GLOBALID", 0), ("SUBSTATION_B_GLOBALID", -1)]:
+            other = "SUBSTATION_B_GLOBALID" if end == 0 else "SUBSTATION_A_GLOBALID"
+            missing = lines[lines[column].isnull()]
+            if missing.shape[0] == 0:
+                continue
 
-            line = row["geometry"]
+            endpoints = gpd.GeoDataFrame(geometry=[Point(x.coords[end]) for x in missing.geometry],
+                                         index=missing.index, crs=lines.crs)
+            joined = gpd.sjoin(endpoints, yards[["SUBSTATION_GLOBALID", "geometry"]], how="inner", predicate="within")
+            joined = joined[~joined.index.duplicated(keep="first")]
+            joined = joined[joined["SUBSTATION_GLOBALID"].values != lines.loc[joined.index, other].values]
+            lines.loc[joined.index, column] = joined["SUBSTATION_GLOBALID"]
 
-            min_distance = np.inf
-            min_index = None
+        return lines
 
-            for ix, other_line in choices.items():
-                distances = [line.boundary[0].distance(other_line.boundary[0]),
-                             line.boundary[0].distance(other_line.boundary[1]),
-                             line.boundary[1].distance(other_line.boundary[0]),
-                             line.boundary[1].distance(other_line.boundary[1])]
 
-                if min(distances) < min_distance:
-                    min_distance = min(distances)
-                    min_index = ix
+    @profiled
+    def connectBrokenLines(self, lines, strict=True):
+        """
+        Certain lines are broken/disconnected.
+        Find these lines and connect them.
 
-            if min_distance < 500:
-                pairs.append(tuple(sorted([index, min_index])))
+        if strict, raise if one line matches to multiple lines or the two
+            lines have different voltages; otherwise skip those pairs.
+        """
+        # get lines that are broken/disconnected
+        # these are those that don't have corresponding substation based on geomatch
+        problematic_lines = lines[lines["SUBSTATION_A_GLOBALID"].isnull() |
+                                    lines["SUBSTATION_B_GLOBALID"].isnull()]
 
-        # dedupe pairs
-        pairs = set(pairs)
+        # find pairs, i.e. lines whose end points are very close to each other
+        # here, defined as less than 500 meters apart
+        # end points of all problematic lines are put in a KD tree
+        pairs = {}
+        if problematic_lines.shape[0] > 1:
+            endpoints = np.array([[x.coords[0], x.coords[-1]] for x in problematic_lines.geometry])
+            endpoints = endpoints[:, :, :2].reshape(-1, 2)
+            owner = np.repeat(np.arange(problematic_lines.shape[0]), 2)
+            tree = cKDTree(endpoints)
+
+            # the 3 nearest end points include the line's own other end at most once
+            distances, neighbors = tree.query(endpoints, k=min(4, len(endpoints)))
+            distances[owner[neighbors] == owner[:, None]] = np.inf
+            best = np.argmin(distances, axis=1)
+            nearest_distance = distances[np.arange(len(endpoints)), best]
+            nearest_owner = owner[neighbors[np.arange(len(endpoints)), best]]
+
+            for i in range(problematic_lines.shape[0]):
+                # the closer of the line's two end points
+                end = 2 * i + np.argmin(nearest_distance[2 * i: 2 * i + 2])
+                if nearest_distance[end] < 500:
+                    pair = tuple(sorted([problematic_lines.index[i], problematic_lines.index[nearest_owner[end]]]))
+                    pairs[pair] = min(pairs.get(pair, np.inf), nearest_distance[end])
 
         # check that there are no duplicates
-        pair_list = list(sum(pairs, ()))
+        pair_list = list(sum(pairs.keys(), ()))
         if any(pair_list.count(x) > 1 for x in pair_list):
-            raise(ValueError("There are duplicated match, i.e. one line matches to multiple lines"))
-
+            if strict:
+                raise(ValueError("There are duplicated match, i.e. one line matches to multiple lines"))
+            # keep closest pairs first
+            used = set()
+            for pair in sorted(pairs, key=pairs.get):
+                if pair[0] in used or pair[1] in used:
+                    del pairs[pair]
+                else:
+                    used.update(pair)
 
         # iterate over the pairs and connect them
+        merged_lines = []
+        merged_pairs = []
+        lineage = []
         for p in pairs:
             line_pairs = lines.loc[list(p)]
-            line_one = lines.loc[list(p)].geometry.to_list()[0]
-            line_two = lines.loc[list(p)].geometry.to_list()[1]
+            line_one = line_pairs.geometry.to_list()[0]
+            line_two = line_pairs.geometry.to_list()[1]
 
             # sanity check whether the two lines have the same voltage
-            voltage_one = lines.loc[list(p)].VOLTAGE.to_list()[0]
-            voltage_two = lines.loc[list(p)].VOLTAGE.to_list()[1]
+            voltage_one = line_pairs.VOLTAGE.to_list()[0]
+            voltage_two = line_pairs.VOLTAGE.to_list()[1]
             if voltage_one != voltage_two:
-                raise(ValueError("Trying to merge two lines with different voltages."))
+                if strict:
+                    raise(ValueError("Trying to merge two lines with different voltages."))
+                continue
 
             # get merged line geometry
-            merged_line = linemerge([lines.loc[p[0]].geometry, lines.loc[p[1]].geometry])
+            merged_line = linemerge([line_one, line_two])
 
             # if not a single line, create a new line segment and weldeverything together
             if not isinstance(merged_line, LineString):
@@ -589,53 +775,69 @@ class PJMSystemMap:
 
                 merged_line = linemerge([line_one, missing_line, line_two])
 
-            # append new line to dataframe
-            lines = lines.append({"LENGTH_KM": line_pairs["LENGTH_KM"].sum(),
-                          "MILES": line_pairs["MILES"].sum(),
-                          "VOLTAGE": voltage_one,
-                          "TRANSMISSION_LINE_GLOBALID": str(uuid.uuid1()),
-                          "geometry": merged_line
-                         }, ignore_index=True, verify_integrity=True)
-
-
-        # iterate over pairs and drop old lines
-        for p in pairs:
-            lines = lines.drop(list(p), axis=0)
+            # new line to be added to dataframe, its id is derived from the ids and geometry
+            # of the two lines so that it is the same across builds
+            parents = list(zip(line_pairs["TRANSMISSION_LINE_GLOBALID"], line_pairs.geometry))
+            merged_id = getMergedLineId(parents, merged_line)
+            merged_lines.append({"LENGTH_KM": line_pairs["LENGTH_KM"].sum(),
+                                 "MILES": line_pairs["MILES"].sum(),
+                                 "VOLTAGE": voltage_one,
+                                 "TRANSMISSION_LINE_GLOBALID": merged_id,
+                                 "geometry": merged_line
+                                })
+            merged_pairs += list(p)
+            lineage += [{"TRANSMISSION_LINE_GLOBALID": merged_id,
+                         "PARENT_GLOBALID": id if getParentKey(id, geometry) == id else np.nan,
+                         "PARENT_KEY": getParentKey(id, geometry)} for id, geometry in parents]
+
+        # drop old lines and add new lines
+        if len(merged_lines) > 0:
+            lines = lines.drop(merged_pairs, axis=0)
+            merged_lines = gpd.GeoDataFrame(merged_lines, columns=lines.columns, crs=lines.crs)
+            lines = gpd.GeoDataFrame(pd.concat([lines, merged_lines], ignore_index=True), crs=lines.crs)
+            # lines merged in several layers have the same id and are recorded once
+            lineage = pd.concat([self.line_lineage, pd.DataFrame(lineage, columns=self.LINEAGE_COLUMNS)],
+                                ignore_index=True)
+            self.line_lineage = lineage.drop_duplicates(subset=["TRANSMISSION_LINE_GLOBALID", "PARENT_KEY"])
 
         # fill missing substations and return
         self.fillMissingSubstations(lines)
         return lines
 
 
+    @profiled
     def fixLineSpecialCases(self, lines):
         """
         fix special cases in lines not covered in above
         """
 
         # this case handles a location deviation
-        index = lines[lines.TRANSMISSION_LINE_GLOBALID == "{2DC162CB-03B3-4F1B-8D22-A55111076626}"].index[0]
-        if lines.loc[index, "SUBSTATION_B_GLOBALID"] is np.nan:
-            lines.loc[index, "SUBSTATION_B_GLOBALID"] = "{DAD21BFC-B3AD-4F0E-9D5E-29DC7769F454}"
+        index = lines[lines.TRANSMISSION_LINE_GLOBALID == "{2DC162CB-03B3-4F1B-8D22-A55111076626}"].index
+        if len(index) > 0 and lines.loc[index[0], "SUBSTATION_B_GLOBALID"] is np.nan:
+            lines.loc[index[0], "SUBSTATION_B_GLOBALID"] = "{DAD21BFC-B3AD-4F0E-9D5E-29DC7769F454}"
             # TODO: this does not connect the line in geometry per se, only change the substation id
 
         return lines
 
 
-    def fillMissingLineLength(self, lines):
+    @profiled
+    def setGeodesicLineLength(self, lines):
         """
-        fill line lengths for those that are missing.
+        set line lengths to the geodesic length of the line geometry, computed
+            in bulk. MILES is converted from LENGTH_KM.
 
-        TODO: currently using shapely's length attributes, which seems to only
-            calculate distance between end points (to be confirmed). Need better
-            way of calculating.
+        LENGTH_KM from the system map is the planar length in the system map
+            projection, about 1/cos(latitude) of the true length, and is
+            missing for some lines. it is kept as published_length_km.
         """
-        for index, row in lines.iterrows():
-            if np.isnan(row["LENGTH_KM"]):
-                lines.loc[index, "LENGTH_KM"] = row["geometry"].length / 1000
+        lines["published_length_km"] = lines["LENGTH_KM"]
+        lines["LENGTH_KM"] = getGeodesicLengths(lines.geometry, self.SYSTEM_MAP_CRS) / 1000
+        lines["MILES"] = lines["LENGTH_KM"] / KM_PER_MILE
 
         return lines
 
 
+    @profiled
     def removeUnconnectedVertices(self, lines):
         """
         check if the lines and substations that form the network is connected.
@@ -648,34 +850,95 @@ class PJMSystemMap:
         pass
 
 
+    @profiled
+    def getTopology(self, lines):
+        """
+        Get topology of lines between substations, with bridges, articulation
+            points and blocks for islanding checks of outages, see topology.py.
+            lines without both substations are left out.
+        """
+        lines = lines.dropna(subset=["SUBSTATION_A_GLOBALID", "SUBSTATION_B_GLOBALID"])
+        return Topology(lines["SUBSTATION_A_GLOBALID"], lines["SUBSTATION_B_GLOBALID"],
+                        lines["TRANSMISSION_LINE_GLOBALID"])
+
+
+    @profiled
     def geoMatchZones(self, df):
         """
         Match substations with PJM planning zone based on geometry
         """
-        # matched substation to zone based on geoemtry
-        zoneGeometryMap = dict(zip(self.pjm_zones["PLANNING_ZONE_NAME"], self.pjm_zones.geometry))
+        # matched substation to zone based on geoemtry, with a spatial join
+        zones = gpd.GeoDataFrame({"zone": self.pjm_zones["PLANNING_ZONE_NAME"].values,
+                                  "zone_order": np.arange(self.pjm_zones.shape[0])},
+                                 geometry=self.pjm_zones.geometry.values, crs=self.pjm_zones.crs)
+        points = gpd.GeoDataFrame(geometry=df.geometry.values, crs=df.crs)
+        joined = gpd.sjoin(points, zones, how="inner", predicate="within")
 
-        # set up a new column for geo-match zone
-        df["geo_matched_zone"] = np.nan
+        # if within multiple zones, the last zone is taken
+        joined = joined.sort_values("zone_order")
+        joined = joined[~joined.index.duplicated(keep="last")]
 
-        # iterate over rows to geo match
-        for index, row in df.iterrows():
-            for zone, geometry in zoneGeometryMap.items():
-                if row["geometry"].within(geometry):
-                    df.loc[index, "geo_matched_zone"] = zone
+        # set up a new column for geo-match zone
+        geo_matched_zone = np.full(df.shape[0], np.nan, dtype=object)
+        geo_matched_zone[joined.index.values] = joined["zone"].values
+        df["geo_matched_zone"] = geo_matched_zone
 
         return df
 
 
-    def matchPnodeWithMapSubstations(self, pnode_list, use_cache=True, only_match_high_confidence=True):
+    @profiled
+    def getTieLines(self, lines):
+        """
+        Get lines whose endpoints are in different planning zones, with the
+            interface between the zones, see interfaces.py.
+
+        endpoint zones are the geo-matched zones of endpoint substations, and
+            for endpoints without one, the zone of the line end from a spatial
+            join of line ends to zones. line ends are oriented to A and B by
+            the substation points at either end.
+        """
+        lines = lines.reset_index(drop=True)
+        entities = self.getSubstationEntities()
+        zones = entities.getEndpointAttributes(lines, ["geo_matched_zone"])
+        zones.columns = ["zone_A", "zone_B"]
+        missing = zones.isnull().any(axis=1).values
+        if missing.any():
+            # substation points at both ends, none for labels without a point
+            positions = entities.getEndpointAttributes(lines[missing], ["substation_position"])
+            points = [gpd.GeoSeries(self.all_substations_and_taps.geometry.values.take(
+                          positions[x].fillna(-1).astype(np.int64).values, allow_fill=True),
+                          crs=self.all_substations_and_taps.crs) for x in positions.columns]
+            ends = getEndpointZones(lines[missing], self.pjm_zones, points_a=points[0], points_b=points[1])
+            zones.loc[missing] = zones[missing].fillna(ends).values
+
+        return findTieLines(lines["TRANSMISSION_LINE_GLOBALID"], zones["zone_A"], zones["zone_B"], lines["VOLTAGE"])
+
+
+    def getInterfaceAggregator(self, lines, tie_lines=None):
+        """
+        Get sparse aggregation of flows of lines into interface flows, e.g.
+            aggregate(flows) of OPF line flows with a row per hour.
+        """
+        if tie_lines is None:
+            tie_lines = self.getTieLines(lines)
+        return InterfaceAggregator(tie_lines, lines["TRANSMISSION_LINE_GLOBALID"])
+
+
+    @profiled
+    def matchPnodeWithMapSubstations(self, pnode_list, use_cache=True, only_match_high_confidence=True,
+                                     incremental=False):
         """
         Match PJM Pnode list with substations from PJM system map.
         Matching is mostly based on levenshtein distance of names.
+        Only the labels most similar by trigrams are scored, see NameIndex.
         Weighted levenshtein distance and same-zone check are also used to ensure high match confidence.
 
         If use_cache is set to true, function will look for and load previous calculated data.
         If only_match_high_confidence is set to true, function will only return matches that it has
             high confidence are true matches.
+        If incremental is set to true, matches of the previous run are carried forward where
+            the pnode substation and the substation label are unchanged, and matching rounds
+            are only run for the remaining pnode substations against unclaimed labels.
         """
 
         # set up weighted levenshtein score
@@ -699,9 +962,11 @@ class PJMSystemMap:
 
         # set up file path to cache data
         cacheDataPath = os.path.join(self.CACHE_DATA_DIRECTORY, "pnode_substation_match.pkl")
+        # all matches with their zones, scores and rounds, used by incremental matching
+        fullCacheDataPath = os.path.join(self.CACHE_DATA_DIRECTORY, "pnode_substation_match_full.pkl")
 
         # get match dataframe
-        if use_cache and os.path.exists(cacheDataPath):
+        if use_cache and os.path.exists(cacheDataPath) and not incremental:
             match = pd.read_pickle(cacheDataPath)
 
         else:
@@ -710,10 +975,25 @@ class PJMSystemMap:
             substation_labels["NAME"] = substation_labels["NAME"].astype(str).apply(lambda x: re.sub(r'[^\w]', '', x))
 
             # initialize dictionaries and lists
-            yet_to_be_matched_sublabels = substation_labels.SUBSTATION_GLOBALID.to_list()
+            yet_to_be_matched_sublabels = set(substation_labels.SUBSTATION_GLOBALID)
             yet_to_be_matched_nodes = pnode_list.groupby("substation")["zone"].unique().to_dict()
             mapping = {}
 
+            # carry forward previous matches
+            if incremental and os.path.exists(fullCacheDataPath):
+                mapping = self.getCarriedPnodeMatches(pd.read_pickle(fullCacheDataPath), substation_labels,
+                                                      yet_to_be_matched_nodes)
+                for name, (sub_name, zone, sub_id, score, index) in mapping.items():
+                    yet_to_be_matched_sublabels.remove(sub_id)
+                    del yet_to_be_matched_nodes[name]
+
+            # candidates of each name are the unclaimed labels most similar by trigrams
+            name_index = NameIndex(makeNameRecords(substation_labels, "NAME", "SUBSTATION_GLOBALID",
+                                                   ["PLANNING_ZONE_NAME", "geo_matched_zone"]))
+            label_ids = name_index.columns["id"]
+            label_names = name_index.columns["name"]
+            unclaimed = np.isin(label_ids, list(yet_to_be_matched_sublabels))
+
             # set up parameters for iterations
             matching_iterations = {
                 1: {"threshold": 100, "zone_check": True, "weighted_levenshtein": False, "description": "exact match in same zone"},
@@ -733,27 +1013,17 @@ class PJMSystemMap:
 
                     zone = yet_to_be_matched_nodes[name]
 
-                    tmp_sub_labels = substation_labels[substation_labels.SUBSTATION_GLOBALID.isin(yet_to_be_matched_sublabels)]
-
-                    # zone check
-                    if params["zone_check"]:
-                        tmp_sub_labels = tmp_sub_labels[(tmp_sub_labels["PLANNING_ZONE_NAME"].isin(zone)) | (tmp_sub_labels["geo_matched_zone"].isin(zone))]
+                    # preprocessing
+                    tmp_name = stripZonePrefix(name, zone)
 
-                    # TODO: the fix below is temporary to avoid exception
-                    if tmp_sub_labels.shape[0] == 0:
+                    # candidates, in the same zone if zone check, in order of labels
+                    positions, _ = name_index.search(tmp_name, k=self.MATCH_CANDIDATES,
+                                                     zones=zone if params["zone_check"] else None, within=unclaimed)
+                    if len(positions) == 0:
                         continue
+                    positions = np.sort(positions)
 
-                    # preprocessing
-                    if ("ComEd" in zone) and bool(re.match(r"^\d+\s+(\w+)$", name)):
-                        # COMED's naming convention makes it difficult, and need to be handled separately
-                        tmp_name = re.search(r"^\d+\s+(\w+)$", name).group(1)
-                    elif (("ATSI" in zone) or ("DEOK" in zone) or ("Dayton" in zone)) and bool(re.match(r"^\d+(\w+)$", name)):
-                         # ATSI, DEOK, and Dayton have naming convention that starts with digits, which make matching difficult
-                        tmp_name = re.search(r"^\d+(\w+)$", name).group(1)
-                    else:
-                        tmp_name = name
-
-                    choices = tmp_sub_labels["NAME"].dropna().to_list() # TODO: currently dropping nan, considering replacing with "", i.e. empty string
+                    choices = list(label_names[positions])
 
                     if params["weighted_levenshtein"]:
                         tmp_name = tmp_name.replace("_", "")
@@ -768,22 +1038,30 @@ class PJMSystemMap:
                     if params["weighted_levenshtein"] and match[1] > threshold:
                         continue
 
-                    # get substation id and name from substation_labels
-                    sub_id = tmp_sub_labels[tmp_sub_labels.NAME == match[0]]["SUBSTATION_GLOBALID"].values[0]
-                    sub_name = tmp_sub_labels[tmp_sub_labels.NAME == match[0]]["NAME"].values[0]
+                    # get substation id and name of the first candidate of the match
+                    position = positions[choices.index(match[0])]
+                    sub_id = label_ids[position]
+                    sub_name = label_names[position]
 
                     # add to dictionary
                     mapping[name] = (sub_name, zone, sub_id, match[1], index)
 
                     # remove from list and dicionaries
-                    yet_to_be_matched_sublabels.remove(sub_id)
+                    unclaimed &= label_ids != sub_id
                     del yet_to_be_matched_nodes[name]
 
             # get result
-            match = pd.DataFrame(mapping).T
+            # columns are named so that there are columns without any match too
+            columns = ["pnode_substation_name", "system_map_substation_name", "pnode_zone",
+                       "system_map_substation_id", "match_score", "match_round"]
+            match = pd.DataFrame(mapping, index=columns[1:]).T
             match = match.reset_index()
-            match.columns = ["pnode_substation_name", "system_map_substation_name", "pnode_zone",
-                                "system_map_substation_id", "match_score", "match_round"]
+            match.columns = columns
+
+            # save all matches for incremental matching
+            if not os.path.exists(self.CACHE_DATA_DIRECTORY):
+                os.makedirs(self.CACHE_DATA_DIRECTORY)
+            match.to_pickle(fullCacheDataPath)
 
             # select subset
             if only_match_high_confidence:
@@ -806,6 +1084,31 @@ class PJMSystemMap:
         return pnode_list
 
 
+    def getCarriedPnodeMatches(self, previous, substation_labels, nodes):
+        """
+        get previous matches that still hold, i.e. whose pnode substation is in nodes
+            with the same zones and whose substation label has the same name.
+
+        previous is a full match table of matchPnodeWithMapSubstations, nodes is a dictionary
+            of pnode substation to zones. return dictionary of pnode substation to
+            (substation name, zones, substation id, score, round).
+        """
+        labels = substation_labels.drop_duplicates(subset=["SUBSTATION_GLOBALID"])
+        labels = labels.set_index("SUBSTATION_GLOBALID")["NAME"]
+
+        carried = {}
+        for row in previous.itertuples(index=False):
+            zone = nodes.get(row.pnode_substation_name)
+            if zone is None or set(zone) != set(row.pnode_zone):
+                continue
+            if labels.get(row.system_map_substation_id) != row.system_map_substation_name:
+                continue
+            carried[row.pnode_substation_name] = (row.system_map_substation_name, zone, row.system_map_substation_id,
+                                                  row.match_score, row.match_round)
+        return carried
+
+
+    @profiled
     def getLineEquipList(self, use_cache=True):
         """
         get lines in equiplist with rating information.
@@ -910,6 +1213,105 @@ class PJMSystemMap:
             return line_equiplist
 
 
+    def loadOasisEquipList(self, equipment_type):
+        """
+        load OASIS equipment list of a given type, e.g. LINE or XFMR.
+        """
+        filePath = os.path.join(self.OASIS_DATA_DIRECTORY, "equiplist_{}.csv".format(equipment_type))
+        equiplist = pd.read_csv(filePath, encoding="utf-8-sig")
+        equiplist["VOLTAGE"] = equiplist["VOLTAGE"].apply(lambda x: float(x.replace("KV", "")))
+        return equiplist
+
+
+    def getBranchResolver(self, lines, fuzzy_threshold=85):
+        """
+        get resolver from (station, station, voltage) to map lines and
+            equiplist lines and transformers.
+
+        map lines are named by the substation labels of both ends and keyed
+            by TRANSMISSION_LINE_GLOBALID; equiplist entries are keyed by
+            type, company, station, voltage and name.
+        """
+        resolver = BranchResolver(fuzzy_threshold=fuzzy_threshold)
+
+        # map lines
+        names = self.getSubstationEntities().getEndpointAttributes(lines, ["label_name"])
+        resolver.addElements(lines["TRANSMISSION_LINE_GLOBALID"],
+                             names["label_name_SUBSTATION_A"],
+                             names["label_name_SUBSTATION_B"],
+                             lines["VOLTAGE"], source="system_map")
+
+        # equiplist lines and transformers
+        for equipment_type in ["LINE", "XFMR"]:
+            equiplist = self.loadOasisEquipList(equipment_type)
+            stations = parseEquipListBranches(equiplist)
+            resolver.addElements(equipListElementIds(equiplist),
+                                 stations["station_a"], stations["station_b"],
+                                 equiplist["VOLTAGE"], source="equiplist")
+
+        return resolver
+
+
+    def getRatingTable(self):
+        """
+        get temperature and day/night dependent ratings from ratings.csv.
+
+        equipment is looked up by description, i.e. equiplist LONG NAME, e.g.
+            table.interpolate(table.lookup(long_names), temperatures, is_day)
+            returns an (equipment, hours) array of ratings.
+        """
+        filePath = os.path.join(self.CACHE_DATA_DIRECTORY, "ratings.csv")
+        ratings = pd.read_csv(filePath)
+        return RatingTable(ratings)
+
+
+    def getLocationIndex(self, use_cache=True):
+        """
+        get zip code and state lookup of pnodes, zones and map substations.
+
+        zip-code-mapping.xls and pnode-by-state.xls are ingested once and
+            cached as compact tables.
+        """
+        tables = {"zip_code_mapping": ("zip-code-mapping.xls", ingestZipCodeMapping),
+                  "pnode_by_state": ("pnode-by-state.xls", ingestPnodeByState)}
+
+        ingested = {}
+        for name, (inputFileName, ingest) in tables.items():
+            cacheDataPath = os.path.join(self.CACHE_DATA_DIRECTORY, name + ".pkl")
+            if use_cache and os.path.exists(cacheDataPath):
+                ingested[name] = pd.read_pickle(cacheDataPath)
+            else:
+                ingested[name] = ingest(os.path.join(self.DATA_DIRECTORY, inputFileName))
+                if not os.path.exists(self.CACHE_DATA_DIRECTORY):
+                    os.makedirs(self.CACHE_DATA_DIRECTORY)
+                ingested[name].to_pickle(cacheDataPath)
+
+        return LocationIndex(ingested["zip_code_mapping"], ingested["pnode_by_state"], self.pnode_list)
+
+
+    def getNameIndex(self, equiplist=True):
+        """
+        get fuzzy search index of substation label names and, if equiplist,
+            OASIS equiplist station names.
+
+        labels are filtered by planning, geo matched or commercial zone,
+            equiplist stations by zone, e.g.
+            index.query("BRIDGEPORT", k=5, zones=["AE"], min_voltage=230)
+        """
+        labels = self.all_substation_labels
+        records = [makeNameRecords(labels, "NAME", "SUBSTATION_GLOBALID",
+                                   ["PLANNING_ZONE_NAME", "geo_matched_zone", "COMMERCIAL_ZONE"], "VOLTAGE",
+                                   source="substation_labels")]
+        if equiplist:
+            for equipment_type in ["LINE", "XFMR"]:
+                stations = self.loadOasisEquipList(equipment_type)
+                stations = stations.drop_duplicates(subset=["ZONE", "STATION", "VOLTAGE"])
+                records.append(makeNameRecords(stations, "STATION", None, ["ZONE"], "VOLTAGE",
+                                               source="equiplist_{}".format(equipment_type)))
+        return NameIndex(pd.concat(records, ignore_index=True))
+
+
+    @profiled
     def getLineRatings(self, lines, use_cache=True):
         """
         get line ratings for the lines dataframe
@@ -920,19 +1322,14 @@ class PJMSystemMap:
         # get line equiplist with rating and substation information
         line_equiplist = self.getLineEquipList(use_cache)
 
-        # merge lines and substations to produce a new dataframe
-        lines_tmp = lines[["TRANSMISSION_LINE_GLOBALID",
-                            "SUBSTATION_A_GLOBALID",
-                            "SUBSTATION_B_GLOBALID",
-                            "VOLTAGE"]]
-        sub_tmp = self.all_substation_labels[["NAME", "SUBSTATION_GLOBALID"]] # TODO: should this be all_substation_labels or all_substations_and_taps? which one is better?
-        line_sub = pd.merge(lines_tmp, sub_tmp, how="left",
-                            left_on="SUBSTATION_A_GLOBALID", right_on="SUBSTATION_GLOBALID",
-                            suffixes=("_LINE", "_SUBSTATION_A"))
-        line_sub = pd.merge(line_sub, sub_tmp, how="left",
-                            left_on="SUBSTATION_B_GLOBALID", right_on="SUBSTATION_GLOBALID",
-                            suffixes=("_SUBSTATION_A", "_SUBSTATION_B"))
-        line_sub = line_sub.drop(columns=["SUBSTATION_GLOBALID_SUBSTATION_A", "SUBSTATION_GLOBALID_SUBSTATION_B"])
+        # label names of line endpoints, taken from substation entities
+        line_sub = lines[["TRANSMISSION_LINE_GLOBALID",
+                          "SUBSTATION_A_GLOBALID",
+                          "SUBSTATION_B_GLOBALID",
+                          "VOLTAGE"]].reset_index(drop=True)
+        names = self.getSubstationEntities().getEndpointAttributes(line_sub, ["label_name"])
+        line_sub["NAME_SUBSTATION_A"] = names["label_name_SUBSTATION_A"].values
+        line_sub["NAME_SUBSTATION_B"] = names["label_name_SUBSTATION_B"].values
 
         # match system map with equiplist based on substation names
         # initialize dictionaries and lists
@@ -952,6 +1349,10 @@ class PJMSystemMap:
             # initialize lists to track which line has been matched and which has not
             yet_to_be_matched_map_lines = dict(zip(tmp_lines["TRANSMISSION_LINE_GLOBALID"], tmp_lines["NAME_SUBSTATION_A"] + " " + tmp_lines["NAME_SUBSTATION_B"]))
             yet_to_be_matched_equiplist_lines = dict(zip(tmp_line_equiplist["cleaned_long_name"], tmp_line_equiplist["day_normal"]))
+            # candidates of each line are the unmatched equiplist lines most similar by trigrams
+            name_index = NameIndex(makeNameRecords(pd.DataFrame({"name": list(yet_to_be_matched_equiplist_lines)}), "name"))
+            equiplist_names = name_index.columns["name"]
+            unmatched = np.ones(len(name_index), dtype=bool)
 
             # iterate over different thresholds for fuzzy match
             # the idea is to match high confidence first, then gradually decrease to lower threshold
@@ -959,12 +1360,20 @@ class PJMSystemMap:
             for threshold in [90, 80, 70, 60, 50, 40, 0]:
                 # iterate over lines to be matched
                 for line_id in list(yet_to_be_matched_map_lines):
+                    # stop once equiplist lines of this voltage run out, e.g. for all_lines
+                    if not unmatched.any():
+                        break
                     line_name = yet_to_be_matched_map_lines[line_id]
                     # TODO: skip if nan
                     if line_name is np.nan:
                         continue
-                    # do matching
-                    match = process.extractOne(line_name, yet_to_be_matched_equiplist_lines.keys(), scorer=fuzz.WRatio)
+                    # do matching among candidates, in order of equiplist lines
+                    positions, _ = name_index.search(line_name, k=self.MATCH_CANDIDATES, within=unmatched)
+                    if len(positions) == 0:
+                        continue
+                    positions = np.sort(positions)
+                    choices = list(equiplist_names[positions])
+                    match = process.extractOne(line_name, choices, scorer=fuzz.WRatio)
                     # if match score passes thresholld, record, if not, continue
                     if match[1] > threshold:
                         # add to dictionary
@@ -972,14 +1381,19 @@ class PJMSystemMap:
                         # remove from list and dicionaries
                         del yet_to_be_matched_map_lines[line_id]
                         del yet_to_be_matched_equiplist_lines[match[0]]
+                        unmatched[positions[choices.index(match[0])]] = False
 
         # make dataframe
-        line_rating_map = pd.DataFrame(mapping).T
+        # columns are named so that there are columns without any match too
+        columns = ["line_id", "line_sytem_map_name", "line_equiplist_name", "match_confidence", "line_rating"]
+        line_rating_map = pd.DataFrame(mapping, index=columns[1:]).T
         line_rating_map = line_rating_map.reset_index()
-        line_rating_map.columns = ["line_id", "line_sytem_map_name", "line_equiplist_name", "match_confidence", "line_rating"]
+        line_rating_map.columns = columns
 
         # TODO: currently only choose high confidence match
         line_rating_map = line_rating_map[line_rating_map.match_confidence >= 80]
+        # with compact dtypes, join on surrogate keys
+        line_rating_map = line_rating_map.astype({"line_id": lines["TRANSMISSION_LINE_GLOBALID"].dtype})
 
         # merge line_rating with system map
         lines = pd.merge(lines, line_rating_map,
@@ -1002,77 +1416,105 @@ class PJMSystemMap:
         return lines
 
 
+    @profiled
     def getLineSubstationsTaps(self, lines):
         """
         Get substations that are in the lines dataframe.
         """
         # print out substations in lines that are not in substations or taps
-        for x in lines.SUBSTATION_A_GLOBALID.unique():
-            if x not in self.all_substations_and_taps.SUBSTATION_GLOBALID.unique():
-                print("This substation is cannot be found in substations and taps: {}".fomrat(x))
-        for x in lines.SUBSTATION_B_GLOBALID.unique():
-            if x not in self.all_substations_and_taps.SUBSTATION_GLOBALID.unique():
-                print("This substation is cannot be found in substations and taps: {}".fomrat(x))
+        for x in self.getLineIntegrityReport(lines)["SUBSTATION_GLOBALID"]:
+            print("This substation is cannot be found in substations and taps: {}".format(x))
 
         # get substations that exist in lines
-        substations = self.all_substations_and_taps[
-                        self.all_substations_and_taps["SUBSTATION_GLOBALID"].isin(lines["SUBSTATION_A_GLOBALID"]) |
-                        self.all_substations_and_taps["SUBSTATION_GLOBALID"].isin(lines["SUBSTATION_B_GLOBALID"])
-                        ].copy(deep=True) # TODO: does it need to be a deep copy?
+        positions = self.getSubstationEntities().getLineSubstationPositions(lines)
+        substations = self.all_substations_and_taps.iloc[positions].copy(deep=True) # TODO: does it need to be a deep copy?
 
         return substations
 
-    # def getTransformerRatings(self, lines):
-    #     """
-    #     Get transformer ratings for substations in the lines dataframe.
-    #
-    #     TODO: currently assume all transfomrer are 2000 MVA rating.
-    #         understand better how transformer ratings work and implement
-    #         rating from ratings.txt
-    #     """
-    #     # # load equipment list
-    #     # filePath = os.path.join(self.OTHER_DATA_DIRECTORY, "equiplist.csv")
-    #     # equiplist = pd.read_csv(filePath, skiprows=1)
-    #     # equiplist["VOLTAGE"] = equiplist["VOLTAGE"].apply(lambda x: float(x.replace("KV", "")))
-    #     # xfmr_equiplist = equiplist[equiplist["TYPE"] == "XFMR"].copy()
-    #     #
-    #     # # load ratings
-    #     # filePath = os.path.join(self.CACHE_DATA_DIRECTORY, "ratings.csv")
-    #     # ratings = pd.read_csv(filePath)
-    #     #
-    #     # # merge equiplist with ratings
-    #     # # TODO: currently averaging line rating over different conditions, consider improving this in the future
-    #     # ratings = ratings.groupby(["company", "substation", "voltage", "device", "end", "description"]).mean()
-    #     # ratings = ratings[["day_normal"]]
-    #     # line_equiplist = pd.merge(line_equiplist, ratings, left_on="LONG NAME", right_on="description", how="left")
-    #
-    #     # figure out where transformers should be based on line infomration
-    #     # transfomrer should be where there is a voltage change
-    #     where_xfmr_should_be = {}
-    #
-    #     substation_line_voltage = pd.concat([lines[["SUBSTATION_A_GLOBALID", "VOLTAGE"]].rename(columns={"SUBSTATION_A_GLOBALID": "SUBSTATION_GLOBALID"}),
-    #                                          lines[["SUBSTATION_B_GLOBALID", "VOLTAGE"]].rename(columns={"SUBSTATION_B_GLOBALID": "SUBSTATION_GLOBALID"})])
-    #
-    #     for index, value in substation_line_voltage.groupby("SUBSTATION_GLOBALID")["VOLTAGE"].unique().iteritems():
-    #         if len(value) > 1:
-    #             where_xfmr_should_be[index] = value
-    #
-    #
-    #     xformer_rating = {"SUBSTATION_GLOBALID":[], "rating": []}
-    #
-    #     for key, value in where_xfmr_should_be.items():
-    #         xformer_rating["SUBSTATION_GLOBALID"].append(key)
-    #         xformer_rating["rating"].append(2000.0)
-    #
-    #     xformer_rating = pd.DataFrame(xformer_rating)
-    #
-    #     return xformer_rating
 
+    def getLineIntegrityReport(self, lines):
+        """
+        get line endpoints that cannot be found in substations and taps.
+
+        return DataFrame of endpoint column and SUBSTATION_GLOBALID.
+        """
+        return getIntegrityReport(self.substation_index, lines,
+                                  ["SUBSTATION_A_GLOBALID", "SUBSTATION_B_GLOBALID"],
+                                  name="SUBSTATION_GLOBALID")
 
+    @profiled
+    def getTransformers(self, lines, s_nom_default=2000.0):
+        """
+        Get PyPSA-ready transformers at substations of lines, the buses of
+            the voltage levels they tie together and the buses of lines.
+
+        transformers come from the OASIS XFMR equipment list, with ratings
+            joined from ratings.csv if it has been parsed. equiplist stations
+            are attached to map substations through the pnode match.
+        transformers without a rating are assumed to be s_nom_default MVA.
+        exported buses are named by SUBSTATION_KEY, one per substation of
+            lines. voltage levels tied to them by transformers get buses of
+            their own, named e.g. "69759_138", and lines at those levels are
+            re-pointed to them, see tieVoltageLevels.
+
+        return transformers, GeoDataFrame of the buses of voltage levels and
+            DataFrame of TRANSMISSION_LINE_GLOBALID, bus0 and bus1 of lines
+            whose substations are both known.
+        """
+        xfmr_equiplist = self.loadOasisEquipList("XFMR")
+        line_equiplist = self.loadOasisEquipList("LINE")
+
+        # load ratings if they have been parsed
+        filePath = os.path.join(self.CACHE_DATA_DIRECTORY, "ratings.csv")
+        ratings = pd.read_csv(filePath) if os.path.exists(filePath) else None
+
+        inventory = getTransformerInventory(xfmr_equiplist, line_equiplist, ratings)
+
+        # equiplist stations share names with pnode substations of the same zone
+        station_substations = self.pnode_list[["zone", "substation", "system_map_substation_id"]]
+        station_substations.columns = ["zone", "STATION", "SUBSTATION_GLOBALID"]
+
+        # exported buses, one per substation of lines
+        substations = self.getLineSubstationsTaps(lines)
+        substations["name"] = substations["SUBSTATION_KEY"].astype(str)
+        substations["voltage"] = substations["VOLTAGE"]
+        substation_buses = substations[["SUBSTATION_GLOBALID", "name", "VOLTAGE"]].rename(columns={"name": "bus"})
+        transformers = makePyPSATransformers(inventory, station_substations, substation_buses,
+                                             s_nom_default=s_nom_default)
+
+        # lines between exported buses
+        keys = substation_buses.set_index("SUBSTATION_GLOBALID")["bus"]
+        line_buses = pd.DataFrame({"TRANSMISSION_LINE_GLOBALID": lines["TRANSMISSION_LINE_GLOBALID"].values,
+                                   "bus0": lines["SUBSTATION_A_GLOBALID"].map(keys).values,
+                                   "bus1": lines["SUBSTATION_B_GLOBALID"].map(keys).values,
+                                   "VOLTAGE": lines["VOLTAGE"].values}).dropna(subset=["bus0", "bus1"])
+
+        transformers, line_buses = tieVoltageLevels(transformers, line_buses, substations.set_index("name")["voltage"])
+        transformers, buses = makePyPSATransformerBuses(transformers, substations)
+        buses = gpd.GeoDataFrame(buses, geometry="geometry", crs=substations.crs)
+        return transformers, buses, line_buses.drop(columns=["VOLTAGE"]).reset_index(drop=True)
+
+
+    @profiled
+    def getSubstationLoadAllocation(self, lines, method="equal", population=None):
+        """
+        Get allocation of zonal load to substations in the lines dataframe.
+
+        method is one of equal, area or population (see load.py). hourly
+            bus load is then allocation.allocate(zonal_load), where zonal_load
+            has planning zone names as columns.
+        """
+        substations = self.getLineSubstationsTaps(lines)
+        return getLoadAllocation(substations, self.pjm_zones, method=method, population=population)
+
+
+    @profiled
     def matchEIAPlantWithLineSubstationsTaps(self, lines):
         """
         match EIA plant to substations and taps in lines.
-        matching is based on distance.
+        plants are joined to pnodes by their RTO/ISO LMP Node Designation, see
+        pnode_designation.py, and matched to the substation of the pnode if it is
+        in lines. remaining plants are matched by distance.
 
         TODO: currently match to taps as well. revisit if it doesn't make sense
             to do so.
@@ -1085,17 +1527,71 @@ class PJMSystemMap:
 
         # get substations that exist in lines
         substations = self.getLineSubstationsTaps(lines)
+        plants = self.eia_plant
+
+        # join plants to pnodes and their substations in lines
+        plants["Nearest_Substations"] = np.nan
+        plants["pnode_id"] = np.nan
+        plants["substation_match"] = np.nan
+        pnode_list = getattr(self, "pnode_list", None)
+        if pnode_list is not None and "system_map_substation_id" in pnode_list.columns:
+            joined = matchDesignations(plants["RTO/ISO LMP Node Designation"], pnode_list)
+            found = (joined["pnode_position"] >= 0).values
+            positions = joined["pnode_position"].values[found]
+            plants.loc[found, "pnode_id"] = pnode_list["pnode_id"].values[positions]
+
+            substation_ids = pnode_list["system_map_substation_id"].values[positions]
+            in_lines = IdIndex(substations["SUBSTATION_GLOBALID"]).contains(substation_ids)
+            matched = found.copy()
+            matched[found] = in_lines
+            plants.loc[matched, "Nearest_Substations"] = substation_ids[in_lines]
+            plants.loc[matched, "substation_match"] = joined["pnode_match"].values[matched]
+
+        # match remaining plants to nearest substations
+        remaining = plants["Nearest_Substations"].isnull().values
+        if remaining.any():
+            tree = cKDTree(np.column_stack([substations.geometry.x, substations.geometry.y]))
+            distances, positions = tree.query(np.column_stack([plants.geometry.x.values[remaining],
+                                                               plants.geometry.y.values[remaining]]))
+            plants.loc[remaining, "Nearest_Substations"] = substations["SUBSTATION_GLOBALID"].values[positions]
+            plants.loc[remaining, "substation_match"] = "nearest"
 
-        # match plants to nearest substations
-        # unary union of the gpd2 geomtries
-        gpd1 = self.eia_plant
-        gpd2 = substations
+        return plants
 
-        pts3 = gpd2.geometry.unary_union
-        def near(point, pts=pts3):
-            nearest = gpd2.geometry == nearest_points(point, pts)[1]
-            return gpd2[nearest]["SUBSTATION_GLOBALID"].values[0]
 
-        gpd1['Nearest_Substations'] = np.nan
-        for index, row in gpd1.iterrows():
-            gpd1.loc[index, 'Nearest_Substations'] = near(row["geometry"])
+    @profiled
+    def matchQueueWithLineSubstationsTaps(self, lines, queue=None, previous=None):
+        """
+        match planning queue projects to zones and the nearest substations
+            and taps in lines. matching is based on location only.
+
+        previous is an earlier result; projects at locations matched there
+            reuse its match, so only new or moved projects are matched.
+        """
+        if queue is None:
+            queue = self.planning_queue
+        queue = queue.copy()
+        columns = ["geo_matched_zone", "nearest_substation", "nearest_substation_distance"]
+
+        # projects are keyed by location
+        queue["location_key"] = getGeometryKeys(queue.geometry)
+        matched = pd.DataFrame(columns=["location_key"] + columns)
+        if previous is not None:
+            matched = previous[["location_key"] + columns].drop_duplicates(subset=["location_key"])
+            matched = matched[matched["location_key"].isin(queue["location_key"])]
+        new = queue[~queue["location_key"].isin(matched["location_key"])]
+        new = new[["location_key", "geometry"]].drop_duplicates(subset=["location_key"]).reset_index(drop=True)
+
+        if new.shape[0] > 0:
+            new = self.geoMatchZones(gpd.GeoDataFrame(new, geometry="geometry", crs=queue.crs))
+
+            # nearest substation or tap in lines
+            substations = self.getLineSubstationsTaps(lines)
+            tree = cKDTree(np.column_stack([substations.geometry.x, substations.geometry.y]))
+            distances, positions = tree.query(np.column_stack([new.geometry.x, new.geometry.y]))
+            new["nearest_substation"] = substations["SUBSTATION_GLOBALID"].values[positions]
+            new["nearest_substation_distance"] = distances
+            matched = pd.concat([matched, pd.DataFrame(new[["location_key"] + columns])], ignore_index=True)
+
+        queue = queue.drop(columns=[x for x in columns if x in queue.columns])
+        return queue.merge(matched, on="location_key", how="left")
@@ -11,18 +11,18 @@ class PJMSystemMapTest(unittest.TestCase):
 
     def testBackboneLinesGetter(self):
         backbone_lines = self.dataLoader.getPJMBackboneLines()
-        self.assertEqual(backbone_lines.shape, (726, 16))
+        self.assertEqual(backbone_lines.shape, (726, 17))
         columns = ['COMPANY_ID', 'LENGTH_KM', 'LINE_ID', 'MEMBER', 'MILES', 'NAME',
                     'SUBSTATION_A_GLOBALID', 'SUBSTATION_B_GLOBALID', 'SYM_CODE',
                     'TO_LINE_NAME', 'TRANSMISSION_LINE_GLOBALID', 'VOLTAGE', 'SHAPE',
-                    'TRANSMISSION_LINE_KEY', 'ESRI_OID', 'geometry']
+                    'TRANSMISSION_LINE_KEY', 'ESRI_OID', 'geometry', 'published_length_km']
         for i, x in enumerate(columns):
             self.assertEqual(backbone_lines.columns[i], x)
 
         dtypes = ['object', 'float64', 'object', 'object', 'float64', 'object',
                     'object', 'object', 'object',
                     'object', 'object', 'float64', 'object',
-                    'object', 'object', 'geometry']
+                    'object', 'object', 'geometry', 'float64']
 
         for i, x in enumerate(backbone_lines.dtypes):
             self.assertEqual(dtypes[i], x)
@@ -50,18 +50,18 @@ class PJMSystemMapTest(unittest.TestCase):
     def testGetLineRatings(self):
         # check before calling getLineRatings()
         backbone_lines = self.dataLoader.getPJMBackboneLines()
-        self.assertEqual(backbone_lines.shape, (726, 16))
+        self.assertEqual(backbone_lines.shape, (726, 17))
         columns = ['COMPANY_ID', 'LENGTH_KM', 'LINE_ID', 'MEMBER', 'MILES', 'NAME',
                     'SUBSTATION_A_GLOBALID', 'SUBSTATION_B_GLOBALID', 'SYM_CODE',
                     'TO_LINE_NAME', 'TRANSMISSION_LINE_GLOBALID', 'VOLTAGE', 'SHAPE',
-                    'TRANSMISSION_LINE_KEY', 'ESRI_OID', 'geometry']
+                    'TRANSMISSION_LINE_KEY', 'ESRI_OID', 'geometry', 'published_length_km']
         for i, x in enumerate(columns):
             self.assertEqual(backbone_lines.columns[i], x)
 
         dtypes = ['object', 'float64', 'object', 'object', 'float64', 'object',
                     'object', 'object', 'object',
                     'object', 'object', 'float64', 'object',
-                    'object', 'object', 'geometry']
+                    'object', 'object', 'geometry', 'float64']
 
         for i, x in enumerate(backbone_lines.dtypes):
             self.assertEqual(dtypes[i], x)
@@ -69,11 +69,11 @@ class PJMSystemMapTest(unittest.TestCase):
         backbone_lines = self.dataLoader.getLineRatings(backbone_lines)
 
         # check after calling getLineRatings()
-        self.assertEqual(backbone_lines.shape, (726, 21))
+        self.assertEqual(backbone_lines.shape, (726, 22))
         columns = ['COMPANY_ID', 'LENGTH_KM', 'LINE_ID', 'MEMBER', 'MILES', 'NAME',
                     'SUBSTATION_A_GLOBALID', 'SUBSTATION_B_GLOBALID', 'SYM_CODE',
                     'TO_LINE_NAME', 'TRANSMISSION_LINE_GLOBALID', 'VOLTAGE', 'SHAPE',
-                    'TRANSMISSION_LINE_KEY', 'ESRI_OID', 'geometry',
+                    'TRANSMISSION_LINE_KEY', 'ESRI_OID', 'geometry', 'published_length_km',
                     'line_id', 'line_sytem_map_name', 'line_equiplist_name',
                     'match_confidence', 'line_rating']
         for i, x in enumerate(columns):
@@ -82,7 +82,7 @@ class PJMSystemMapTest(unittest.TestCase):
         dtypes = ['object', 'float64', 'object', 'object', 'float64', 'object',
                     'object', 'object', 'object',
                     'object', 'object', 'float64', 'object',
-                    'object', 'object', 'geometry',
+                    'object', 'object', 'geometry', 'float64',
                     'object', 'object', 'object',
                     'float64', 'float64']
 
@@ -139,7 +139,7 @@ class PJMSystemMapTest(unittest.TestCase):
             self.assertEqual(pjm_zones.columns[i], x)
 
         dtypes = ['object', 'object', 'object', 'object',
-                    'object', 'object', 'geometry']
+                    'object', 'object', 'geometry', 'float64']
 
         for i, x in enumerate(pjm_zones.dtypes):
             self.assertEqual(dtypes[i], x)
@@ -255,7 +255,7 @@ class PJMSystemMapTest(unittest.TestCase):
         lines = self.dataLoader.getPJMBackboneLines()
         self.dataLoader.matchEIAPlantWithLineSubstationsTaps(lines)
 
-        self.assertEqual(plant.shape, (3373, 22))
+        self.assertEqual(plant.shape, (3373, 24))
         columns = ['Plant Code', 'Plant Name', 'Street Address', 'City', 'County', 'State',
                     'Voltages', 'Balancing Authority Name',
                     'Transmission or Distribution System Owner', 'Generator ID',
@@ -264,7 +264,7 @@ class PJMSystemMapTest(unittest.TestCase):
                     'Winter Capacity (MW)', 'Minimum Load (MW)',
                     'RTO/ISO LMP Node Designation',
                     'RTO/ISO Location Designation for Reporting Wholesale Sales Data to FERC',
-                    'geometry', 'Nearest_Substations']
+                    'geometry', 'Nearest_Substations', 'pnode_id', 'substation_match']
 
         for i, x in enumerate(columns):
             self.assertEqual(plant.columns[i], x)
@@ -277,13 +277,14 @@ class PJMSystemMapTest(unittest.TestCase):
                     'float64', 'float64',
                     'object',
                     'object',
-                    'geometry', 'object']
+                    'geometry', 'object', 'object', 'object']
 
         for i, x in enumerate(plant.dtypes):
             self.assertEqual(dtypes[i], x)
 
         # check that all plant has a corresponding nearest substations
         self.assertEqual(plant["Nearest_Substations"].isnull().sum(), 0)
+        self.assertEqual(plant["substation_match"].isnull().sum(), 0)
 
 
 if __name__ == '__main__':
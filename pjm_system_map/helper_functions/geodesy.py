@@ -0,0 +1,62 @@
+"""
+Geodesic lengths of line geometries.
+
+Coordinates of all lines are concatenated into one array, transformed to
+lon/lat in one call and measured on the WGS84 ellipsoid segment by segment.
+Segment lengths are summed per line with np.bincount.
+"""
+
+import numpy as np
+from pyproj import Geod, Transformer
+
+
+KM_PER_MILE = 1.609344
+GEOD = Geod(ellps="WGS84")
+
+
+def getLineCoordinates(geometries):
+    """
+    get concatenated coordinates of lines and the line position of each
+        coordinate. parts of multi-part lines are kept apart.
+
+    return (coordinates, line positions, part positions)
+    """
+    coordinates = []
+    lines = []
+    parts = []
+    n_parts = 0
+    for i, geometry in enumerate(geometries):
+        if geometry is None or geometry.is_empty:
+            continue
+        for part in getattr(geometry, "geoms", [geometry]):
+            xy = np.asarray(part.coords)[:, :2]
+            coordinates.append(xy)
+            lines.append(np.full(len(xy), i))
+            parts.append(np.full(len(xy), n_parts))
+            n_parts += 1
+
+    if len(coordinates) == 0:
+        return np.empty((0, 2)), np.empty(0, dtype=int), np.empty(0, dtype=int)
+    return np.concatenate(coordinates), np.concatenate(lines), np.concatenate(parts)
+
+
+def getGeodesicLengths(geometries, crs):
+    """
+    get geodesic lengths in meters of line geometries in crs.
+
+    empty geometries have length 0.
+    """
+    geometries = list(geometries)
+    coordinates, lines, parts = getLineCoordinates(geometries)
+    lengths = np.zeros(len(geometries))
+    if len(coordinates) < 2:
+        return lengths
+
+    transformer = Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
+    lon, lat = transformer.transform(coordinates[:, 0], coordinates[:, 1])
+
+    # segments between consecutive coordinates of the same part
+    _, _, distances = GEOD.inv(lon[:-1], lat[:-1], lon[1:], lat[1:])
+    same_part = parts[:-1] == parts[1:]
+    lengths += np.bincount(lines[:-1][same_part], weights=distances[same_part], minlength=len(geometries))
+    return lengths
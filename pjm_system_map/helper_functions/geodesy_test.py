@@ -0,0 +1,37 @@
+import unittest
+
+import numpy as np
+from shapely.geometry import LineString, MultiLineString
+from pyproj import Transformer
+
+from geodesy import getGeodesicLengths
+
+
+def mercator(coordinates):
+    transformer = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+    return [transformer.transform(lon, lat) for lon, lat in coordinates]
+
+
+class GeodesyTest(unittest.TestCase):
+
+    def testEquator(self):
+        # one degree of longitude on the equator
+        lines = [LineString(mercator([(0, 0), (0.5, 0), (1, 0)]))]
+        np.testing.assert_allclose(getGeodesicLengths(lines, "EPSG:3857"), [111319.49], rtol=1e-6)
+
+    def testMeridian(self):
+        # a degree of latitude is shorter than its mercator length away from the equator
+        line = LineString(mercator([(-77, 39), (-77, 40)]))
+        length = getGeodesicLengths([line], "EPSG:3857")[0]
+        self.assertAlmostEqual(length / 1000, 111.04, places=1)
+        self.assertLess(length, line.length)
+
+    def testPartsAndEmpty(self):
+        single = LineString(mercator([(0, 0), (1, 0)]))
+        multi = MultiLineString([mercator([(0, 0), (1, 0)]), mercator([(5, 0), (6, 0)])])
+        lengths = getGeodesicLengths([single, LineString(), multi], "EPSG:3857")
+        np.testing.assert_allclose(lengths, [111319.49, 0, 2 * 111319.49], rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
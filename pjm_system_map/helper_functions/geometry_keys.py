@@ -0,0 +1,61 @@
+"""
+Hash keys of geometries for deduplication and exact lookup.
+
+Shapely geometries are compared in python one pair at a time, so dropping
+duplicate geometries or finding a geometry in a layer is slow on large
+layers. Geometries are instead keyed by a 64 bit hash of their WKB, computed
+for a whole layer at once, and deduplication and lookup are integer hash
+operations on the keys. Equal keys mean equal coordinates.
+"""
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+
+def getGeometryKeys(geometries):
+    """
+    get uint64 keys of geometries from their WKB. missing geometries share
+        one key.
+    """
+    geometries = geometries if isinstance(geometries, gpd.GeoSeries) else gpd.GeoSeries(list(geometries))
+    wkb = pd.Series(geometries.to_wkb().values, dtype=object)
+    return pd.util.hash_pandas_object(wkb, index=False).values
+
+
+def dropDuplicateGeometries(df, keep="first"):
+    """
+    drop rows of df whose geometry duplicates that of another row
+    """
+    return df[~pd.Series(getGeometryKeys(df.geometry)).duplicated(keep=keep).values]
+
+
+def dropDuplicateRows(df, keep="first"):
+    """
+    drop rows of df that duplicate another row in all columns, geometry
+        included
+    """
+    keys = pd.DataFrame(df.drop(columns=df.geometry.name)).reset_index(drop=True)
+    keys["geometry_key"] = getGeometryKeys(df.geometry)
+    return df[~keys.duplicated(keep=keep).values]
+
+
+class GeometryLookup:
+    """
+    exact lookup of geometries in a layer, by geometry key
+    """
+
+    def __init__(self, geometries):
+        keys = pd.Series(getGeometryKeys(geometries))
+        # first position of each geometry
+        keys = keys[~keys.duplicated(keep="first")]
+        self.index = pd.Index(keys.values)
+        self.positions = keys.index.values
+
+
+    def find(self, geometries):
+        """
+        get positions of the first equal geometry in the layer, -1 if none
+        """
+        found = self.index.get_indexer(getGeometryKeys(geometries))
+        return np.where(found >= 0, self.positions[found], -1)
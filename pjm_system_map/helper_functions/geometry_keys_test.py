@@ -0,0 +1,31 @@
+import unittest
+
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import Point, LineString
+
+from geometry_keys import getGeometryKeys, dropDuplicateGeometries, dropDuplicateRows, GeometryLookup
+
+
+class GeometryKeysTest(unittest.TestCase):
+
+    def testKeys(self):
+        keys = getGeometryKeys([Point(0, 0), Point(0, 0), Point(0, 1), LineString([(0, 0), (0, 1)]), None])
+        self.assertEqual(keys.dtype, np.uint64)
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(len(set(keys)), 4)
+
+    def testDropDuplicates(self):
+        df = gpd.GeoDataFrame({"NAME": ["a", "b", "a", "a"]},
+                              geometry=[Point(0, 0), Point(0, 0), Point(0, 0), Point(1, 1)], index=[5, 6, 7, 8])
+        self.assertEqual(dropDuplicateGeometries(df).index.to_list(), [5, 8])
+        self.assertEqual(dropDuplicateGeometries(df, keep="last").index.to_list(), [7, 8])
+        self.assertEqual(dropDuplicateRows(df).index.to_list(), [5, 6, 8])
+
+    def testLookup(self):
+        lookup = GeometryLookup(gpd.GeoSeries([Point(0, 0), Point(1, 1), Point(0, 0)], index=[3, 4, 5]))
+        self.assertEqual(lookup.find([Point(1, 1), Point(0, 0), Point(2, 2)]).tolist(), [1, 0, -1])
+
+
+if __name__ == "__main__":
+    unittest.main()
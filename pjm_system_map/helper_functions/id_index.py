@@ -0,0 +1,62 @@
+"""
+Hash index of ids for membership checks and integrity reports.
+
+Checks like `x not in df.column.unique()` in a loop recompute unique() for
+every x and scan it linearly. IdIndex hashes the ids once, so membership of
+a whole column is one get_indexer call and missing ids come from a single
+set difference.
+"""
+
+import pandas as pd
+
+
+class IdIndex:
+    """
+    hash index of unique non-null ids
+    """
+
+    def __init__(self, ids):
+        ids = pd.Series(ids, dtype=object).dropna()
+        self.index = pd.Index(ids.unique())
+
+
+    def __len__(self):
+        return len(self.index)
+
+
+    def __contains__(self, x):
+        return x in self.index
+
+
+    def positions(self, values):
+        """
+        get positions of values in the index. missing values are -1.
+        """
+        return self.index.get_indexer(pd.Index(pd.Series(values, dtype=object)))
+
+
+    def contains(self, values):
+        """
+        get boolean array of whether each value is in the index
+        """
+        return self.positions(values) >= 0
+
+
+    def missing(self, values):
+        """
+        get unique non-null values that are not in the index, in the order
+            of first appearance
+        """
+        values = pd.Index(pd.Series(values, dtype=object).dropna().unique())
+        return values[self.positions(values) < 0].to_list()
+
+
+def getIntegrityReport(index, df, columns, name="id"):
+    """
+    get ids in columns of df that are not in the index.
+
+    return DataFrame of column and id, one row per missing id and column.
+    """
+    report = [pd.DataFrame({"column": column, name: index.missing(df[column])}) for column in columns]
+    report = pd.concat(report, ignore_index=True) if len(report) > 0 else pd.DataFrame(columns=["column", name])
+    return report.astype({"column": object, name: object})
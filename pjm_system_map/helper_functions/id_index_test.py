@@ -0,0 +1,33 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from id_index import IdIndex, getIntegrityReport
+
+
+class IdIndexTest(unittest.TestCase):
+
+    def testContains(self):
+        index = IdIndex(["{A}", "{B}", np.nan, "{A}"])
+        self.assertEqual(len(index), 2)
+        self.assertTrue("{A}" in index)
+        self.assertEqual(list(index.contains(["{B}", "{C}", np.nan])), [True, False, False])
+        self.assertEqual(list(index.positions(pd.Categorical(["{A}", "{B}"]))), [0, 1])
+
+    def testMissing(self):
+        index = IdIndex(["{A}", "{B}"])
+        self.assertEqual(index.missing(["{C}", "{A}", np.nan, "{D}", "{C}"]), ["{C}", "{D}"])
+
+    def testIntegrityReport(self):
+        index = IdIndex(["{A}", "{B}"])
+        lines = pd.DataFrame({"SUBSTATION_A_GLOBALID": ["{A}", "{X}", np.nan],
+                              "SUBSTATION_B_GLOBALID": ["{B}", "{B}", "{Y}"]})
+        report = getIntegrityReport(index, lines, ["SUBSTATION_A_GLOBALID", "SUBSTATION_B_GLOBALID"],
+                                    name="SUBSTATION_GLOBALID")
+        self.assertEqual(report.values.tolist(), [["SUBSTATION_A_GLOBALID", "{X}"],
+                                                  ["SUBSTATION_B_GLOBALID", "{Y}"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
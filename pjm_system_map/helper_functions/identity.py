@@ -0,0 +1,60 @@
+"""
+Deterministic ids for substations and lines synthesized during cleaning.
+
+Ids of added taps and merged lines are name based (uuid5) on the ids and
+geometry of what they are made of, so identical inputs give identical ids
+across builds and caches, diffs and joins keyed on ids keep matching. Ids
+are formatted like the GLOBALIDs of the system map exports.
+"""
+
+import uuid
+
+
+NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "pjm_system_map")
+
+
+def formatGlobalId(x):
+    """
+    format a UUID like GLOBALIDs of the exports, e.g. "{2DC162CB-...}"
+    """
+    return "{" + str(x).upper() + "}"
+
+
+def getGeometryKey(geometry):
+    """
+    get hex WKB of a geometry, None for missing geometries
+    """
+    if geometry is None:
+        return None
+    return geometry.wkb_hex
+
+
+def getDerivedId(kind, *parts):
+    """
+    get id derived from the kind of object and its parts, e.g. source ids
+        and geometries. parts that are geometries are keyed by their WKB.
+    """
+    keys = [kind]
+    for part in parts:
+        if hasattr(part, "wkb_hex"):
+            part = getGeometryKey(part)
+        keys.append("" if part is None else str(part))
+    return formatGlobalId(uuid.uuid5(NAMESPACE, "|".join(keys)))
+
+
+def getParentKey(id, geometry):
+    """
+    get key of a parent line, its id or, for lines without id, its geometry
+    """
+    if isinstance(id, str) and id != "":
+        return id
+    return getGeometryKey(geometry)
+
+
+def getMergedLineId(parents, geometry):
+    """
+    get id of a line merged from parents, a list of (id, geometry) pairs.
+        the id does not depend on the order of parents.
+    """
+    keys = sorted(getParentKey(id, parent_geometry) for id, parent_geometry in parents)
+    return getDerivedId("line", geometry, *keys)
@@ -0,0 +1,32 @@
+import re
+import unittest
+
+from shapely.geometry import Point, LineString
+
+from identity import getDerivedId, getMergedLineId
+
+
+class IdentityTest(unittest.TestCase):
+
+    def testDerivedId(self):
+        x = getDerivedId("substation", "missing_substation_1", Point(1, 2))
+        self.assertEqual(x, getDerivedId("substation", "missing_substation_1", Point(1, 2)))
+        self.assertRegex(x, re.compile(r"^\{[0-9A-F]{8}-[0-9A-F]{4}-5[0-9A-F]{3}-[0-9A-F]{4}-[0-9A-F]{12}\}$"))
+        self.assertNotEqual(x, getDerivedId("substation", "missing_substation_1", Point(1, 3)))
+        self.assertNotEqual(x, getDerivedId("line", "missing_substation_1", Point(1, 2)))
+
+    def testMergedLineId(self):
+        one = LineString([(0, 0), (1, 0)])
+        two = LineString([(1, 0), (2, 0)])
+        merged = LineString([(0, 0), (1, 0), (2, 0)])
+        x = getMergedLineId([("{A}", one), ("{B}", two)], merged)
+        # independent of the order of parents
+        self.assertEqual(x, getMergedLineId([("{B}", two), ("{A}", one)], merged))
+        self.assertNotEqual(x, getMergedLineId([("{A}", one), ("{C}", two)], merged))
+        # parents without id are keyed by geometry
+        y = getMergedLineId([("{A}", one), (None, two)], merged)
+        self.assertNotEqual(y, getMergedLineId([("{A}", one), (None, LineString([(1, 0), (3, 0)]))], merged))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+"""
+Tie lines between zones and aggregation of line flows into interface flows.
+
+A tie line is a line whose endpoints are in different zones, and the tie
+lines between a pair of zones form the interface of that pair. Interfaces
+are named by the zone pair in sorted order, and flows on a tie line count
+positive in the direction from the first to the second zone of its
+interface.
+
+The line to interface aggregation is precomputed as a sparse matrix of +1
+and -1 entries, so interface flows of any number of snapshots, e.g. a year
+of hourly OPF results, are one sparse matrix product.
+"""
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from scipy import sparse
+
+
+TIE_LINE_COLUMNS = ["line_position", "TRANSMISSION_LINE_GLOBALID", "zone_A", "zone_B",
+                    "interface", "direction", "VOLTAGE"]
+
+
+def getInterfaceName(zone_a, zone_b):
+    """
+    get name of the interface between two zones, e.g. "AEP-APS", and the
+        direction of flows from zone_a to zone_b, 1 or -1.
+    """
+    first, second = sorted([zone_a, zone_b])
+    return "{}-{}".format(first, second), 1 if zone_a == first else -1
+
+
+def getEndpoints(geometries):
+    """
+    get GeoSeries of the first and of the last point of each line. missing or
+        empty geometries have no points.
+    """
+    coordinates = np.full((len(geometries), 4), np.nan)
+    for i, geometry in enumerate(geometries):
+        if geometry is None or geometry.is_empty:
+            continue
+        parts = geometry.geoms if hasattr(geometry, "geoms") else [geometry]
+        coordinates[i, :2] = parts[0].coords[0][:2]
+        coordinates[i, 2:] = parts[-1].coords[-1][:2]
+    missing = np.isnan(coordinates[:, 0])
+    first = gpd.points_from_xy(coordinates[:, 0], coordinates[:, 1])
+    last = gpd.points_from_xy(coordinates[:, 2], coordinates[:, 3])
+    first[missing] = None
+    last[missing] = None
+    return gpd.GeoSeries(first, crs=geometries.crs), gpd.GeoSeries(last, crs=geometries.crs)
+
+
+def orientEndpoints(first, last, points_a=None, points_b=None):
+    """
+    orient first and last points of lines to their ends A and B, as line
+        geometries are not always drawn from A to B. a line is flipped if
+        its last point is nearer to the substation point at A, or without
+        one, if its first point is nearer to the substation point at B.
+
+    return GeoSeries of the points at A and at B.
+    """
+    flip = np.zeros(len(first), dtype=bool)
+    # A is applied last, so it takes precedence over B
+    for points, sign in [(points_b, -1), (points_a, 1)]:
+        if points is None:
+            continue
+        points = gpd.GeoSeries(points.values, crs=points.crs).to_crs(first.crs)
+        difference = points.distance(last).values - points.distance(first).values
+        known = ~np.isnan(difference)
+        flip[known] = sign * difference[known] < 0
+
+    point_a, point_b = first.copy(), last.copy()
+    point_a[flip] = last[flip].values
+    point_b[flip] = first[flip].values
+    return point_a, point_b
+
+
+def getEndpointZones(lines, zones, zone_column="PLANNING_ZONE_NAME", points_a=None, points_b=None):
+    """
+    match both endpoints of lines to zones with one spatial join. endpoints
+        within several zones take the last of them, as substations do.
+
+    points_a and points_b are GeoSeries of the substation points at ends A
+        and B, in order of lines and missing where unknown. if given, line
+        ends are oriented by them, see orientEndpoints; otherwise the first
+        point of a line is taken as A.
+
+    return DataFrame of zone_A and zone_B indexed like lines.
+    """
+    first, last = getEndpoints(lines.geometry.to_crs(zones.crs))
+    first, last = orientEndpoints(first, last, points_a, points_b)
+    points = gpd.GeoDataFrame(geometry=pd.concat([first, last], ignore_index=True), crs=zones.crs)
+    points = points[points.geometry.notnull()]
+    polygons = gpd.GeoDataFrame({"zone": zones[zone_column].values, "zone_order": np.arange(zones.shape[0])},
+                                geometry=zones.geometry.values, crs=zones.crs)
+    joined = gpd.sjoin(points, polygons, how="inner", predicate="within").sort_values("zone_order")
+    joined = joined[~joined.index.duplicated(keep="last")]
+
+    matched = np.full(2 * lines.shape[0], np.nan, dtype=object)
+    matched[joined.index.values] = joined["zone"].values
+    return pd.DataFrame({"zone_A": matched[:lines.shape[0]], "zone_B": matched[lines.shape[0]:]}, index=lines.index)
+
+
+def findTieLines(line_ids, zones_a, zones_b, voltages=None):
+    """
+    find lines whose endpoints are in different zones. lines with an
+        endpoint without zone are not tie lines.
+
+    return DataFrame of TIE_LINE_COLUMNS, where line_position is the position
+        of the line in line_ids.
+    """
+    zones_a = np.asarray(zones_a, dtype=object)
+    zones_b = np.asarray(zones_b, dtype=object)
+    tie = pd.notnull(zones_a) & pd.notnull(zones_b) & (zones_a != zones_b)
+    positions = np.flatnonzero(tie)
+
+    named = [getInterfaceName(a, b) for a, b in zip(zones_a[positions], zones_b[positions])]
+    tie_lines = pd.DataFrame({"line_position": positions,
+                              "TRANSMISSION_LINE_GLOBALID": np.asarray(line_ids, dtype=object)[positions],
+                              "zone_A": zones_a[positions],
+                              "zone_B": zones_b[positions],
+                              "interface": [x[0] for x in named],
+                              "direction": np.array([x[1] for x in named], dtype=np.int8),
+                              "VOLTAGE": np.asarray(voltages, dtype=float)[positions] if voltages is not None
+                              else np.nan},
+                             columns=TIE_LINE_COLUMNS)
+    return tie_lines.sort_values(["interface", "line_position"]).reset_index(drop=True)
+
+
+def getInterfaceSummary(tie_lines):
+    """
+    get DataFrame of interfaces with their zones, number of tie lines and
+        the tie lines by voltage.
+    """
+    forward = tie_lines["direction"].values == 1
+    tie_lines = tie_lines.assign(zone_1=np.where(forward, tie_lines["zone_A"], tie_lines["zone_B"]),
+                                 zone_2=np.where(forward, tie_lines["zone_B"], tie_lines["zone_A"]))
+    summary = tie_lines.groupby("interface").agg(zone_1=("zone_1", "first"), zone_2=("zone_2", "first"),
+                                                 lines=("line_position", "size"), max_voltage=("VOLTAGE", "max"))
+    by_voltage = tie_lines.pivot_table(index="interface", columns="VOLTAGE", values="line_position",
+                                       aggfunc="size", fill_value=0)
+    by_voltage.columns = ["lines_{:g}_kv".format(x) for x in by_voltage.columns]
+    return summary.join(by_voltage).reset_index()
+
+
+class InterfaceAggregator:
+    """
+    sparse aggregation of line flows into interface flows.
+
+    matrix has a row per interface and a column per line of line_ids, with
+        the direction of tie lines as entries.
+    """
+
+    def __init__(self, tie_lines, line_ids):
+        self.line_index = pd.Index(pd.Series(line_ids, dtype=object))
+        self.interfaces = pd.Index(sorted(tie_lines["interface"].unique()), name="interface")
+        rows = self.interfaces.get_indexer(tie_lines["interface"])
+        self.matrix = sparse.csr_matrix((tie_lines["direction"].values.astype(float),
+                                         (rows, tie_lines["line_position"].values)),
+                                        shape=(len(self.interfaces), len(self.line_index)))
+
+
+    def aggregate(self, flows):
+        """
+        get interface flows of line flows, with a row per snapshot.
+
+        flows is a DataFrame with a column per line id, e.g. OPF results with
+            a row per hour, where lines without a column have no flow, or an
+            array of shape (snapshots, lines) in the order of line_ids.
+        return DataFrame of flows with a column per interface.
+        """
+        if isinstance(flows, pd.DataFrame):
+            positions = self.line_index.get_indexer(pd.Index(flows.columns.astype(object)))
+            if (positions < 0).any():
+                raise(ValueError("Flows of unknown lines: {}".format(list(flows.columns[positions < 0][:5]))))
+            matrix = self.matrix[:, positions]
+            values, index = flows.values, flows.index
+        else:
+            values = np.asarray(flows)
+            if values.ndim != 2 or values.shape[1] != len(self.line_index):
+                raise(ValueError("Flows must have a column per line, got shape {}".format(values.shape)))
+            matrix, index = self.matrix, None
+        # (interfaces, lines) x (lines, snapshots)
+        aggregated = matrix.dot(values.T).T
+        return pd.DataFrame(aggregated, index=index, columns=self.interfaces)
@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point, LineString, MultiLineString, box
+
+from interfaces import getInterfaceName, getEndpointZones, findTieLines, getInterfaceSummary, InterfaceAggregator
+
+
+class InterfacesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.line_ids = ["L1", "L2", "L3", "L4", "L5"]
+        self.tie_lines = findTieLines(self.line_ids,
+                                      ["AEP", "APS", "AEP", "PECO", None],
+                                      ["APS", "AEP", "AEP", "PSEG", "PECO"],
+                                      [500, 765, 345, 230, 230])
+
+    def testInterfaceName(self):
+        self.assertEqual(getInterfaceName("APS", "AEP"), ("AEP-APS", -1))
+        self.assertEqual(getInterfaceName("AEP", "APS"), ("AEP-APS", 1))
+
+    def testTieLines(self):
+        self.assertEqual(list(self.tie_lines["TRANSMISSION_LINE_GLOBALID"]), ["L1", "L2", "L4"])
+        self.assertEqual(list(self.tie_lines["interface"]), ["AEP-APS", "AEP-APS", "PECO-PSEG"])
+        self.assertEqual(list(self.tie_lines["direction"]), [1, -1, 1])
+
+    def testSummary(self):
+        summary = getInterfaceSummary(self.tie_lines).set_index("interface")
+        self.assertEqual(summary.loc["AEP-APS", "lines"], 2)
+        self.assertEqual(summary.loc["AEP-APS", "zone_2"], "APS")
+        self.assertEqual(summary.loc["AEP-APS", "lines_765_kv"], 1)
+        self.assertEqual(summary.loc["PECO-PSEG", "max_voltage"], 230)
+
+    def testAggregateArray(self):
+        aggregator = InterfaceAggregator(self.tie_lines, self.line_ids)
+        flows = np.array([[10.0, 4.0, 7.0, 3.0, 1.0],
+                          [-2.0, 1.0, 0.0, 5.0, 1.0]])
+        result = aggregator.aggregate(flows)
+        self.assertEqual(list(result.columns), ["AEP-APS", "PECO-PSEG"])
+        np.testing.assert_allclose(result.values, [[6.0, 3.0], [-3.0, 5.0]])
+
+    def testAggregateFrame(self):
+        aggregator = InterfaceAggregator(self.tie_lines, self.line_ids)
+        flows = pd.DataFrame({"L4": [3.0], "L1": [10.0]}, index=["2020-01-01 00:00"])
+        result = aggregator.aggregate(flows)
+        self.assertEqual(list(result.index), ["2020-01-01 00:00"])
+        np.testing.assert_allclose(result.values, [[10.0, 3.0]])
+        with self.assertRaises(ValueError):
+            aggregator.aggregate(pd.DataFrame({"L9": [1.0]}))
+        with self.assertRaises(ValueError):
+            aggregator.aggregate(np.zeros((2, 3)))
+
+    def testEndpointZones(self):
+        zones = gpd.GeoDataFrame({"PLANNING_ZONE_NAME": ["WEST", "EAST"]},
+                                 geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)], crs="EPSG:4326")
+        lines = gpd.GeoDataFrame(geometry=[LineString([(0.5, 0.5), (1.5, 0.5)]),
+                                           MultiLineString([[(1.5, 0.2), (1.6, 0.2)], [(1.6, 0.2), (5, 5)]]),
+                                           None], crs="EPSG:4326", index=[3, 4, 5])
+        result = getEndpointZones(lines, zones)
+        self.assertEqual(list(result.index), [3, 4, 5])
+        self.assertEqual(list(result.loc[3]), ["WEST", "EAST"])
+        self.assertEqual(result.loc[4, "zone_A"], "EAST")
+        self.assertTrue(pd.isnull(result.loc[4, "zone_B"]))
+        self.assertTrue(result.loc[5].isnull().all())
+
+    def testOrientedEndpointZones(self):
+        zones = gpd.GeoDataFrame({"PLANNING_ZONE_NAME": ["WEST", "EAST"]},
+                                 geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)], crs="EPSG:4326")
+        # all lines are drawn from EAST to WEST
+        lines = gpd.GeoDataFrame(geometry=[LineString([(1.5, 0.5), (0.5, 0.5)])] * 4, crs="EPSG:4326")
+        # substation points are known at A (WEST), at B (EAST), at both and at neither end
+        points_a = gpd.GeoSeries([Point(0.4, 0.5), None, Point(0.4, 0.5), None], crs="EPSG:4326")
+        points_b = gpd.GeoSeries([None, Point(1.6, 0.5), Point(1.6, 0.5), None], crs="EPSG:4326")
+        result = getEndpointZones(lines, zones, points_a=points_a, points_b=points_b)
+        self.assertEqual(result.values.tolist(), [["WEST", "EAST"]] * 3 + [["EAST", "WEST"]])
+        # points in another crs
+        result = getEndpointZones(lines, zones, points_a=points_a.to_crs("EPSG:3857"))
+        self.assertEqual(list(result.loc[0]), ["WEST", "EAST"])
+
+
+if __name__ == "__main__":
+    unittest.main()
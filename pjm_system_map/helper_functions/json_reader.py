@@ -0,0 +1,228 @@
+"""
+Streaming reader for raw JSON exports from PJM system map.
+
+An export is {"results": [feature, ...]} where each feature has ESRI
+"attributes", "geometryType" and "geometry". Features are decoded one at
+a time from a buffered file, and their coordinates and attributes are
+written straight into growing arrays and columns, so the whole dict tree
+of an export is never held in memory.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import LineString, Polygon, MultiPolygon
+
+
+CHUNK_SIZE = 1 << 20
+
+
+class GrowableArray:
+    """
+    numpy array with amortized appends, grown by doubling.
+    """
+
+    def __init__(self, shape=(), dtype=np.float64, capacity=1024):
+        self.shape = tuple(shape)
+        self.data = np.empty((capacity,) + self.shape, dtype=dtype)
+        self.size = 0
+
+
+    def reserve(self, n):
+        if self.size + n > len(self.data):
+            capacity = max(2 * len(self.data), self.size + n)
+            data = np.empty((capacity,) + self.shape, dtype=self.data.dtype)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+
+
+    def append(self, value):
+        self.reserve(1)
+        self.data[self.size] = value
+        self.size += 1
+
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        self.reserve(len(values))
+        self.data[self.size:self.size + len(values)] = values
+        self.size += len(values)
+
+
+    def values(self):
+        return self.data[:self.size]
+
+
+def iterFeatures(filePath, chunk_size=CHUNK_SIZE):
+    """
+    iterate over features in "results" of a system map export, decoding
+        one feature at a time.
+    """
+    decoder = json.JSONDecoder()
+    with open(filePath) as f:
+        buffer = f.read(chunk_size)
+
+        # move to the start of the results array
+        start = buffer.find('"results"')
+        while start < 0 or buffer.find("[", start) < 0:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise(ValueError("Cannot find results in {}".format(filePath)))
+            buffer += chunk
+            start = buffer.find('"results"')
+        position = buffer.find("[", start) + 1
+
+        end_of_file = False
+        read_size = chunk_size
+        while True:
+            # skip whitespace and separators between features
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+
+            if position < len(buffer) and buffer[position] == "]":
+                return
+
+            try:
+                if position >= len(buffer):
+                    raise(json.JSONDecodeError("Buffer exhausted", buffer, position))
+                feature, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # feature spans past the buffer, read more. large features,
+                # e.g. zone polygons, double the read size to avoid decoding
+                # the same text many times
+                if end_of_file:
+                    raise(ValueError("Truncated export: {}".format(filePath)))
+                chunk = f.read(read_size)
+                end_of_file = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                read_size *= 2
+                continue
+
+            read_size = chunk_size
+            yield feature
+
+            # drop consumed text
+            if position > chunk_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+class ExportReader:
+    """
+    accumulate features of one or more exports into coordinate arrays and
+        attribute columns.
+
+    coordinates: (vertices, 2) array of all vertices
+    ring_offsets: start of each path/ring in coordinates
+    part_offsets: start of each feature in ring_offsets
+    """
+
+    def __init__(self):
+        self.coordinates = GrowableArray(shape=(2,))
+        self.ring_offsets = GrowableArray(dtype=np.int64)
+        self.part_offsets = GrowableArray(dtype=np.int64)
+        self.geometry_types = []
+        self.values = []
+        self.columns = {}
+        self.n_features = 0
+
+
+    def addFeature(self, x):
+        """
+        add one ESRI feature
+        """
+        geometry_type = x["geometryType"]
+        geometry = x["geometry"]
+        self.part_offsets.append(self.ring_offsets.size)
+
+        # handle lines
+        if geometry_type == "esriGeometryPolyline":
+            if len(geometry["paths"]) != 1:
+                raise(ValueError("Unrecognized line geometry type. MultiLineString is detected but LineString is expected."))
+            rings = geometry["paths"]
+
+        # handle points
+        elif geometry_type == "esriGeometryPoint":
+            rings = [[[geometry["x"], geometry["y"]]]]
+
+        # handle polygons
+        elif geometry_type == "esriGeometryPolygon":
+            rings = geometry["rings"]
+
+        # else, unrecognizable geometry shape
+        else:
+            raise(ValueError("Unrecognized geometry type: {}".format(geometry_type)))
+
+        for ring in rings:
+            self.ring_offsets.append(self.coordinates.size)
+            self.coordinates.extend([vertex[:2] for vertex in ring])
+
+        self.geometry_types.append(geometry_type)
+        self.values.append(x.get("value"))
+
+        # attributes missing in this feature but seen before are None
+        for key, value in x["attributes"].items():
+            if key not in self.columns:
+                self.columns[key] = [None] * self.n_features
+            self.columns[key].append(value)
+        self.n_features += 1
+        for column in self.columns.values():
+            if len(column) < self.n_features:
+                column.append(None)
+
+
+    def read(self, filePath, chunk_size=CHUNK_SIZE):
+        """
+        add all features of an export
+        """
+        for feature in iterFeatures(filePath, chunk_size=chunk_size):
+            self.addFeature(feature)
+
+
+    def getGeometries(self):
+        """
+        build shapely geometries from coordinate arrays
+        """
+        coordinates = self.coordinates.values()
+        ring_offsets = np.append(self.ring_offsets.values(), len(coordinates))
+        part_offsets = np.append(self.part_offsets.values(), len(ring_offsets) - 1)
+
+        # points are built in bulk
+        is_point = np.array([x == "esriGeometryPoint" for x in self.geometry_types], dtype=bool)
+        geometries = np.empty(self.n_features, dtype=object)
+        if is_point.any():
+            xy = coordinates[ring_offsets[part_offsets[:-1][is_point]]]
+            geometries[is_point] = gpd.points_from_xy(xy[:, 0], xy[:, 1])
+
+        for i in np.flatnonzero(~is_point):
+            rings = [coordinates[ring_offsets[r]:ring_offsets[r + 1]]
+                     for r in range(part_offsets[i], part_offsets[i + 1])]
+            if self.geometry_types[i] == "esriGeometryPolyline":
+                geometries[i] = LineString(rings[0])
+            elif len(rings) == 1 or self.values[i] == "EKPC": #TODO: hardcoding EKPC for now, which is a donut shape
+                geometries[i] = Polygon(rings[0], rings[1:])
+            else:
+                geometries[i] = MultiPolygon([(ring, []) for ring in rings])
+
+        return geometries
+
+
+    def getGeoDataFrame(self, crs=None):
+        """
+        return features as a GeoDataFrame
+        """
+        return gpd.GeoDataFrame(pd.DataFrame(self.columns, dtype=object),
+                                geometry=self.getGeometries(), crs=crs)
+
+
+def readExports(filePaths, crs=None, chunk_size=CHUNK_SIZE):
+    """
+    read system map exports into one GeoDataFrame
+    """
+    reader = ExportReader()
+    for filePath in filePaths:
+        reader.read(filePath, chunk_size=chunk_size)
+    return reader.getGeoDataFrame(crs=crs)
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+
+from json_reader import iterFeatures, readExports
+
+
+def makeExport():
+    return {"results": [
+        {"value": "A", "attributes": {"NAME": "A", "VOLTAGE": "345"},
+         "geometryType": "esriGeometryPoint", "geometry": {"x": 1.0, "y": 2.0}},
+        {"value": "A-B", "attributes": {"NAME": "A-B", "VOLTAGE": "Null", "MILES": "1.5"},
+         "geometryType": "esriGeometryPolyline", "geometry": {"paths": [[[0, 0], [1, 1], [2, 0]]]}},
+        {"value": "EKPC", "attributes": {"NAME": "EKPC"},
+         "geometryType": "esriGeometryPolygon",
+         "geometry": {"rings": [[[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]],
+                                [[2, 2], [2, 4], [4, 4], [4, 2], [2, 2]]]}},
+        {"value": "AEP", "attributes": {"NAME": "AEP"},
+         "geometryType": "esriGeometryPolygon",
+         "geometry": {"rings": [[[0, 0], [0, 1], [1, 1], [0, 0]],
+                                [[5, 5], [5, 6], [6, 6], [5, 5]]]}},
+    ]}
+
+
+class JSONReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join(self.directory.name, "export.json")
+        with open(self.filePath, "w") as f:
+            json.dump(makeExport(), f)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testIterFeatures(self):
+        # small chunks split features across reads
+        for chunk_size in [7, 64, 1 << 20]:
+            features = list(iterFeatures(self.filePath, chunk_size=chunk_size))
+            self.assertEqual(features, makeExport()["results"])
+
+    def testGeometries(self):
+        df = readExports([self.filePath])
+        self.assertEqual(list(df.geom_type), ["Point", "LineString", "Polygon", "MultiPolygon"])
+        self.assertEqual(list(df.geometry[0].coords), [(1.0, 2.0)])
+        self.assertEqual(len(df.geometry[2].interiors), 1)
+        self.assertEqual(len(df.geometry[3].geoms), 2)
+
+    def testAttributes(self):
+        df = readExports([self.filePath, self.filePath])
+        self.assertEqual(list(df.columns), ["NAME", "VOLTAGE", "MILES", "geometry"])
+        self.assertEqual(df.shape[0], 8)
+        self.assertEqual(df["VOLTAGE"].to_list()[:4], ["345", "Null", None, None])
+        self.assertEqual(df["MILES"].to_list()[:2], [None, "1.5"])
+
+    def testTruncated(self):
+        with open(self.filePath) as f:
+            text = f.read()
+        with open(self.filePath, "w") as f:
+            f.write(text[:-20])
+        with self.assertRaises(ValueError):
+            list(iterFeatures(self.filePath, chunk_size=16))
+
+
+if __name__ == '__main__':
+    unittest.main()
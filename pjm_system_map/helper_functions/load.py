@@ -1,8 +1,134 @@
 """
 implement functions to attach loads to substations
+
+per-substation weights are computed once per zone and stored as a
+(zones, substations) matrix, so hourly zonal load is allocated to
+substations with one matrix multiply.
+
+methods:
+    equal: zone load equally divided between substations in the zone
+    area: zone load divided by area of substation voronoi cells, clipped to the zone
+    population: zone load divided by population within substation voronoi cells
+
+TODO: in the future, use load area, which requires further mapping based on EDC service areas
 """
 
-# script to be implemented
-# method 1, use tranmission zone for equally divided between substations
-# TODO: in the future, use load area, which requires further mapping based on EDC service areas
-# TODO: in the future, use voronoi cell for better approximation
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import MultiPoint
+from shapely.ops import voronoi_diagram
+
+
+class LoadAllocation:
+    """
+    allocation of zonal load to substations.
+
+    weights: float32 array of shape (zones, substations), rows sum to 1
+        for zones that have substations.
+    """
+
+    def __init__(self, zones, substation_ids, weights):
+        self.zones = list(zones)
+        self.substation_ids = list(substation_ids)
+        self.weights = weights.astype(np.float32)
+
+
+    def allocate(self, zonal_load):
+        """
+        allocate zonal load to substations.
+
+        zonal_load: DataFrame of shape (hours, zones) with zone names as
+            columns, or array with columns in the order of self.zones.
+        return float32 array of shape (hours, substations).
+        """
+        if isinstance(zonal_load, pd.DataFrame):
+            zonal_load = zonal_load.reindex(columns=self.zones).fillna(0).values
+        return np.asarray(zonal_load, dtype=np.float32) @ self.weights
+
+
+    def getWeights(self):
+        """
+        return weights as a DataFrame, zones by substations
+        """
+        return pd.DataFrame(self.weights, index=self.zones, columns=self.substation_ids)
+
+
+def getVoronoiCells(points, zone_geometry):
+    """
+    get voronoi cells of points clipped to the zone geometry.
+
+    return list of cells in the order of points. points at the same
+        location share a cell.
+    """
+    if not zone_geometry.is_valid:
+        zone_geometry = zone_geometry.buffer(0)
+
+    if len(points) == 1:
+        return [zone_geometry]
+
+    unique_points = gpd.GeoSeries(points).drop_duplicates()
+    if len(unique_points) == 1:
+        return [zone_geometry] * len(points)
+
+    cells = voronoi_diagram(MultiPoint(unique_points.to_list()), envelope=zone_geometry)
+    cells = gpd.GeoDataFrame(geometry=list(cells.geoms))
+
+    # voronoi cells are not returned in the order of points, so join cells to points
+    joined = gpd.sjoin(gpd.GeoDataFrame(geometry=list(points)), cells, how="left", predicate="intersects")
+    joined = joined[~joined.index.duplicated(keep="first")].sort_index()
+    return [cells.geometry.iloc[int(i)].intersection(zone_geometry) if not np.isnan(i) else p
+            for i, p in zip(joined["index_right"], points)]
+
+
+def getLoadAllocation(substations, zones, method="equal", population=None,
+                      substation_zone_column="geo_matched_zone", zone_column="PLANNING_ZONE_NAME"):
+    """
+    compute per-substation load weights.
+
+    substations: GeoDataFrame with SUBSTATION_GLOBALID, point geometry and zone
+    zones: GeoDataFrame of zone polygons
+    population: GeoDataFrame with point geometry and a "population" column,
+        required for population weights. zones without population fall
+        back to area weights.
+    """
+    if method not in ["equal", "area", "population"]:
+        raise(ValueError("Unrecognized load allocation method: {}".format(method)))
+    if method == "population" and population is None:
+        raise(ValueError("Population is required for population weighted load allocation."))
+
+    zone_names = zones[zone_column].to_list()
+    substations = substations.reset_index(drop=True)
+
+    # substations outside of zones get no load
+    weights = np.zeros((len(zone_names), len(substations)), dtype=np.float64)
+
+    for row, (zone, zone_geometry) in enumerate(zip(zone_names, zones.geometry)):
+        members = np.flatnonzero(substations[substation_zone_column].values == zone)
+        if len(members) == 0:
+            continue
+
+        if method == "equal":
+            weights[row, members] = 1.0
+
+        else:
+            cells = getVoronoiCells(substations.geometry.values[members], zone_geometry)
+            zone_weights = np.array([cell.area for cell in cells])
+
+            if method == "population":
+                cells = gpd.GeoDataFrame({"member": range(len(members))}, geometry=cells, crs=substations.crs)
+                joined = gpd.sjoin(population[["population", "geometry"]], cells, how="inner", predicate="within")
+                zone_population = joined.groupby("member")["population"].sum()
+                zone_population = zone_population.reindex(range(len(members))).fillna(0).values
+                if zone_population.sum() > 0:
+                    zone_weights = zone_population
+
+            # substations at the same location share their cell
+            sharing = pd.Series(substations.geometry.values[members]).map(lambda x: x.wkb)
+            zone_weights = zone_weights / sharing.map(sharing.value_counts()).values
+            # fall back to equal split if cells are degenerate
+            weights[row, members] = zone_weights if zone_weights.sum() > 0 else 1.0
+
+        weights[row] = weights[row] / weights[row].sum()
+
+    return LoadAllocation(zone_names, substations["SUBSTATION_GLOBALID"], weights)
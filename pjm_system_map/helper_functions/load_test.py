@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point, box
+
+from load import getLoadAllocation
+
+
+class LoadAllocationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.zones = gpd.GeoDataFrame({"PLANNING_ZONE_NAME": ["A", "B"]},
+                                      geometry=[box(0, 0, 10, 10), box(10, 0, 20, 10)])
+        self.substations = gpd.GeoDataFrame({"SUBSTATION_GLOBALID": ["1", "2", "3", "4"],
+                                             "geo_matched_zone": ["A", "A", "B", np.nan]},
+                                            geometry=[Point(2, 5), Point(8, 5), Point(15, 5), Point(30, 5)])
+
+    def testEqualSplit(self):
+        allocation = getLoadAllocation(self.substations, self.zones, method="equal")
+        load = pd.DataFrame({"B": [10.0, 20.0], "A": [100.0, 200.0]})
+        bus_load = allocation.allocate(load)
+        self.assertEqual(bus_load.dtype, np.float32)
+        np.testing.assert_allclose(bus_load, [[50, 50, 10, 0], [100, 100, 20, 0]])
+
+    def testVoronoiArea(self):
+        substations = self.substations.copy()
+        substations.geometry = [Point(2, 5), Point(6, 5), Point(15, 5), Point(30, 5)]
+        allocation = getLoadAllocation(substations, self.zones, method="area")
+        weights = allocation.getWeights()
+        # cells are split at x = 4
+        np.testing.assert_allclose(weights.loc["A"].values, [0.4, 0.6, 0, 0], rtol=1e-5)
+        np.testing.assert_allclose(weights.loc["B"].values, [0, 0, 1, 0])
+
+    def testVoronoiPopulation(self):
+        population = gpd.GeoDataFrame({"population": [30.0, 10.0]}, geometry=[Point(1, 1), Point(9, 9)])
+        allocation = getLoadAllocation(self.substations, self.zones, method="population", population=population)
+        weights = allocation.getWeights()
+        np.testing.assert_allclose(weights.loc["A"].values, [0.75, 0.25, 0, 0], rtol=1e-5)
+        # zone without population falls back to area
+        np.testing.assert_allclose(weights.loc["B"].values, [0, 0, 1, 0])
+
+    def testUnknownMethod(self):
+        with self.assertRaises(ValueError):
+            getLoadAllocation(self.substations, self.zones, method="unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
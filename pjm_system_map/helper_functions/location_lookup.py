@@ -0,0 +1,117 @@
+"""
+Zip code and state lookup of pnodes, zones and map substations.
+
+zip-code-mapping.xls and pnode-by-state.xls are ingested once into compact
+tables. LocationIndex keeps hash indexes from zip code and state to pnode
+positions, so that a lookup is a dictionary access and an array take.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def readPJMExcel(filePath, first_column):
+    """
+    read PJM excel export, which has a disclaimer before the header row.
+    """
+    raw = pd.read_excel(filePath, header=None, dtype=str)
+    header_rows = np.flatnonzero(raw[0].astype(str).str.strip() == first_column)
+    if len(header_rows) == 0:
+        raise(ValueError("Cannot find header row starting with {} in {}".format(first_column, filePath)))
+    header_row = header_rows[0]
+    df = raw.iloc[header_row + 1:].copy()
+    df.columns = raw.iloc[header_row].astype(str).str.strip()
+    return df.dropna(how="all").reset_index(drop=True)
+
+
+def ingestZipCodeMapping(filePath):
+    """
+    ingest zip-code-mapping.xls into a table of zip code, city, state and pnode.
+    """
+    df = readPJMExcel(filePath, "Zip Code")
+    df = df.rename(columns={"Zip Code": "zip_code", "City": "city", "State": "state",
+                            "PNODEID": "pnode_id", "PNODENAME": "pnode_name"})
+    # zip codes lost their leading zeros in excel
+    df["zip_code"] = df["zip_code"].str.strip().str.replace(r"\.0$", "", regex=True).str.zfill(5)
+    df["pnode_id"] = df["pnode_id"].str.strip().str.replace(r"\.0$", "", regex=True)
+    df = df.drop_duplicates(subset=["zip_code", "pnode_id"])
+    df["city"] = df["city"].astype("category")
+    df["state"] = df["state"].astype("category")
+    return df[["zip_code", "city", "state", "pnode_id", "pnode_name"]].reset_index(drop=True)
+
+
+def ingestPnodeByState(filePath):
+    """
+    ingest pnode-by-state.xls into a table of pnode, name, type and state.
+    """
+    df = readPJMExcel(filePath, "PNODEID")
+    df = df.rename(columns={"PNODEID": "pnode_id", "PNODENAME": "pnode_name",
+                            "PNODETYPE": "pnode_type", "STATE": "state"})
+    df["pnode_id"] = df["pnode_id"].str.strip().str.replace(r"\.0$", "", regex=True)
+    df = df.drop_duplicates(subset=["pnode_id", "state"])
+    df["pnode_type"] = df["pnode_type"].astype("category")
+    df["state"] = df["state"].astype("category")
+    return df[["pnode_id", "pnode_name", "pnode_type", "state"]].reset_index(drop=True)
+
+
+class LocationIndex:
+    """
+    hash indexes from zip code and state to pnodes, zones and map substations.
+
+    pnode attributes are stored once per pnode in self.pnodes; zip codes and
+        states map to integer arrays of positions into it.
+    """
+    FIELDS = ["pnode_id", "pnode_name", "zone", "system_map_substation_id"]
+
+    def __init__(self, zip_codes, pnode_states, pnode_list):
+        # one row per pnode from all sources
+        names = pd.concat([zip_codes[["pnode_id", "pnode_name"]], pnode_states[["pnode_id", "pnode_name"]]])
+        names = names.drop_duplicates(subset=["pnode_id"]).set_index("pnode_id")["pnode_name"]
+        pnode_ids = pd.Index(pd.concat([zip_codes["pnode_id"], pnode_states["pnode_id"]]).unique())
+
+        attributes = pnode_list.drop_duplicates(subset=["pnode_id"]).set_index("pnode_id")
+        self.pnodes = pd.DataFrame({"pnode_id": pnode_ids,
+                                    "pnode_name": names.reindex(pnode_ids).values,
+                                    "zone": attributes["zone"].reindex(pnode_ids).values,
+                                    "system_map_substation_id": attributes["system_map_substation_id"].reindex(pnode_ids).values})
+        self.columns = {field: self.pnodes[field].values for field in self.FIELDS}
+
+        # hash indexes to pnode positions
+        self.zip_index = self.buildIndex(zip_codes["zip_code"], pnode_ids.get_indexer(zip_codes["pnode_id"]))
+        self.state_index = self.buildIndex(pnode_states["state"].astype(str), pnode_ids.get_indexer(pnode_states["pnode_id"]))
+
+
+    @staticmethod
+    def buildIndex(keys, positions):
+        """
+        build dict of key to array of positions
+        """
+        groups = pd.Series(positions).groupby(pd.Series(keys).values).unique()
+        return {key: value.astype(np.int32) for key, value in groups.items()}
+
+
+    def lookup(self, index, key, field):
+        """
+        get unique values of field for key in index, skipping missing values
+        """
+        if field not in self.columns:
+            raise(ValueError("Unrecognized field: {}".format(field)))
+        positions = index.get(key)
+        if positions is None:
+            return []
+        values = self.columns[field][positions]
+        return list(dict.fromkeys(v for v in values if not pd.isnull(v)))
+
+
+    def lookupZip(self, zip_code, field="pnode_id"):
+        """
+        get pnode ids, pnode names, zones or map substations of a zip code
+        """
+        return self.lookup(self.zip_index, str(zip_code).zfill(5), field)
+
+
+    def lookupState(self, state, field="pnode_id"):
+        """
+        get pnode ids, pnode names, zones or map substations of a state
+        """
+        return self.lookup(self.state_index, state, field)
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from location_lookup import readPJMExcel, ingestZipCodeMapping, ingestPnodeByState, LocationIndex
+
+
+def writePJMExcel(filePath, rows):
+    """
+    write rows after a disclaimer, as PJM excel exports are laid out
+    """
+    disclaimer = [["PJM has made all efforts possible to accurately document all information."], []]
+    pd.DataFrame(disclaimer + rows).to_excel(filePath, header=False, index=False)
+
+
+class LocationLookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        zipPath = os.path.join(self.temporary.name, "zip-code-mapping.xlsx")
+        # zip codes are numbers in excel, so 08401 lost its leading zero
+        writePJMExcel(zipPath, [["Zip Code", "City", "State", "PNODEID", "PNODENAME"],
+                                [8401, "Atlantic City", "NJ", 1001, "ATLANTIC 138 KV"],
+                                [8401, "Atlantic City", "NJ", 1002, "CARDIFF 230 KV"],
+                                [8401, "Atlantic City", "NJ", 1002, "CARDIFF 230 KV"],
+                                [19103, "Philadelphia", "PA", 2001, "PLYMOUTH 230 KV"]])
+        statePath = os.path.join(self.temporary.name, "pnode-by-state.xlsx")
+        writePJMExcel(statePath, [["PNODEID", "PNODENAME", "PNODETYPE", "STATE"],
+                                  [1001, "ATLANTIC 138 KV", "BUS", "NJ"],
+                                  [1002, "CARDIFF 230 KV", "BUS", "NJ"],
+                                  [2001, "PLYMOUTH 230 KV", "BUS", "PA"],
+                                  [3001, "WESTERN HUB", "HUB", "PA"]])
+        self.zip_codes = ingestZipCodeMapping(zipPath)
+        self.pnode_states = ingestPnodeByState(statePath)
+        pnode_list = pd.DataFrame({"pnode_id": ["1001", "1002", "2001"],
+                                   "zone": ["AEC", "AEC", "PECO"],
+                                   "system_map_substation_id": ["{S1}", None, "{S3}"]})
+        self.index = LocationIndex(self.zip_codes, self.pnode_states, pnode_list)
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def testIngest(self):
+        self.assertEqual(list(self.zip_codes.columns), ["zip_code", "city", "state", "pnode_id", "pnode_name"])
+        self.assertEqual(list(self.zip_codes["zip_code"]), ["08401", "08401", "19103"])
+        self.assertEqual(list(self.zip_codes["pnode_id"]), ["1001", "1002", "2001"])
+        self.assertEqual(list(self.pnode_states["pnode_type"].cat.categories), ["BUS", "HUB"])
+
+    def testMissingHeader(self):
+        filePath = os.path.join(self.temporary.name, "other.xlsx")
+        writePJMExcel(filePath, [["Zip", "City"], [8401, "Atlantic City"]])
+        with self.assertRaises(ValueError):
+            readPJMExcel(filePath, "Zip Code")
+
+    def testZipLookup(self):
+        self.assertEqual(self.index.lookupZip("08401"), ["1001", "1002"])
+        self.assertEqual(self.index.lookupZip(8401), ["1001", "1002"])
+        self.assertEqual(self.index.lookupZip(8401, "zone"), ["AEC"])
+        # pnodes not matched to a map substation are skipped
+        self.assertEqual(self.index.lookupZip(8401, "system_map_substation_id"), ["{S1}"])
+        self.assertEqual(self.index.lookupZip("19103", "pnode_name"), ["PLYMOUTH 230 KV"])
+
+    def testStateLookup(self):
+        self.assertEqual(self.index.lookupState("PA"), ["2001", "3001"])
+        # hubs are not in the pnode list, so have no zone
+        self.assertEqual(self.index.lookupState("PA", "zone"), ["PECO"])
+        self.assertEqual(self.index.lookupState("NJ", "system_map_substation_id"), ["{S1}"])
+
+    def testUnknown(self):
+        self.assertEqual(self.index.lookupZip("99999"), [])
+        self.assertEqual(self.index.lookupZip(None), [])
+        self.assertEqual(self.index.lookupState("ZZ"), [])
+        self.assertEqual(self.index.lookupState("ZZ", "zone"), [])
+        with self.assertRaises(ValueError):
+            self.index.lookupZip("08401", "county")
+        with self.assertRaises(ValueError):
+            self.index.lookupState("NJ", "county")
+
+
+if __name__ == "__main__":
+    unittest.main()
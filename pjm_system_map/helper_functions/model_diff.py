@@ -0,0 +1,213 @@
+"""
+Diff of two builds of the model.
+
+Tables of two builds, e.g. lines and substations, are hash joined on their
+stable keys. Attributes are compared by per column hashes of each row and
+geometry by a digest of its WKB, so rows are never compared value by value.
+Each table gives a columnar diff of added, removed and modified rows, and
+the zones they touch, so studies can be re-run only for affected zones.
+
+Run from pjm_system_map, e.g.
+
+    python -m helper_functions.model_diff /data/builds/OLD /data/builds/NEW --output diff
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+CHANGES = ["added", "removed", "modified"]
+
+# table: key, attribute columns (None for all), columns carried to the diff
+TABLES = {
+    "substations": ("SUBSTATION_GLOBALID", None, ["PLANNING_ZONE_NAME"]),
+    "lines": ("TRANSMISSION_LINE_GLOBALID", None, ["VOLTAGE", "SUBSTATION_A_GLOBALID", "SUBSTATION_B_GLOBALID"]),
+    "pnodes": ("pnode_id", ["zone", "substation", "voltage", "equipment", "type"], ["zone"]),
+    "matches": ("pnode_id", ["system_map_substation_name", "system_map_substation_id"], ["zone"])
+}
+
+# tables of a build, by layer or artifact
+BUILD_TABLES = {"substations": "all_substations_and_taps", "pnodes": "pnode_match", "matches": "pnode_match"}
+
+
+def getGeometryDigests(df):
+    """
+    get 64 bit digests of the WKB of geometries, 0 for frames without
+        geometry
+    """
+    if "geometry" not in df.columns:
+        return pd.Series(np.zeros(df.shape[0], dtype=np.uint64), index=df.index)
+    wkb = pd.Series([None if x is None else x.wkb_hex for x in df.geometry], index=df.index, dtype=object)
+    return pd.util.hash_pandas_object(wkb, index=False)
+
+
+def getKeys(df, key, digests):
+    """
+    get join keys of rows. rows without key are keyed by geometry digest,
+        repeated keys are numbered in order.
+    """
+    keys = df[key].astype(object) if key in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+    missing = keys.isnull() | (keys == "")
+    keys = keys.where(~missing, "geometry:" + digests.map("{:016x}".format))
+    occurrence = keys.groupby(keys).cumcount()
+    return keys.where(occurrence == 0, keys + "#" + occurrence.astype(str))
+
+
+def getColumnHashes(df, columns):
+    """
+    get DataFrame of 64 bit hashes of each column of each row. columns
+        missing from df hash as nulls.
+    """
+    hashes = {}
+    for column in columns:
+        values = df[column] if column in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+        hashes[column] = pd.util.hash_pandas_object(values, index=False).values
+    return pd.DataFrame(hashes, index=df.index, columns=columns)
+
+
+def diffFrames(old, new, key, columns=None, carry=[]):
+    """
+    diff two versions of a table hash joined on key.
+
+    columns are the attributes compared, all but geometry by default.
+        carry columns are copied to the diff, from new where the row
+        exists in new.
+    return DataFrame with key, change, attributes_changed, geometry_changed
+        and changed_columns, one row per added, removed or modified row.
+    """
+    if columns is None:
+        columns = sorted(set(old.columns).union(new.columns) - {"geometry", key})
+
+    frames = {}
+    for name, df in [("old", old), ("new", new)]:
+        df = df.reset_index(drop=True)
+        digests = getGeometryDigests(df)
+        frames[name] = {"df": df, "hashes": getColumnHashes(df, columns).values, "digests": digests.values,
+                        "keys": pd.DataFrame({"key": getKeys(df, key, digests).values,
+                                              "position_" + name: np.arange(df.shape[0])})}
+
+    # hash join of keys to positions in old and new, -1 where missing
+    joined = frames["old"]["keys"].merge(frames["new"]["keys"], on="key", how="outer")
+    positions = {x: joined["position_" + x].fillna(-1).astype(int).values for x in frames}
+    both = (positions["old"] >= 0) & (positions["new"] >= 0)
+    diff = pd.DataFrame({"key": joined["key"].values})
+    diff["change"] = np.where(both, "modified", np.where(positions["old"] >= 0, "removed", "added"))
+
+    changed = np.zeros((joined.shape[0], len(columns)), dtype=bool)
+    changed[both] = (frames["old"]["hashes"][positions["old"][both]] !=
+                     frames["new"]["hashes"][positions["new"][both]])
+    geometry_changed = np.zeros(joined.shape[0], dtype=bool)
+    geometry_changed[both] = (frames["old"]["digests"][positions["old"][both]] !=
+                              frames["new"]["digests"][positions["new"][both]])
+    diff["attributes_changed"] = changed.any(axis=1)
+    diff["geometry_changed"] = geometry_changed
+    diff["changed_columns"] = [",".join(np.array(columns, dtype=object)[x]) for x in changed]
+
+    # carried columns from new, or from old for removed rows
+    for column in carry:
+        values = pd.Series(np.nan, index=diff.index, dtype=object)
+        for name in ["old", "new"]:
+            df = frames[name]["df"]
+            if column in df.columns:
+                found = positions[name] >= 0
+                values[found] = df[column].astype(object).values[positions[name][found]]
+        diff[column] = values
+
+    diff = diff[~both | diff["attributes_changed"] | diff["geometry_changed"]]
+    diff["change"] = pd.Categorical(diff["change"], categories=CHANGES)
+    return diff.sort_values(["change", "key"]).reset_index(drop=True)
+
+
+def getBuildTables(directory):
+    """
+    get tables of a build directory, see build.py
+    """
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    files = {x: y["file"] for x, y in manifest.get("layers", {}).items()}
+    files.update({x: y["file"] for x, y in manifest.get("artifacts", {}).items()})
+
+    tables = {}
+    names = dict(BUILD_TABLES, lines=manifest["lines"])
+    for table, name in names.items():
+        if name in files:
+            tables[table] = pd.read_pickle(os.path.join(directory, files[name]))
+    return tables
+
+
+def getModelTables(system_map, lines="pjm_backbone_lines"):
+    """
+    get tables of a loaded PJMSystemMap, lines are the given line layer
+    """
+    names = dict(BUILD_TABLES, lines=lines, pnodes="pnode_list", matches="pnode_list")
+    return {x: getattr(system_map, y) for x, y in names.items() if getattr(system_map, y, None) is not None}
+
+
+def diffModels(old, new):
+    """
+    diff tables that are in both old and new, dictionaries of tables.
+
+    return dictionary of diffs by table.
+    """
+    diffs = {}
+    for table, (key, columns, carry) in TABLES.items():
+        if table in old and table in new:
+            diffs[table] = diffFrames(old[table], new[table], key, columns=columns, carry=carry)
+    return diffs
+
+
+def getAffectedZones(diffs, substations):
+    """
+    get sorted zones touched by diffs. zones of lines are those of their
+        substations, looked up in substations, a list of substation tables.
+    """
+    zones = set()
+    if "substations" in diffs:
+        zones.update(diffs["substations"]["PLANNING_ZONE_NAME"].dropna())
+    for table in ["pnodes", "matches"]:
+        if table in diffs:
+            zones.update(diffs[table]["zone"].dropna())
+    if "lines" in diffs:
+        lookup = pd.concat([x[["SUBSTATION_GLOBALID", "PLANNING_ZONE_NAME"]] for x in substations])
+        lookup = lookup.dropna().drop_duplicates(subset=["SUBSTATION_GLOBALID"]).set_index("SUBSTATION_GLOBALID")
+        for column in ["SUBSTATION_A_GLOBALID", "SUBSTATION_B_GLOBALID"]:
+            zones.update(diffs["lines"][column].map(lookup["PLANNING_ZONE_NAME"]).dropna())
+    return sorted(str(x) for x in zones)
+
+
+def getSummary(diffs):
+    """
+    return DataFrame of counts of changes by table
+    """
+    counts = {x: diff["change"].value_counts().reindex(CHANGES, fill_value=0) for x, diff in diffs.items()}
+    return pd.DataFrame(counts, index=CHANGES).T
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two builds of the model.")
+    parser.add_argument("old", help="version directory of the old build")
+    parser.add_argument("new", help="version directory of the new build")
+    parser.add_argument("--output", help="directory to write a csv per table to")
+    args = parser.parse_args(argv)
+
+    old = getBuildTables(args.old)
+    new = getBuildTables(args.new)
+    diffs = diffModels(old, new)
+    print(getSummary(diffs))
+    substations = [x["substations"] for x in [new, old] if "substations" in x]
+    print("affected zones: {}".format(", ".join(getAffectedZones(diffs, substations))))
+
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+        for table, diff in diffs.items():
+            diff.to_csv(os.path.join(args.output, table + ".csv"), index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point, LineString
+
+from model_diff import diffFrames, diffModels, getAffectedZones, getSummary
+
+
+def makeSubstations():
+    return gpd.GeoDataFrame({"SUBSTATION_GLOBALID": ["{A}", "{B}", "{C}"],
+                             "NAME": ["Alpha", "Beta", "Gamma"],
+                             "VOLTAGE": [345.0, 230.0, 138.0],
+                             "PLANNING_ZONE_NAME": ["AEP", "DOM", "PECO"]},
+                            geometry=[Point(0, 0), Point(1, 0), Point(2, 0)])
+
+
+def makeLines():
+    return gpd.GeoDataFrame({"TRANSMISSION_LINE_GLOBALID": ["{L1}", "{L2}", np.nan],
+                             "VOLTAGE": [345.0, 230.0, 138.0],
+                             "SUBSTATION_A_GLOBALID": ["{A}", "{B}", np.nan],
+                             "SUBSTATION_B_GLOBALID": ["{B}", "{C}", np.nan]},
+                            geometry=[LineString([(0, 0), (1, 0)]), LineString([(1, 0), (2, 0)]),
+                                      LineString([(5, 5), (6, 6)])])
+
+
+class ModelDiffTest(unittest.TestCase):
+
+    def testUnchanged(self):
+        diff = diffFrames(makeSubstations(), makeSubstations(), "SUBSTATION_GLOBALID")
+        self.assertEqual(diff.shape[0], 0)
+
+    def testChanges(self):
+        old = makeSubstations()
+        new = makeSubstations()
+        new.loc[0, "NAME"] = "Alpha 2"
+        new.loc[1, "geometry"] = Point(1, 1)
+        new = pd.concat([new.iloc[:2], gpd.GeoDataFrame({"SUBSTATION_GLOBALID": ["{D}"], "NAME": ["Delta"],
+                                                         "VOLTAGE": [69.0], "PLANNING_ZONE_NAME": ["PPL"]},
+                                                        geometry=[Point(3, 0)])], ignore_index=True)
+        diff = diffFrames(old, new, "SUBSTATION_GLOBALID", carry=["PLANNING_ZONE_NAME"]).set_index("key")
+        self.assertEqual(diff["change"].to_dict(),
+                         {"{D}": "added", "{C}": "removed", "{A}": "modified", "{B}": "modified"})
+        self.assertEqual(diff.loc["{A}", "changed_columns"], "NAME")
+        self.assertFalse(diff.loc["{A}", "geometry_changed"])
+        self.assertTrue(diff.loc["{B}", "geometry_changed"])
+        self.assertFalse(diff.loc["{B}", "attributes_changed"])
+        # removed rows carry columns from old
+        self.assertEqual(diff.loc["{C}", "PLANNING_ZONE_NAME"], "PECO")
+
+    def testRowsWithoutKey(self):
+        old = makeLines()
+        new = makeLines()
+        new.loc[2, "geometry"] = LineString([(5, 5), (7, 7)])
+        diff = diffFrames(old, new, "TRANSMISSION_LINE_GLOBALID")
+        # lines without id are keyed by geometry, so a moved one is removed and added
+        self.assertEqual(sorted(diff["change"].astype(str)), ["added", "removed"])
+        self.assertTrue(diff["key"].str.startswith("geometry:").all())
+
+    def testAffectedZones(self):
+        old = {"substations": makeSubstations(), "lines": makeLines()}
+        new = {"substations": makeSubstations(), "lines": makeLines()}
+        new["lines"].loc[0, "VOLTAGE"] = 500.0
+        diffs = diffModels(old, new)
+        self.assertEqual(getSummary(diffs).loc["lines", "modified"], 1)
+        self.assertEqual(getAffectedZones(diffs, [new["substations"]]), ["AEP", "DOM"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+"""
+Fuzzy search of substation and station names.
+
+Names of substation labels and equiplist stations are normalized once and
+indexed by their character trigrams. A query looks up the posting lists of
+its trigrams, counts shared trigrams per name with one bincount and scores
+candidates by Dice similarity, so no query scans the names one by one.
+Zone and voltage filters, and names not yet matched by the matchers, are
+boolean masks over the same positions.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+
+NGRAM = 3
+RECORD_COLUMNS = ["name", "normalized", "id", "voltage", "source"]
+
+
+def normalizeName(name):
+    """
+    normalized form of a name: upper case alphanumerics only. None if empty.
+    """
+    if not isinstance(name, str):
+        return None
+    name = re.sub(r"[^A-Z0-9]", "", name.upper())
+    return name if name else None
+
+
+def stripZonePrefix(name, zones):
+    """
+    strip numeric prefixes of pnode substation names, which are part of the
+        naming convention of some zones, e.g. "02ANGOLA" in ATSI.
+    """
+    if ("ComEd" in zones) and bool(re.match(r"^\d+\s+(\w+)$", name)):
+        # COMED's naming convention makes it difficult, and need to be handled separately
+        return re.search(r"^\d+\s+(\w+)$", name).group(1)
+    elif (("ATSI" in zones) or ("DEOK" in zones) or ("Dayton" in zones)) and bool(re.match(r"^\d+(\w+)$", name)):
+        # ATSI, DEOK, and Dayton have naming convention that starts with digits, which make matching difficult
+        return re.search(r"^\d+(\w+)$", name).group(1)
+    return name
+
+
+def getNgrams(normalized, n=NGRAM):
+    """
+    get unique n-grams of a normalized name, padded so that short names and
+        the start and end of names have n-grams too.
+    """
+    padded = "^" + normalized + "$"
+    if len(padded) <= n:
+        return [padded]
+    return list(dict.fromkeys(padded[i:i + n] for i in range(len(padded) - n + 1)))
+
+
+def makeNameRecords(df, name_column, id_column=None, zone_columns=[], voltage_column=None, source=None):
+    """
+    make name records of df for NameIndex, e.g. of substation labels.
+        rows without a name are skipped.
+
+    return DataFrame of RECORD_COLUMNS and a zones column of tuples.
+    """
+    records = pd.DataFrame({"name": df[name_column].values}, index=df.index)
+    records["normalized"] = records["name"].apply(normalizeName)
+    records["id"] = df[id_column].values if id_column is not None else None
+    records["voltage"] = df[voltage_column].astype(float).values if voltage_column is not None else np.nan
+    records["source"] = source
+    zones = [df[x].astype(object).where(df[x].notnull(), None).values for x in zone_columns]
+    records["zones"] = [tuple(dict.fromkeys(x for x in row if x is not None)) for row in zip(*zones)] \
+        if zones else [()] * records.shape[0]
+    return records[records["normalized"].notnull()].reset_index(drop=True)
+
+
+class NameIndex:
+    """
+    trigram index of names, with zone and voltage filters.
+
+    records are stored once in self.records; trigrams, normalized names and
+        zones map to integer arrays of positions into it. search returns
+        positions and scores for matchers, query a DataFrame for lookups.
+    """
+
+    def __init__(self, records, n=NGRAM):
+        self.n = n
+        self.records = records.reset_index(drop=True)
+        self.voltages = self.records["voltage"].values.astype(float)
+        self.columns = {x: self.records[x].values for x in RECORD_COLUMNS + ["zones"]}
+
+        grams = [getNgrams(x, n) for x in self.records["normalized"]]
+        self.gram_counts = np.array([len(x) for x in grams], dtype=np.int32)
+        positions = np.repeat(np.arange(len(grams), dtype=np.int32), self.gram_counts)
+        self.ngram_index = self.buildIndex([y for x in grams for y in x], positions)
+        self.exact_index = self.buildIndex(self.records["normalized"], np.arange(len(grams), dtype=np.int32))
+
+        zones = self.records["zones"]
+        self.zone_index = self.buildIndex([y for x in zones for y in x],
+                                          np.repeat(np.arange(len(zones), dtype=np.int32), [len(x) for x in zones]))
+
+
+    def __len__(self):
+        return self.records.shape[0]
+
+
+    @staticmethod
+    def buildIndex(keys, positions):
+        """
+        build dict of key to array of positions
+        """
+        if len(positions) == 0:
+            return {}
+        groups = pd.Series(positions).groupby(pd.Series(keys).values).unique()
+        return {key: value.astype(np.int32) for key, value in groups.items()}
+
+
+    def getMask(self, zones=None, voltage=None, min_voltage=None):
+        """
+        get boolean array of records in any of zones and at voltage, or at
+            least min_voltage. None if there is no filter.
+        """
+        mask = None
+        if zones is not None:
+            zones = [zones] if isinstance(zones, str) else zones
+            mask = np.zeros(len(self), dtype=bool)
+            for zone in zones:
+                mask[self.zone_index.get(zone, [])] = True
+        if voltage is not None:
+            at_voltage = np.isclose(self.voltages, voltage)
+            mask = at_voltage if mask is None else mask & at_voltage
+        if min_voltage is not None:
+            above = self.voltages >= min_voltage
+            mask = above if mask is None else mask & above
+        return mask
+
+
+    def search(self, name, k=5, zones=None, voltage=None, min_voltage=None, min_score=0.0, within=None):
+        """
+        get positions of the k names most similar to name, optionally only
+            those in any of zones and at voltage or at least min_voltage.
+            within is a boolean array of positions to search, e.g. names
+            not yet matched.
+
+        score is the Dice similarity of trigrams, 1 for equal normalized
+            names. return arrays of positions and scores, best first.
+        """
+        normalized = normalizeName(name)
+        none = (np.array([], dtype=np.int64), np.array([], dtype=float))
+        if normalized is None or len(self) == 0:
+            return none
+
+        grams = getNgrams(normalized, self.n)
+        postings = [self.ngram_index[x] for x in grams if x in self.ngram_index]
+        if len(postings) == 0:
+            return none
+        shared = np.bincount(np.concatenate(postings), minlength=len(self))
+        candidates = np.flatnonzero(shared)
+
+        mask = self.getMask(zones, voltage, min_voltage)
+        if within is not None:
+            mask = within if mask is None else mask & within
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        scores = 2.0 * shared[candidates] / (len(grams) + self.gram_counts[candidates])
+        exact = self.exact_index.get(normalized)
+        if exact is not None:
+            scores[np.isin(candidates, exact)] = 1.0
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+
+        # top k, ties in order of records
+        if len(candidates) > k:
+            kth = -np.partition(-scores, k - 1)[k - 1]
+            candidates, scores = candidates[scores >= kth], scores[scores >= kth]
+        order = np.lexsort((candidates, -scores))[:k]
+        return candidates[order], scores[order]
+
+
+    def query(self, name, k=5, **kwargs):
+        """
+        search name, see search. return DataFrame of records with position
+            and score, best first.
+        """
+        positions, scores = self.search(name, k=k, **kwargs)
+        result = {"position": positions}
+        result.update({x: self.columns[x][positions] for x in RECORD_COLUMNS + ["zones"]})
+        result["score"] = scores
+        return pd.DataFrame(result, columns=["position"] + RECORD_COLUMNS + ["zones", "score"])
+
+
+    def queryMany(self, names, k=1, zones=None, **kwargs):
+        """
+        search each of names. zones, if given, has the zones of each name.
+            return DataFrame of results with the position of the query.
+        """
+        queries, positions, scores = [], [], []
+        for i, name in enumerate(names):
+            found, found_scores = self.search(name, k=k, zones=None if zones is None else zones[i], **kwargs)
+            queries.append(np.full(len(found), i))
+            positions.append(found)
+            scores.append(found_scores)
+        positions = np.concatenate(positions) if positions else np.array([], dtype=np.int64)
+        result = {"query": np.concatenate(queries) if queries else positions, "position": positions}
+        result.update({x: self.columns[x][positions] for x in RECORD_COLUMNS + ["zones"]})
+        result["score"] = np.concatenate(scores) if scores else np.array([], dtype=float)
+        return pd.DataFrame(result, columns=["query", "position"] + RECORD_COLUMNS + ["zones", "score"])
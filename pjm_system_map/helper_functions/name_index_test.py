@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from name_index import NameIndex, makeNameRecords, normalizeName, stripZonePrefix
+
+
+def makeIndex():
+    labels = pd.DataFrame({"NAME": ["Bridgeport", "Bridgewater", "Angola", "Brush", None],
+                           "SUBSTATION_GLOBALID": ["{A}", "{B}", "{C}", "{D}", "{E}"],
+                           "PLANNING_ZONE_NAME": ["AEC", "PSEG", "ATSI", "ATSI", "ATSI"],
+                           "COMMERCIAL_ZONE": ["AE", "PS", np.nan, np.nan, np.nan],
+                           "VOLTAGE": [230.0, 138.0, 138.0, 69.0, 69.0]})
+    stations = pd.DataFrame({"STATION": ["BRIDGEPO"], "ZONE": ["AE"], "VOLTAGE": [230.0]})
+    records = pd.concat([makeNameRecords(labels, "NAME", "SUBSTATION_GLOBALID",
+                                         ["PLANNING_ZONE_NAME", "COMMERCIAL_ZONE"], "VOLTAGE", source="labels"),
+                         makeNameRecords(stations, "STATION", None, ["ZONE"], "VOLTAGE", source="equiplist")],
+                        ignore_index=True)
+    return NameIndex(records)
+
+
+class NameIndexTest(unittest.TestCase):
+
+    def testNormalize(self):
+        self.assertEqual(normalizeName("St. John's 2"), "STJOHNS2")
+        self.assertIsNone(normalizeName("--"))
+        self.assertEqual(stripZonePrefix("02ANGOLA", ["ATSI"]), "ANGOLA")
+        self.assertEqual(stripZonePrefix("02ANGOLA", ["PECO"]), "02ANGOLA")
+        self.assertEqual(stripZonePrefix("12 BRAIDWOOD", ["ComEd"]), "BRAIDWOOD")
+
+    def testQuery(self):
+        index = makeIndex()
+        # rows without name are skipped
+        self.assertEqual(len(index), 5)
+        result = index.query("bridgeport", k=3)
+        self.assertEqual(result["name"].to_list()[0], "Bridgeport")
+        self.assertEqual(result["score"].to_list()[0], 1.0)
+        self.assertEqual(result.shape[0], 3)
+        self.assertTrue((np.diff(result["score"].values) <= 0).all())
+
+    def testFilters(self):
+        index = makeIndex()
+        result = index.query("bridgeport", k=5, zones=["AE"])
+        self.assertEqual(sorted(result["source"]), ["equiplist", "labels"])
+        result = index.query("bridge", k=5, voltage=138)
+        self.assertEqual(result["id"].to_list(), ["{B}"])
+        result = index.query("angola", k=5, zones="ATSI", min_voltage=100)
+        self.assertEqual(result["id"].to_list(), ["{C}"])
+        self.assertEqual(index.query("zzzz").shape[0], 0)
+        # names already matched are skipped
+        within = index.columns["id"] != "{A}"
+        self.assertNotIn("{A}", index.query("bridgeport", k=5, within=within)["id"].to_list())
+        result = index.query("bridgeport", k=5, zones=["AE"], within=within)
+        self.assertEqual(result["source"].to_list(), ["equiplist"])
+
+    def testQueryMany(self):
+        index = makeIndex()
+        result = index.queryMany(["Angola", "Brush"], zones=[["ATSI"], ["ATSI"]])
+        self.assertEqual(result["query"].to_list(), [0, 1])
+        self.assertEqual(result["id"].to_list(), ["{C}", "{D}"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,361 @@
+"""
+Reduction of the PyPSA network by clustering buses.
+
+The PyPSA network exported from the system map has a bus per map
+substation, which makes year long LOPF slow. Buses are clustered, one
+cluster per zone or by k-means of bus coordinates within each zone, so no
+cluster spans zones. Components are then aggregated onto the clustered
+buses:
+
+- lines and transformers between the same pair of clusters are merged
+  into one branch with the summed s_nom and, where given, the parallel
+  impedance. branches within a cluster are dropped.
+- generators are merged per cluster and carrier with the summed p_nom and
+  the p_nom weighted marginal cost.
+- loads are merged per cluster with the summed p_set.
+
+Every original component keeps a map to the component it was merged into,
+with its share of it, so results of the reduced network are disaggregated
+back to the original components with one sparse matrix product.
+
+Run from pjm_system_map on a PyPSA csv folder, e.g.
+
+    python -m helper_functions.network_reduction data/pjm_system_map_pypsa data/pjm_reduced --clusters 200
+"""
+
+import os
+import sys
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.cluster.vq import kmeans2
+
+
+# columns of PyPSA csv files, by component
+BUS_COLUMNS = ["name", "frequency", "operator", "type", "voltage", "x", "y"]
+BRANCH_COLUMNS = ["name", "bus0", "bus1", "frequency", "length", "voltage", "s_nom", "num_parallel"]
+GENERATOR_COLUMNS = ["name", "bus", "p_nom", "carrier", "marginal_cost"]
+LOAD_COLUMNS = ["name", "bus"]
+MAP_COLUMNS = ["name", "reduced", "share"]
+
+METHODS = ["zone", "kmeans"]
+
+
+def getZoneClusterCounts(buses, n_clusters, zone_column="operator"):
+    """
+    get number of clusters of each zone. n_clusters is a dictionary of
+        counts by zone, zones not in it having one cluster, or a total that
+        is split between zones by their number of buses, at least one each.
+        counts are capped at the number of buses of the zone.
+    """
+    sizes = buses[zone_column].dropna().value_counts().sort_index()
+    if isinstance(n_clusters, dict):
+        counts = pd.Series([n_clusters.get(x, 1) for x in sizes.index], index=sizes.index)
+    else:
+        if n_clusters < len(sizes):
+            raise(ValueError("At least {} clusters are needed, one per zone, got {}".format(len(sizes), n_clusters)))
+        # largest remainder split of the clusters left after one per zone
+        quotas = (n_clusters - len(sizes)) * sizes / sizes.sum()
+        counts = 1 + np.floor(quotas).astype(int)
+        remainder = int(n_clusters - counts.sum())
+        order = (quotas - np.floor(quotas)).sort_values(ascending=False, kind="mergesort").index
+        counts[order[:remainder]] += 1
+    return np.minimum(counts, sizes).astype(int)
+
+
+def clusterBusesByZone(buses, zone_column="operator"):
+    """
+    get busmap of buses to one cluster per zone, named by the zone. buses
+        without zone are not clustered.
+
+    return Series of cluster names indexed by bus name.
+    """
+    zones = buses[zone_column].astype(object)
+    return pd.Series(zones.where(zones.notnull(), buses["name"]).values, index=buses["name"].values, name="reduced")
+
+
+def clusterBusesKMeans(buses, n_clusters, zone_column="operator", seed=0):
+    """
+    get busmap of buses to k-means clusters of their coordinates within
+        each zone, see getZoneClusterCounts for n_clusters. clusters are
+        named by zone and number, e.g. "AEP 3". buses without zone are not
+        clustered.
+
+    return Series of cluster names indexed by bus name.
+    """
+    busmap = clusterBusesByZone(buses, zone_column)
+    counts = getZoneClusterCounts(buses, n_clusters, zone_column)
+    coordinates = buses[["x", "y"]].values.astype(float)
+    zones = buses[zone_column].values
+
+    for zone, count in counts.items():
+        positions = np.flatnonzero(zones == zone)
+        if count == len(positions):
+            labels = np.arange(count)
+        elif count == 1:
+            labels = np.zeros(len(positions), dtype=int)
+        else:
+            points = coordinates[positions]
+            labels = kmeans2(points, count, minit="++", seed=seed)[1]
+        # clusters numbered in order of their first bus, empty clusters skipped
+        labels = pd.factorize(labels)[0]
+        busmap.iloc[positions] = ["{} {}".format(zone, x) for x in labels]
+    return busmap
+
+
+def getShareMatrix(reduced, shares, reduced_names):
+    """
+    get sparse matrix of shares with a row per reduced component and a
+        column per original component. originals without a reduced
+        component have an empty column.
+    """
+    rows = pd.Index(reduced_names).get_indexer(pd.Index(pd.Series(reduced, dtype=object)))
+    found = rows >= 0
+    return sparse.csr_matrix((np.asarray(shares, dtype=float)[found], (rows[found], np.flatnonzero(found))),
+                             shape=(len(reduced_names), len(rows)))
+
+
+def getShares(groups, weights):
+    """
+    get shares of weights within groups, equal shares in groups without
+        positive weights.
+    """
+    weights = pd.Series(np.asarray(weights, dtype=float)).fillna(0.0).clip(lower=0.0)
+    groups = pd.Series(groups, dtype=object)
+    totals = weights.groupby(groups.values).transform("sum")
+    sizes = weights.groupby(groups.values).transform("size")
+    return np.where(totals.values > 0, weights.values / totals.where(totals > 0, 1.0).values, 1.0 / sizes.values)
+
+
+def disaggregate(values, mapping):
+    """
+    disaggregate values of reduced components, e.g. generator dispatch with
+        a row per snapshot and a column per reduced generator, to the
+        original components by their share in mapping, a DataFrame of
+        MAP_COLUMNS.
+
+    return DataFrame with a column per original component. components merged
+        into nothing, e.g. lines within a cluster, are NaN.
+    """
+    matrix = getShareMatrix(mapping["reduced"], mapping["share"], values.columns)
+    result = pd.DataFrame(matrix.T.dot(values.values.T).T, index=values.index, columns=mapping["name"].values)
+    result.loc[:, mapping["reduced"].isnull().values] = np.nan
+    return result
+
+
+def mapBuses(buses, busmap, component):
+    """
+    get clusters of buses of a component, which must all be in busmap
+    """
+    clusters = busmap.reindex(buses).values.astype(object)
+    if pd.isnull(clusters).any():
+        unknown = pd.unique(np.asarray(buses, dtype=object)[pd.isnull(clusters)])
+        raise(ValueError("{} at buses not in busmap: {}".format(component, list(unknown[:5]))))
+    return clusters
+
+
+def aggregateBuses(buses, busmap):
+    """
+    aggregate buses of each cluster, at the mean coordinates of its buses
+        and the highest voltage. return buses and the map of buses.
+    """
+    buses = buses.assign(reduced=busmap.reindex(buses["name"]).values)
+    columns = [x for x in BUS_COLUMNS if x in buses.columns and x != "name"]
+    rules = {x: "mean" if x in ["x", "y"] else "max" if x == "voltage" else "first" for x in columns}
+    reduced = buses.groupby("reduced", sort=False).agg(rules).rename_axis("name").reset_index()
+    mapping = pd.DataFrame({"name": buses["name"].values, "reduced": buses["reduced"].values, "share": 1.0})
+    return reduced, mapping
+
+
+def aggregateBranches(branches, busmap):
+    """
+    merge lines or transformers between the same pair of clusters. s_nom is
+        summed and x and r, if given, are combined in parallel. branches are
+        named and oriented by the sorted cluster pair.
+
+    return branches and the map of branches, where the share is the signed
+        share of a branch in the flow of the merged branch, by admittance or
+        by s_nom without x.
+    """
+    bus0 = mapBuses(branches["bus0"], busmap, "Branches")
+    bus1 = mapBuses(branches["bus1"], busmap, "Branches")
+    between = bus0 != bus1
+    forward = bus0.astype(str) <= bus1.astype(str)
+    first = np.where(forward, bus0, bus1)
+    second = np.where(forward, bus1, bus0)
+    names = np.where(between, pd.Series(first).astype(str) + " - " + pd.Series(second).astype(str), None)
+
+    merged = branches.assign(reduced=names, bus0=first, bus1=second)[between]
+    merged = merged.assign(num_parallel=merged["num_parallel"] if "num_parallel" in merged.columns else 1)
+    for column in ["x", "r"]:
+        if column in merged.columns:
+            merged[column] = 1.0 / merged[column].astype(float)
+    columns = [x for x in BRANCH_COLUMNS + ["x", "r"] if x in merged.columns and x not in ["name", "bus0", "bus1"]]
+    rules = {x: "sum" if x in ["s_nom", "num_parallel", "x", "r"] else "max" if x == "voltage"
+             else "mean" if x == "length" else "first" for x in columns}
+    rules.update({"bus0": "first", "bus1": "first"})
+    reduced = merged.groupby("reduced", sort=False).agg(rules).rename_axis("name").reset_index()
+    for column in ["x", "r"]:
+        if column in reduced.columns:
+            reduced[column] = 1.0 / reduced[column]
+    reduced = reduced[["name", "bus0", "bus1"] + [x for x in columns if x not in ["bus0", "bus1"]]]
+
+    weights = 1.0 / branches["x"].astype(float) if "x" in branches.columns else branches.get("s_nom", 1.0)
+    shares = np.where(between, getShares(np.where(between, names, ""), np.broadcast_to(weights, len(branches))),
+                      np.nan)
+    mapping = pd.DataFrame({"name": branches["name"].values, "reduced": names,
+                            "share": shares * np.where(forward, 1.0, -1.0)})
+    return reduced, mapping
+
+
+def aggregateGenerators(generators, busmap):
+    """
+    merge generators per cluster and carrier, with summed p_nom and p_nom
+        weighted marginal cost. return generators and the map of
+        generators, where the share is the share in p_nom.
+    """
+    bus = mapBuses(generators["bus"], busmap, "Generators")
+    carrier = generators["carrier"].fillna("") if "carrier" in generators.columns else pd.Series("", index=generators.index)
+    names = (pd.Series(bus, dtype=object).astype(str) + " " + carrier.astype(str).values).str.strip().values
+    shares = getShares(names, generators["p_nom"])
+
+    merged = generators.assign(reduced=names, bus=bus, share=shares)
+    rules = {"bus": "first", "p_nom": "sum"}
+    if "carrier" in merged.columns:
+        rules["carrier"] = "first"
+    if "marginal_cost" in merged.columns:
+        merged["marginal_cost"] = merged["marginal_cost"].astype(float) * merged["share"]
+        rules["marginal_cost"] = "sum"
+    reduced = merged.groupby("reduced", sort=False).agg(rules).rename_axis("name").reset_index()
+
+    mapping = pd.DataFrame({"name": generators["name"].values, "reduced": names, "share": shares})
+    return reduced, mapping
+
+
+def aggregateLoads(loads, busmap, loads_p_set=None):
+    """
+    merge loads per cluster, named by the cluster. return loads, p_set of
+        loads with a row per snapshot if given, and the map of loads, where
+        the share is the share in the total p_set of the cluster.
+    """
+    bus = mapBuses(loads["bus"], busmap, "Loads")
+    energy = loads_p_set.sum().reindex(loads["name"]).values if loads_p_set is not None else np.ones(len(loads))
+    mapping = pd.DataFrame({"name": loads["name"].values, "reduced": bus, "share": getShares(bus, energy)})
+    reduced = pd.DataFrame({"name": pd.unique(bus)})
+    reduced["bus"] = reduced["name"]
+
+    reduced_p_set = None
+    if loads_p_set is not None:
+        # loads of each cluster are summed, not weighted by share
+        matrix = getShareMatrix(bus, np.ones(len(loads)), reduced["name"])
+        positions = pd.Index(loads["name"]).get_indexer(loads_p_set.columns)
+        values = np.zeros((loads_p_set.shape[0], len(loads)))
+        values[:, positions[positions >= 0]] = loads_p_set.values[:, positions >= 0]
+        reduced_p_set = pd.DataFrame(matrix.dot(values.T).T, index=loads_p_set.index, columns=reduced["name"].values)
+    return reduced, reduced_p_set, mapping
+
+
+class NetworkReduction:
+    """
+    network reduced onto clustered buses of busmap, with maps of every
+        component to the reduced component it was merged into.
+
+    network is a dictionary of PyPSA component DataFrames, e.g. as read by
+        readNetwork: buses, lines and optionally transformers, generators,
+        loads and loads-p_set.
+    """
+
+    def __init__(self, network, busmap):
+        self.busmap = busmap
+        self.network = {}
+        self.maps = {}
+        self.network["buses"], self.maps["buses"] = aggregateBuses(network["buses"], busmap)
+        for component in ["lines", "transformers"]:
+            if component in network:
+                self.network[component], self.maps[component] = aggregateBranches(network[component], busmap)
+        if "generators" in network:
+            self.network["generators"], self.maps["generators"] = aggregateGenerators(network["generators"], busmap)
+        if "loads" in network:
+            self.network["loads"], p_set, self.maps["loads"] = aggregateLoads(network["loads"], busmap,
+                                                                             network.get("loads-p_set"))
+            if p_set is not None:
+                self.network["loads-p_set"] = p_set
+
+
+    def getSummary(self, network):
+        """
+        get DataFrame of the number of components before and after reduction
+        """
+        return pd.DataFrame({"original": {x: len(network[x]) for x in self.maps},
+                             "reduced": {x: len(self.network[x]) for x in self.maps}})
+
+
+    def disaggregate(self, component, values):
+        """
+        disaggregate values of reduced components, e.g. "generators"
+            dispatch with a row per snapshot, see disaggregate.
+        """
+        if component not in self.maps:
+            raise(ValueError("Unknown component: {}".format(component)))
+        return disaggregate(values, self.maps[component])
+
+
+def readNetwork(directory):
+    """
+    read the PyPSA csv folder of a network into a dictionary of DataFrames
+    """
+    network = {}
+    for component in ["buses", "lines", "transformers", "generators", "loads"]:
+        path = os.path.join(directory, component + ".csv")
+        if os.path.exists(path):
+            network[component] = pd.read_csv(path)
+    path = os.path.join(directory, "loads-p_set.csv")
+    if os.path.exists(path):
+        network["loads-p_set"] = pd.read_csv(path, index_col=0)
+    return network
+
+
+def writeNetwork(reduction, directory, source=None):
+    """
+    write the reduced network as a PyPSA csv folder, and the maps of
+        components to directory/maps. snapshots are copied from source.
+    """
+    os.makedirs(os.path.join(directory, "maps"), exist_ok=True)
+    for component, df in reduction.network.items():
+        df.to_csv(os.path.join(directory, component + ".csv"), index=component == "loads-p_set")
+    for component, mapping in reduction.maps.items():
+        mapping.to_csv(os.path.join(directory, "maps", component + ".csv"), index=False)
+    if source is not None and os.path.exists(os.path.join(source, "snapshots.csv")):
+        shutil.copy2(os.path.join(source, "snapshots.csv"), os.path.join(directory, "snapshots.csv"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reduce a PyPSA network by clustering buses.")
+    parser.add_argument("input", help="PyPSA csv folder of the network")
+    parser.add_argument("output", help="PyPSA csv folder to write the reduced network to")
+    parser.add_argument("--method", default="kmeans", choices=METHODS,
+                        help="one cluster per zone, or k-means clusters within zones")
+    parser.add_argument("--clusters", type=int, help="total number of k-means clusters")
+    parser.add_argument("--zone-column", default="operator", help="column of buses with their zone")
+    parser.add_argument("--seed", type=int, default=0, help="seed of k-means")
+    args = parser.parse_args(argv)
+
+    network = readNetwork(args.input)
+    if args.method == "zone":
+        busmap = clusterBusesByZone(network["buses"], args.zone_column)
+    elif args.clusters is None:
+        parser.error("--clusters is required with --method kmeans")
+    else:
+        busmap = clusterBusesKMeans(network["buses"], args.clusters, args.zone_column, seed=args.seed)
+
+    reduction = NetworkReduction(network, busmap)
+    writeNetwork(reduction, args.output, source=args.input)
+    print(reduction.getSummary(network))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
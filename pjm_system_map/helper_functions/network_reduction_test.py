@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from network_reduction import (getZoneClusterCounts, clusterBusesByZone, clusterBusesKMeans, getShares,
+                               NetworkReduction, readNetwork, writeNetwork)
+
+
+class NetworkReductionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.buses = pd.DataFrame({"name": ["a1", "a2", "a3", "a4", "b1", "b2", "c1"],
+                                   "operator": ["A", "A", "A", "A", "B", "B", None],
+                                   "voltage": [230, 500, 230, 230, 345, 345, 138],
+                                   "x": [0.0, 0.1, 10.0, 10.1, 5.0, 5.1, 20.0],
+                                   "y": [0.0, 0.0, 0.0, 0.0, 5.0, 5.0, 20.0]})
+        self.lines = pd.DataFrame({"name": ["l1", "l2", "l3", "l4", "l5"],
+                                   "bus0": ["a1", "a2", "b1", "a3", "b2"],
+                                   "bus1": ["a2", "b1", "a2", "b2", "c1"],
+                                   "voltage": [230, 345, 345, 230, 138],
+                                   "s_nom": [100.0, 200.0, 300.0, 400.0, 50.0],
+                                   "x": [0.1, 0.2, 0.2, 0.4, 0.5]})
+        self.generators = pd.DataFrame({"name": ["g1", "g2", "g3"], "bus": ["a1", "a2", "b1"],
+                                        "p_nom": [100.0, 300.0, 50.0], "carrier": ["gas", "gas", "coal"],
+                                        "marginal_cost": [20.0, 40.0, 30.0]})
+        self.loads = pd.DataFrame({"name": ["a1", "a3", "b2"], "bus": ["a1", "a3", "b2"]})
+        self.p_set = pd.DataFrame({"a1": [1.0, 3.0], "a3": [2.0, 2.0], "b2": [5.0, 5.0]}, index=["t0", "t1"])
+        self.network = {"buses": self.buses, "lines": self.lines, "generators": self.generators,
+                        "loads": self.loads, "loads-p_set": self.p_set}
+
+    def testClusterCounts(self):
+        self.assertEqual(getZoneClusterCounts(self.buses, 3).to_dict(), {"A": 2, "B": 1})
+        self.assertEqual(getZoneClusterCounts(self.buses, {"A": 9}).to_dict(), {"A": 4, "B": 1})
+        with self.assertRaises(ValueError):
+            getZoneClusterCounts(self.buses, 1)
+
+    def testClusterByZone(self):
+        busmap = clusterBusesByZone(self.buses)
+        self.assertEqual(list(busmap.values), ["A", "A", "A", "A", "B", "B", "c1"])
+
+    def testClusterKmeans(self):
+        busmap = clusterBusesKMeans(self.buses, 3)
+        self.assertEqual(busmap["a1"], busmap["a2"])
+        self.assertEqual(busmap["a3"], busmap["a4"])
+        self.assertNotEqual(busmap["a1"], busmap["a3"])
+        self.assertEqual(busmap["a1"], "A 0")
+        self.assertEqual(busmap["c1"], "c1")
+
+    def testShares(self):
+        np.testing.assert_allclose(getShares(["x", "x", "y", "z", "z"], [1, 3, 0, 0, np.nan]),
+                                   [0.25, 0.75, 1.0, 0.5, 0.5])
+
+    def testReduce(self):
+        reduction = NetworkReduction(self.network, clusterBusesByZone(self.buses))
+        buses = reduction.network["buses"].set_index("name")
+        self.assertEqual(list(buses.index), ["A", "B", "c1"])
+        self.assertEqual(buses.loc["A", "voltage"], 500)
+        self.assertAlmostEqual(buses.loc["A", "x"], 5.05)
+
+        # l1 is within A, l2 to l4 are parallel between A and B
+        lines = reduction.network["lines"].set_index("name")
+        self.assertEqual(list(lines.index), ["A - B", "B - c1"])
+        self.assertEqual(lines.loc["A - B", "s_nom"], 900.0)
+        self.assertEqual(lines.loc["A - B", "num_parallel"], 3)
+        self.assertAlmostEqual(lines.loc["A - B", "x"], 0.08)
+
+        generators = reduction.network["generators"].set_index("name")
+        self.assertEqual(generators.loc["A gas", "p_nom"], 400.0)
+        self.assertEqual(generators.loc["A gas", "marginal_cost"], 35.0)
+        self.assertEqual(list(reduction.network["loads-p_set"].loc["t1"]), [5.0, 5.0])
+
+    def testDisaggregate(self):
+        reduction = NetworkReduction(self.network, clusterBusesByZone(self.buses))
+        flows = pd.DataFrame({"A - B": [80.0], "B - c1": [10.0]})
+        lines = reduction.disaggregate("lines", flows).iloc[0]
+        self.assertTrue(np.isnan(lines["l1"]))
+        # l3 runs from B to A, against the merged line
+        np.testing.assert_allclose(lines[["l2", "l3", "l4", "l5"]].values, [32.0, -32.0, 16.0, 10.0])
+
+        dispatch = pd.DataFrame({"A gas": [200.0], "B coal": [10.0]})
+        generators = reduction.disaggregate("generators", dispatch).iloc[0]
+        np.testing.assert_allclose(generators.values, [50.0, 150.0, 10.0])
+        with self.assertRaises(ValueError):
+            reduction.disaggregate("storage_units", dispatch)
+
+    def testUnknownBus(self):
+        generators = self.generators.assign(bus=["a1", "a2", "zz"])
+        with self.assertRaises(ValueError):
+            NetworkReduction(dict(self.network, generators=generators), clusterBusesByZone(self.buses))
+
+    def testWrite(self):
+        reduction = NetworkReduction(self.network, clusterBusesByZone(self.buses))
+        with tempfile.TemporaryDirectory() as directory:
+            writeNetwork(reduction, directory)
+            self.assertTrue(os.path.exists(os.path.join(directory, "maps", "lines.csv")))
+            network = readNetwork(directory)
+            self.assertEqual(network["lines"].shape[0], 2)
+            self.assertEqual(list(network["loads-p_set"].index), ["t0", "t1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
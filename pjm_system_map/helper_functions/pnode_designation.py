@@ -0,0 +1,99 @@
+"""
+Join of EIA generators to pnodes by their RTO/ISO LMP node designation.
+
+EIA 860 reports the LMP node of a generator either as a pnode id, e.g.
+"2156110041", or as a pnode name of substation, voltage and equipment, e.g.
+"BRIDGEPO 22 KV LOGAN". Both forms are normalized into keys, and pnodes are
+indexed by the same keys once, so a generator is matched by a dictionary
+lookup. Keys shared by several pnodes are ambiguous and not indexed.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# match method of each kind of key
+METHODS = {"id": "designation_id", "name": "designation_name", "short_name": "designation_short_name"}
+
+
+def normalizeDesignationName(name):
+    """
+    normalized form of a pnode name: upper case alphanumerics only, with
+        voltages written as e.g. 22KV.
+    """
+    name = re.sub(r"(\d+)(\.0*)?\s*KV\b", r"\1KV", name.upper())
+    name = re.sub(r"[^A-Z0-9]", "", name)
+    return name if name else None
+
+
+def getDesignationKeys(designation):
+    """
+    get keys of a designation, a pnode id or name. empty for missing ones.
+    """
+    if isinstance(designation, (int, np.integer)):
+        return [("id", str(designation))]
+    if isinstance(designation, (float, np.floating)):
+        return [] if np.isnan(designation) else [("id", str(int(designation)))]
+    if not isinstance(designation, str):
+        return []
+    designation = designation.strip()
+    if re.match(r"^\d+(\.0*)?$", designation):
+        return [("id", designation.split(".")[0])]
+    name = normalizeDesignationName(designation)
+    if name is None:
+        return []
+    return [("name", name), ("short_name", name)]
+
+
+def formatVoltage(voltage):
+    """
+    format a voltage in kV as in pnode names, e.g. 22.0 as "22" and 34.5 as "34.5"
+    """
+    return "{:g}".format(voltage) if not pd.isnull(voltage) else ""
+
+
+def buildPnodeKeyIndex(pnode_list):
+    """
+    build dict of key to position in pnode_list. pnodes are keyed by id, by
+        substation, voltage and equipment and by substation and equipment.
+        keys of several pnodes are left out.
+    """
+    keys = []
+    positions = []
+    for i, (pnode_id, substation, voltage, equipment) in enumerate(zip(
+            pnode_list["pnode_id"], pnode_list["substation"], pnode_list["voltage"], pnode_list["equipment"])):
+        keys.append(("id", str(pnode_id)))
+        name = "{} {}KV {}".format(substation, formatVoltage(voltage), equipment)
+        keys.append(("name", normalizeDesignationName(name)))
+        keys.append(("short_name", normalizeDesignationName("{} {}".format(substation, equipment))))
+        positions += [i, i, i]
+
+    index = {}
+    for key, position in zip(keys, positions):
+        index.setdefault(key, set()).add(position)
+    return {key: next(iter(value)) for key, value in index.items() if len(value) == 1 and key[1] is not None}
+
+
+def matchDesignations(designations, pnode_list):
+    """
+    match designations to pnodes of pnode_list.
+
+    return DataFrame indexed like designations with the position of the
+        pnode in pnode_list (-1 if unmatched) and the match method.
+    """
+    index = buildPnodeKeyIndex(pnode_list)
+    matched = np.full(len(designations), -1, dtype=np.int64)
+    methods = np.full(len(designations), None, dtype=object)
+
+    # designations repeat across units of a plant, each is looked up once
+    lookups = {}
+    for i, designation in enumerate(designations):
+        key = designation if isinstance(designation, (str, int, float, np.integer, np.floating)) else None
+        if key not in lookups:
+            lookups[key] = next(((index[x], METHODS[x[0]]) for x in getDesignationKeys(designation) if x in index),
+                                (-1, None))
+        matched[i], methods[i] = lookups[key]
+
+    return pd.DataFrame({"pnode_position": matched, "pnode_match": methods}, index=getattr(designations, "index", None))
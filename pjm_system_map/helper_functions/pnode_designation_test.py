@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pnode_designation import getDesignationKeys, matchDesignations, normalizeDesignationName
+
+
+def makePnodeList():
+    return pd.DataFrame({"pnode_id": ["510409", "32947101", "2156110041", "74008709", "74008710"],
+                         "substation": ["ABSECON", "ABSECON", "ABSECON", "BRIDGEPO", "BRIDGEPO"],
+                         "voltage": [69.0, 69.0, 69.0, 22.0, 34.5],
+                         "equipment": ["LOAD1", "LOAD2", "PEARSTSP", "LOGAN", "LOGAN"]})
+
+
+class PnodeDesignationTest(unittest.TestCase):
+
+    def testKeys(self):
+        self.assertEqual(normalizeDesignationName("Bridgepo 22.0 kV Logan"), "BRIDGEPO22KVLOGAN")
+        self.assertEqual(getDesignationKeys(2156110041.0), [("id", "2156110041")])
+        self.assertEqual(getDesignationKeys(" 2156110041 "), [("id", "2156110041")])
+        self.assertEqual(getDesignationKeys(" "), [])
+        self.assertEqual(getDesignationKeys(np.nan), [])
+
+    def testMatch(self):
+        designations = pd.Series(["2156110041", "ABSECON 69 KV PEARSTSP", "absecon pearstsp",
+                                  "BRIDGEPO 34.5KV LOGAN", "BRIDGEPO LOGAN", " ", "99999"], index=range(10, 17))
+        matched = matchDesignations(designations, makePnodeList())
+        self.assertEqual(matched.index.to_list(), list(range(10, 17)))
+        self.assertEqual(matched["pnode_position"].to_list(), [2, 2, 2, 4, -1, -1, -1])
+        self.assertEqual(matched["pnode_match"].to_list()[:4],
+                         ["designation_id", "designation_name", "designation_short_name", "designation_name"])
+        # substation and equipment of two pnodes is ambiguous
+        self.assertIsNone(matched["pnode_match"].to_list()[4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+# functions uses relative imports, run from pjm_system_map
+from helper_functions.functions import PJMSystemMap
+
+
+class PnodeMatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.system_map = PJMSystemMap(load=False, directories={"CACHE_DATA_DIRECTORY": self.temporary.name})
+        self.system_map.all_substation_labels = pd.DataFrame({
+            "SUBSTATION_GLOBALID": ["S1", "S2", "S3", "S4"],
+            "NAME": ["Alpha", "Bravo", "Charlie", "Delta"],
+            "MEMBER": "1",
+            "PLANNING_ZONE_NAME": ["AEC", "AEC", "PECO", "PECO"],
+            "geo_matched_zone": ["AEC", "AEC", "PECO", "PECO"]})
+        self.pnode_list = pd.DataFrame({"pnode_id": ["1", "2", "3", "4"],
+                                        "zone": ["AEC", "AEC", "PECO", "PECO"],
+                                        "substation": ["ALPHA", "BRAVO", "CHARLIE", "DELTA"]})
+        self.fullCacheDataPath = os.path.join(self.temporary.name, "pnode_substation_match_full.pkl")
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def match(self, pnode_list):
+        pnode_list = self.system_map.matchPnodeWithMapSubstations(pnode_list, incremental=True)
+        return pnode_list.set_index("substation")["system_map_substation_id"]
+
+    def testCarriedMatches(self):
+        self.match(self.pnode_list)
+        previous = pd.read_pickle(self.fullCacheDataPath)
+        self.assertEqual(set(previous["match_round"]), {1})
+
+        labels = self.system_map.all_substation_labels.copy()
+        labels.loc[labels["SUBSTATION_GLOBALID"] == "S2", "NAME"] = "Bravado"
+        nodes = {"ALPHA": ["AEC"], "BRAVO": ["AEC"], "CHARLIE": ["PEPCO"]}
+        carried = self.system_map.getCarriedPnodeMatches(previous, labels, nodes)
+        # BRAVO's label is renamed, CHARLIE moved zone and DELTA is gone
+        self.assertEqual(list(carried), ["ALPHA"])
+        self.assertEqual(carried["ALPHA"][0], "Alpha")
+        self.assertEqual(carried["ALPHA"][2:], ("S1", 100, 1))
+
+    def testIncremental(self):
+        self.match(self.pnode_list)
+        # carried matches keep the round of the previous run
+        previous = pd.read_pickle(self.fullCacheDataPath)
+        previous.loc[previous["pnode_substation_name"] == "ALPHA", "match_round"] = 2
+        previous.to_pickle(self.fullCacheDataPath)
+
+        # ALPHAA would be matched to Alpha, but Alpha is still claimed by ALPHA
+        pnode_list = pd.concat([self.pnode_list, pd.DataFrame({"pnode_id": ["5"], "zone": ["AEC"],
+                                                               "substation": ["ALPHAA"]})], ignore_index=True)
+        pnode_list.loc[pnode_list["substation"] == "CHARLIE", "zone"] = "PEPCO"
+        matched = self.match(pnode_list)
+        self.assertEqual(matched["ALPHA"], "S1")
+        self.assertNotEqual(matched["ALPHAA"], "S1")
+
+        full = pd.read_pickle(self.fullCacheDataPath).set_index("pnode_substation_name")
+        self.assertEqual(full.loc["ALPHA", "match_round"], 2)
+        self.assertEqual(full.loc["BRAVO", "match_round"], 1)
+        # CHARLIE changed zone, so it is matched again and not in the same zone
+        self.assertEqual(full.loc["CHARLIE", "system_map_substation_id"], "S3")
+        self.assertEqual(full.loc["CHARLIE", "match_round"], 3)
+        self.assertTrue(full["system_map_substation_id"].is_unique)
+
+
+if __name__ == "__main__":
+    unittest.main()
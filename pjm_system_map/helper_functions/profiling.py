@@ -0,0 +1,210 @@
+"""
+Per-stage profiling of loaders and cleaning stages.
+
+A StageProfiler records for each call of a stage its wall time, CPU time,
+peak traced memory (tracemalloc), growth of the peak RSS of the process and
+row counts in and out. Stages may be nested, e.g. makeGeoDataFrame within
+loadPJMBackboneLines; the peak memory of a stage includes its inner stages.
+
+Methods decorated with @profiled are recorded by self.profiler if it is
+enabled, and run unchanged otherwise.
+"""
+
+import os
+import sys
+import time
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+MB = 1024.0 ** 2
+REPORT_COLUMNS = ["stage", "parent", "depth", "wall_s", "cpu_s", "peak_mb", "rss_growth_mb",
+                  "rows_in", "rows_out", "error"]
+
+
+def getPeakRSS():
+    """
+    get peak resident set size of the process in MB, None if unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / MB if sys.platform == "darwin" else peak / 1024.0
+
+
+def getGitCommit():
+    """
+    get short hash of the checked out commit, suffixed with -dirty if there
+        are uncommitted changes. None outside of git.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=directory,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+        status = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                         cwd=directory, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + "-dirty" if status else commit
+
+
+def countRows(x):
+    """
+    get number of rows of a DataFrame, or of the first DataFrame in a tuple.
+    None for anything else.
+    """
+    if isinstance(x, (pd.DataFrame, pd.Series)):
+        return len(x)
+    if isinstance(x, tuple):
+        for y in x:
+            if isinstance(y, (pd.DataFrame, pd.Series)):
+                return len(y)
+    return None
+
+
+class StageProfiler:
+    """
+    records wall time, CPU time, memory and row counts of stages.
+
+    if trace_memory, tracemalloc is started on the first stage. it slows
+        down allocation heavy stages, so it can be turned off for timings.
+    """
+
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = []
+        self.stack = []
+        self.started_tracing = False
+
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        record a stage. yields the record, whose rows_out may be set
+            within the block.
+        """
+        if not self.enabled:
+            yield {}
+            return
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        tracing = tracemalloc.is_tracing()
+
+        # carry the peak so far to the enclosing stage before resetting it
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                self.stack[-1]["peak"] = max(self.stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+        else:
+            current = 0
+
+        record = {"stage": name,
+                  "parent": self.stack[-1]["record"]["stage"] if self.stack else None,
+                  "depth": len(self.stack),
+                  "rows_in": rows_in,
+                  "rows_out": None,
+                  "error": None}
+        frame = {"record": record, "start": current, "peak": current}
+        self.stack.append(frame)
+        self.records.append(record)
+
+        rss = getPeakRSS()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = "{}: {}".format(type(e).__name__, e)
+            raise
+        finally:
+            record["wall_s"] = time.perf_counter() - wall
+            record["cpu_s"] = time.process_time() - cpu
+            record["rss_growth_mb"] = None if rss is None else getPeakRSS() - rss
+
+            self.stack.pop()
+            if tracing:
+                frame["peak"] = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                record["peak_mb"] = (frame["peak"] - frame["start"]) / MB
+                if self.stack:
+                    self.stack[-1]["peak"] = max(self.stack[-1]["peak"], frame["peak"])
+                elif self.started_tracing:
+                    tracemalloc.stop()
+                    self.started_tracing = False
+            else:
+                record["peak_mb"] = None
+
+
+    def report(self):
+        """
+        return DataFrame with one row per stage call, in order of start
+        """
+        return pd.DataFrame(self.records, columns=REPORT_COLUMNS)
+
+
+    def summary(self):
+        """
+        return DataFrame with totals per stage, slowest first
+        """
+        report = self.report()
+        total = lambda x: x.sum(min_count=1)
+        summary = report.groupby("stage", sort=False).agg(calls=("stage", "size"),
+                                                          wall_s=("wall_s", "sum"),
+                                                          cpu_s=("cpu_s", "sum"),
+                                                          peak_mb=("peak_mb", "max"),
+                                                          rows_in=("rows_in", total),
+                                                          rows_out=("rows_out", total))
+        return summary.sort_values("wall_s", ascending=False)
+
+
+    def export(self, path):
+        """
+        export report to path as csv, or json if path ends with .json
+        """
+        report = self.report()
+        if path.endswith(".json"):
+            report.to_json(path, orient="records", indent=2)
+        else:
+            report.to_csv(path, index=False)
+
+
+    def reset(self):
+        """
+        drop recorded stages
+        """
+        self.records = []
+
+
+def profiled(method):
+    """
+    decorate a method to be recorded as a stage by self.profiler.
+
+    rows in are those of the first DataFrame argument, rows out those of
+        the returned DataFrame.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = getattr(self, "profiler", None)
+        if profiler is None or not profiler.enabled:
+            return method(self, *args, **kwargs)
+
+        rows_in = next((countRows(x) for x in args if countRows(x) is not None), None)
+        with profiler.stage(method.__name__, rows_in=rows_in) as record:
+            result = method(self, *args, **kwargs)
+            record["rows_out"] = countRows(result)
+        return result
+
+    return wrapper
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from profiling import StageProfiler, profiled
+
+
+class Stages:
+
+    def __init__(self, profile=True):
+        self.profiler = StageProfiler(enabled=profile)
+
+    @profiled
+    def outer(self, df):
+        df = self.inner(df)
+        return df[df["a"] > 1]
+
+    @profiled
+    def inner(self, df):
+        block = [0] * 1000000
+        return pd.concat([df, df])
+
+
+class StageProfilerTest(unittest.TestCase):
+
+    def testNestedStages(self):
+        stages = Stages()
+        df = pd.DataFrame({"a": [1, 2, 3]})
+        stages.outer(df)
+        report = stages.profiler.report()
+
+        self.assertEqual(list(report["stage"]), ["outer", "inner"])
+        self.assertEqual(list(report["parent"].fillna("")), ["", "outer"])
+        self.assertEqual(list(report["depth"]), [0, 1])
+        self.assertEqual(list(report["rows_in"]), [3, 3])
+        self.assertEqual(list(report["rows_out"]), [4, 6])
+        self.assertTrue((report["wall_s"] >= 0).all())
+        # peak of outer includes that of inner, about 8 MB of list
+        self.assertGreater(report["peak_mb"][1], 7)
+        self.assertGreaterEqual(report["peak_mb"][0], report["peak_mb"][1])
+
+        summary = stages.profiler.summary()
+        self.assertEqual(summary.loc["inner", "calls"], 1)
+        self.assertEqual(summary.loc["inner", "rows_out"], 6)
+
+    def testError(self):
+        profiler = StageProfiler(trace_memory=False)
+        with self.assertRaises(ValueError):
+            with profiler.stage("fails"):
+                raise(ValueError("bad row"))
+        report = profiler.report()
+        self.assertEqual(report["error"][0], "ValueError: bad row")
+        self.assertTrue(pd.isnull(report["peak_mb"][0]))
+
+    def testDisabled(self):
+        stages = Stages(profile=False)
+        result = stages.outer(pd.DataFrame({"a": [1, 2]}))
+        self.assertEqual(len(result), 2)
+        self.assertEqual(len(stages.profiler.report()), 0)
+
+    def testExport(self):
+        stages = Stages()
+        stages.outer(pd.DataFrame({"a": [1, 2]}))
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ["report.csv", "report.json"]:
+                path = os.path.join(directory, name)
+                stages.profiler.export(path)
+                self.assertTrue(os.path.getsize(path) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
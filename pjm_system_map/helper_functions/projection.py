@@ -0,0 +1,103 @@
+"""
+Reprojection of layers from the canonical CRS.
+
+All layers of PJMSystemMap are held in one canonical CRS, the web mercator
+projection of the system map exports. Transformers are created once per
+pair of CRS and reused, points are transformed as one coordinate array, and
+reprojected geometries are memoized per layer and CRS so that repeated
+requests, e.g. lon/lat for PyPSA export, do not transform again.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import geopandas as gpd
+from pyproj import CRS, Transformer
+from shapely.ops import transform
+
+
+@lru_cache(maxsize=None)
+def getTransformer(from_crs, to_crs):
+    """
+    get cached transformer between two CRS, in x/y i.e. lon/lat order
+    """
+    return Transformer.from_crs(from_crs, to_crs, always_xy=True)
+
+
+def crsKey(crs):
+    """
+    hashable key of a CRS
+    """
+    return CRS.from_user_input(crs).to_string()
+
+
+def transformGeometries(geometries, from_crs, to_crs):
+    """
+    transform geometries between CRS. return GeometryArray.
+
+    points are transformed in bulk; other geometries one coordinate
+        array at a time.
+    """
+    transformer = getTransformer(crsKey(from_crs), crsKey(to_crs))
+    series = gpd.GeoSeries(geometries).reset_index(drop=True)
+    is_point = ((series.geom_type == "Point") & ~series.is_empty).values
+
+    if is_point.any():
+        points = series[is_point]
+        x, y = transformer.transform(points.x.values, points.y.values)
+        points = gpd.points_from_xy(x, y)
+        if is_point.all():
+            return points
+
+    result = list(series.values)
+    if is_point.any():
+        for i, point in zip(np.flatnonzero(is_point), points):
+            result[i] = point
+    for i in np.flatnonzero(~is_point):
+        geometry = result[i]
+        if geometry is not None and not geometry.is_empty:
+            result[i] = transform(transformer.transform, geometry)
+
+    return gpd.array.from_shapely(result)
+
+
+class LayerProjections:
+    """
+    memoized reprojections of layers held in a canonical CRS.
+
+    reprojections are keyed by layer name and CRS, and recomputed if the
+        layer object changes.
+    """
+
+    def __init__(self, crs):
+        self.crs = crs
+        self.cache = {}
+
+
+    def project(self, name, layer, crs):
+        """
+        get layer in crs. the canonical CRS returns the layer itself.
+        """
+        if crs is None or crsKey(crs) == crsKey(self.crs):
+            return layer
+
+        key = (name, crsKey(crs))
+        cached = self.cache.get(key)
+        if cached is None or cached[0] is not layer:
+            geometry = gpd.GeoSeries(transformGeometries(layer.geometry.values, self.crs, crs),
+                                     index=layer.index, crs=crs)
+            cached = (layer, geometry)
+            self.cache[key] = cached
+
+        projected = layer.copy()
+        projected = projected.set_geometry(cached[1], crs=crs)
+        return projected
+
+
+    def clear(self, name=None):
+        """
+        drop memoized reprojections, of one layer or all
+        """
+        for key in list(self.cache):
+            if name is None or key[0] == name:
+                del self.cache[key]
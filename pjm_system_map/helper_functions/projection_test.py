@@ -0,0 +1,47 @@
+import unittest
+
+import geopandas as gpd
+from shapely.geometry import Point, LineString
+
+from projection import LayerProjections, getTransformer, transformGeometries
+
+
+def makeLayer():
+    return gpd.GeoDataFrame({"NAME": ["A", "B", "C"]},
+                            geometry=[Point(-8571600.79, 4721671.57), LineString([(0, 0), (111319.49, 0)]), Point()],
+                            crs="EPSG:3857")
+
+
+class ProjectionTest(unittest.TestCase):
+
+    def testTransformerCached(self):
+        self.assertIs(getTransformer("EPSG:3857", "EPSG:4326"), getTransformer("EPSG:3857", "EPSG:4326"))
+
+    def testTransformGeometries(self):
+        result = transformGeometries(makeLayer().geometry, "EPSG:3857", "EPSG:4326")
+        self.assertAlmostEqual(result[0].x, -77.0, places=5)
+        self.assertAlmostEqual(result[0].y, 39.0, places=5)
+        self.assertAlmostEqual(result[1].coords[1][0], 1.0, places=5)
+        self.assertTrue(result[2].is_empty)
+
+    def testProject(self):
+        layer = makeLayer()
+        projections = LayerProjections("EPSG:3857")
+        self.assertIs(projections.project("layer", layer, "EPSG:3857"), layer)
+
+        projected = projections.project("layer", layer, "EPSG:4326")
+        self.assertEqual(projected.crs, "EPSG:4326")
+        self.assertEqual(list(projected.columns), list(layer.columns))
+        self.assertEqual(layer.crs, "EPSG:3857")
+
+        # memoized per layer and CRS
+        again = projections.project("layer", layer, "EPSG:4326")
+        self.assertIs(again.geometry.values[0], projected.geometry.values[0])
+
+        # a new layer object is projected again
+        other = projections.project("layer", layer.copy(), "EPSG:4326")
+        self.assertIsNot(other.geometry.values[0], projected.geometry.values[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import os
 import re
 
 import pandas as pd
@@ -15,7 +16,7 @@ def parseRating(OTHER_DATA_DIRECTORY, CACHE_DATA_DIRECTORY):
 
     df_dict = {"company": [], "substation": [], "voltage": [],
                "device": [], "end": [], "description": [],
-               "degreef": [], "day_normal": [], "day_long": [], "day_short": [],
+               "degreef": [], "day_normal": [], "day_long": [], "day_short": [], "day_dump": [],
                "night_normal": [], "night_long": [], "night_short": [], "night_dump": []
               }
 
@@ -60,10 +61,11 @@ def parseRating(OTHER_DATA_DIRECTORY, CACHE_DATA_DIRECTORY):
                 df_dict["day_normal"].append(nums[1])
                 df_dict["day_long"].append(nums[2])
                 df_dict["day_short"].append(nums[3])
-                df_dict["night_normal"].append(nums[4])
-                df_dict["night_long"].append(nums[5])
-                df_dict["night_short"].append(nums[6])
-                df_dict["night_dump"].append(nums[7])
+                df_dict["day_dump"].append(nums[4])
+                df_dict["night_normal"].append(nums[5])
+                df_dict["night_long"].append(nums[6])
+                df_dict["night_short"].append(nums[7])
+                df_dict["night_dump"].append(nums[8])
 
             elif re.match(r"^\s+-------- Day ---------  -------- Night -------$", line):
                 continue
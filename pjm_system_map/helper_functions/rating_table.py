@@ -0,0 +1,110 @@
+"""
+Temperature- and day/night-dependent rating lookup table.
+
+ratings.csv (see rating_parser.py) has one row per equipment and ambient
+temperature, with day and night normal/long/short/dump ratings. RatingTable
+packs these into dense float32 arrays indexed by equipment position and
+interpolates ratings for arrays of ambient temperatures in bulk.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+EQUIPMENT_KEYS = ["company", "substation", "voltage", "device", "end", "description"]
+RATING_TYPES = ["normal", "long", "short", "dump"]
+
+
+class RatingTable:
+    """
+    compact rating store indexed by equipment and temperature.
+
+    temperatures: (equipment, temperature) array of degree F, ascending
+    ratings: (equipment, temperature, day/night, rating type) array
+    """
+
+    def __init__(self, ratings):
+        ratings = ratings.sort_values(EQUIPMENT_KEYS + ["degreef"])
+        ratings = ratings.reset_index(drop=True)
+
+        # equipment table and position of each rating row within its equipment.
+        # empty keys, e.g. end, are NaN once read from csv and still group.
+        codes = ratings.groupby(EQUIPMENT_KEYS, sort=False, dropna=False).ngroup().values
+        self.equipment = ratings.loc[~pd.Series(codes).duplicated().values, EQUIPMENT_KEYS].reset_index(drop=True)
+        counts = np.bincount(codes)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        steps = np.arange(len(codes)) - starts[codes]
+
+        # pad equipment with fewer temperatures by repeating the last one
+        n_equipment = len(counts)
+        n_temperatures = counts.max() if n_equipment > 0 else 0
+        steps_padded = np.minimum(np.arange(n_temperatures)[None, :], counts[:, None] - 1)
+        rows = starts[:, None] + steps_padded
+
+        self.temperatures = ratings["degreef"].values.astype(np.float32)[rows]
+
+        columns = ["{}_{}".format(period, rating_type) for period in ["day", "night"] for rating_type in RATING_TYPES]
+        values = np.full((len(ratings), len(columns)), np.nan, dtype=np.float32)
+        for i, column in enumerate(columns):
+            if column in ratings.columns:
+                values[:, i] = ratings[column].values
+        self.ratings = values[rows].reshape(n_equipment, n_temperatures, 2, len(RATING_TYPES))
+
+        # hash index on description for lookups from equiplist LONG NAME
+        self.description_index = pd.Index(self.equipment["description"])
+
+
+    def lookup(self, descriptions):
+        """
+        get equipment positions for descriptions. missing descriptions are -1.
+        if a description is shared by several equipment, the first one is taken.
+        """
+        first = ~self.description_index.duplicated()
+        index = pd.Index(self.description_index[first])
+        positions = np.flatnonzero(first)
+        found = index.get_indexer(pd.Index(descriptions))
+        return np.where(found >= 0, positions[found], -1)
+
+
+    def interpolate(self, equipment, temperatures, is_day, rating_type="normal"):
+        """
+        get ratings of equipment for each ambient temperature.
+
+        equipment: array of equipment positions, -1 for missing
+        temperatures: array of ambient temperatures in degree F
+        is_day: boolean array, same length as temperatures
+        rating_type: normal, long, short or dump
+
+        return float32 array of shape (equipment, temperatures). ratings are
+            linearly interpolated and held constant outside the rated
+            temperature range. missing equipment gets nan.
+        """
+        equipment = np.asarray(equipment)
+        temperatures = np.asarray(temperatures, dtype=np.float32)
+        is_day = np.asarray(is_day, dtype=bool)
+        r = RATING_TYPES.index(rating_type)
+
+        result = np.full((len(equipment), len(temperatures)), np.nan, dtype=np.float32)
+        valid = np.flatnonzero(equipment >= 0)
+        if len(valid) == 0:
+            return result
+
+        # equipment sharing a temperature grid are interpolated together
+        grids, inverse = np.unique(self.temperatures[equipment[valid]], axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for g, grid in enumerate(grids):
+            rows = valid[inverse == g]
+            values = self.ratings[equipment[rows]][:, :, :, r]
+
+            t = np.clip(temperatures, grid[0], grid[-1])
+            upper = np.clip(np.searchsorted(grid, t, side="right"), 1, len(grid) - 1)
+            lower = upper - 1
+            span = grid[upper] - grid[lower]
+            weight = np.where(span > 0, (t - grid[lower]) / np.where(span > 0, span, 1), 0).astype(np.float32)
+
+            period = np.where(is_day, 0, 1)
+            low_values = values[:, lower, period]
+            high_values = values[:, upper, period]
+            result[rows] = low_values + (high_values - low_values) * weight[None, :]
+
+        return result
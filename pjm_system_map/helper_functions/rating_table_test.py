@@ -0,0 +1,69 @@
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from rating_table import RatingTable
+
+
+def makeRatings():
+    rows = []
+    for description, base in [("LINE A", 1000), ("LINE B", 2000)]:
+        for degreef in [32, 50, 68, 86]:
+            rows.append({"company": "AE", "substation": description, "voltage": 230, "device": "LN",
+                         "end": "", "description": description, "degreef": degreef,
+                         "day_normal": base - degreef, "day_long": base, "day_short": base, "day_dump": base,
+                         "night_normal": base + 100 - degreef, "night_long": base, "night_short": base,
+                         "night_dump": base})
+    # shuffle to check sorting
+    return pd.DataFrame(rows).sample(frac=1, random_state=0)
+
+
+class RatingTableTest(unittest.TestCase):
+
+    def testShape(self):
+        table = RatingTable(makeRatings())
+        self.assertEqual(table.temperatures.shape, (2, 4))
+        self.assertEqual(table.ratings.shape, (2, 4, 2, 4))
+        self.assertEqual(table.ratings.dtype, np.float32)
+
+    def testLookup(self):
+        table = RatingTable(makeRatings())
+        positions = table.lookup(["LINE B", "LINE C", "LINE A"])
+        self.assertEqual(list(positions), [1, -1, 0])
+
+    def testInterpolate(self):
+        table = RatingTable(makeRatings())
+        equipment = table.lookup(["LINE A", "LINE B", "LINE C"])
+        temperatures = np.array([32, 41, 86, 100, 0])
+        is_day = np.array([True, True, False, True, True])
+        result = table.interpolate(equipment, temperatures, is_day)
+
+        self.assertEqual(result.shape, (3, 5))
+        np.testing.assert_allclose(result[0], [968, 959, 1014, 914, 968])
+        np.testing.assert_allclose(result[1], [1968, 1959, 2014, 1914, 1968])
+        self.assertTrue(np.isnan(result[2]).all())
+
+    def testMissingDayDump(self):
+        ratings = makeRatings().drop(columns=["day_dump"])
+        table = RatingTable(ratings)
+        result = table.interpolate([0], [50], [True], rating_type="dump")
+        self.assertTrue(np.isnan(result).all())
+
+    def testCsvRoundTrip(self):
+        # empty ends are read back as NaN
+        buffer = io.StringIO()
+        makeRatings().to_csv(buffer, index=False)
+        buffer.seek(0)
+        ratings = pd.read_csv(buffer)
+        self.assertTrue(ratings["end"].isnull().all())
+
+        table = RatingTable(ratings)
+        self.assertEqual(table.ratings.shape, (2, 4, 2, 4))
+        result = table.interpolate(table.lookup(["LINE A", "LINE B"]), [41], [True])
+        np.testing.assert_allclose(result[:, 0], [959, 1959])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Compact dtypes for system map GeoDataFrames.
+
+Raw exports come in as object strings only. The schema assigns:
+    categorical dtypes to low-cardinality columns, e.g. zones and symbol codes
+    float32 to voltage and length columns
+    int32 surrogate keys to GLOBALID columns
+    nullable int32 to numeric ESRI keys
+
+GLOBALIDs of all frames share one GlobalIdRegistry. GLOBALID columns are
+stored as categoricals whose categories are the registry ids, so their codes
+are the surrogate keys, merges between frames join on integer codes and
+comparisons with "{GUID}" strings keep working.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+CATEGORICAL_COLUMNS = ["COMMERCIAL_ZONE", "PLANNING_ZONE_NAME", "geo_matched_zone", "SYM_CODE",
+                       "MEMBER", "COMPANY_ID", "STATE", "SUBSTATION_TYPE", "SHAPE"]
+FLOAT32_COLUMNS = ["VOLTAGE", "LENGTH_KM", "MILES", "published_length_km"]
+# ESRI keys, stored as nullable int32 if all of them are integers
+INT32_COLUMNS = ["ESRI_OID", "ZONE_ID", "ZONE_PLANNING_KEY", "SUBSTATION_KEY",
+                 "TRANSMISSION_LINE_KEY", "YARD KEY"]
+
+
+def isGlobalIdColumn(column):
+    """
+    whether a column holds "{GUID}" ids
+    """
+    return isinstance(column, str) and column.endswith("GLOBALID")
+
+
+class GlobalIdRegistry:
+    """
+    lookup table between GLOBALID strings and int32 surrogate keys.
+
+    keys are positions in self.ids, so adding ids keeps existing keys.
+    """
+
+    def __init__(self, ids=()):
+        self.ids = pd.Index([], dtype=object)
+        self.add(ids)
+
+
+    def __len__(self):
+        return len(self.ids)
+
+
+    def add(self, ids):
+        """
+        register new ids, skipping missing values and known ids
+        """
+        ids = pd.Index(pd.Series(ids, dtype=object).dropna().unique())
+        new = ids[~ids.isin(self.ids)]
+        if len(new) > 0:
+            self.ids = self.ids.append(new)
+        if len(self.ids) > np.iinfo(np.int32).max:
+            raise(ValueError("Too many ids for int32 keys: {}".format(len(self.ids))))
+
+
+    def encode(self, ids):
+        """
+        get int32 keys of ids. missing and unknown ids are -1.
+        """
+        return self.ids.get_indexer(pd.Index(ids, dtype=object)).astype(np.int32)
+
+
+    def decode(self, keys):
+        """
+        get ids of int32 keys. -1 is nan.
+        """
+        keys = np.asarray(keys)
+        values = np.full(len(keys), np.nan, dtype=object)
+        values[keys >= 0] = self.ids.values[keys[keys >= 0]]
+        return values
+
+
+    def getDtype(self):
+        """
+        categorical dtype whose codes are the surrogate keys
+        """
+        return pd.CategoricalDtype(self.ids)
+
+
+    def getTable(self):
+        """
+        return the lookup table of key and GLOBALID
+        """
+        return pd.DataFrame({"key": np.arange(len(self.ids), dtype=np.int32), "GLOBALID": self.ids.values})
+
+
+def getKeys(series):
+    """
+    get int32 surrogate keys of a compacted GLOBALID column. nan is -1.
+    """
+    return series.cat.codes.values.astype(np.int32)
+
+
+def compactFrame(df, registry):
+    """
+    return a copy of df with compact dtypes. GLOBALIDs must be in registry.
+    """
+    df = df.copy()
+    dtype = registry.getDtype()
+    for column in df.columns:
+        if column == "geometry":
+            continue
+        if isGlobalIdColumn(column):
+            df[column] = pd.Categorical(df[column].astype(object), dtype=dtype)
+        elif column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype("category")
+        elif column in FLOAT32_COLUMNS:
+            df[column] = df[column].astype(np.float32)
+        elif column in INT32_COLUMNS:
+            values = pd.to_numeric(df[column], errors="coerce")
+            if values.notnull().sum() == df[column].notnull().sum() and (values.dropna() % 1 == 0).all():
+                df[column] = values.astype("Int32")
+    return df
+
+
+def compactFrames(frames, registry=None):
+    """
+    compact a dictionary of name to frame, registering all GLOBALIDs first.
+
+    return compacted frames and the registry.
+    """
+    registry = registry if registry is not None else GlobalIdRegistry()
+    for df in frames.values():
+        for column in df.columns:
+            if isGlobalIdColumn(column):
+                registry.add(df[column])
+    return {name: compactFrame(df, registry) for name, df in frames.items()}, registry
+
+
+def getMemoryUsage(frames, registry=None):
+    """
+    return deep memory usage in bytes of each frame, excluding geometry.
+
+    categories shared with the registry are counted once, as "registry".
+    """
+    shared = registry.getDtype() if registry is not None else None
+    usage = {}
+    for name, df in frames.items():
+        usage[name] = 0
+        for column in df.columns:
+            if column == "geometry":
+                continue
+            if shared is not None and df[column].dtype == shared:
+                usage[name] += df[column].cat.codes.values.nbytes
+            else:
+                usage[name] += int(df[column].memory_usage(deep=True, index=False))
+    if registry is not None:
+        usage["registry"] = int(registry.ids.memory_usage(deep=True))
+    return pd.Series(usage)
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from schema import GlobalIdRegistry, compactFrames, getKeys
+
+
+def makeFrames():
+    substations = pd.DataFrame({"SUBSTATION_GLOBALID": ["{A}", "{B}", "{C}"],
+                                "PLANNING_ZONE_NAME": ["AEP", "AEP", "BGE"],
+                                "VOLTAGE": [345.0, 138.0, np.nan],
+                                "ESRI_OID": ["1", "2", "3"],
+                                "SUBSTATION_KEY": ["10", "11", "missing_substation_1"]})
+    lines = pd.DataFrame({"TRANSMISSION_LINE_GLOBALID": ["{L1}", "{L2}"],
+                          "SUBSTATION_A_GLOBALID": ["{A}", "{D}"],
+                          "SUBSTATION_B_GLOBALID": ["{B}", np.nan],
+                          "LENGTH_KM": [1.5, 2.25]})
+    return {"substations": substations, "lines": lines}
+
+
+class SchemaTest(unittest.TestCase):
+
+    def testRegistry(self):
+        registry = GlobalIdRegistry(["{A}", "{B}", np.nan, "{A}"])
+        registry.add(["{C}", "{B}"])
+        self.assertEqual(len(registry), 3)
+        keys = registry.encode(["{C}", "{X}", np.nan, "{A}"])
+        self.assertEqual(keys.dtype, np.int32)
+        self.assertEqual(list(keys), [2, -1, -1, 0])
+        self.assertEqual(list(registry.decode(keys)[[0, 3]]), ["{C}", "{A}"])
+        self.assertTrue(pd.isnull(registry.decode(keys)[1]))
+
+    def testCompactFrames(self):
+        frames, registry = compactFrames(makeFrames())
+        substations = frames["substations"]
+        lines = frames["lines"]
+
+        self.assertEqual(len(registry), 6)
+        self.assertEqual(substations["PLANNING_ZONE_NAME"].dtype, "category")
+        self.assertEqual(substations["VOLTAGE"].dtype, np.float32)
+        self.assertEqual(substations["ESRI_OID"].dtype, "Int32")
+        self.assertEqual(substations["SUBSTATION_KEY"].dtype, object)
+        self.assertEqual(lines["LENGTH_KM"].dtype, np.float32)
+
+        # GLOBALID columns share categories, so codes are registry keys
+        self.assertEqual(substations["SUBSTATION_GLOBALID"].dtype, lines["SUBSTATION_A_GLOBALID"].dtype)
+        self.assertEqual(list(getKeys(lines["SUBSTATION_A_GLOBALID"])), list(registry.encode(["{A}", "{D}"])))
+        self.assertEqual(getKeys(lines["SUBSTATION_B_GLOBALID"])[1], -1)
+
+    def testMergeAndCompare(self):
+        frames, registry = compactFrames(makeFrames())
+        merged = pd.merge(frames["lines"], frames["substations"], how="left",
+                          left_on="SUBSTATION_A_GLOBALID", right_on="SUBSTATION_GLOBALID")
+        self.assertEqual(list(merged["PLANNING_ZONE_NAME"].astype(object).fillna("")), ["AEP", ""])
+        self.assertEqual((frames["lines"]["TRANSMISSION_LINE_GLOBALID"] == "{L2}").sum(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Substation entity table linking substation points, taps, labels, pnodes
+and zones.
+
+Substations and taps, their labels and the pnodes matched to them are
+consolidated into one row per SUBSTATION_GLOBALID, with the positions of
+the row in each source layer. Lines look up the entity positions of both
+endpoints once, and endpoint attributes are then fetched with take instead
+of merging lines with a substation layer per attribute and endpoint.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# attributes of substations and taps copied to entities
+SUBSTATION_COLUMNS = ["NAME", "VOLTAGE", "PLANNING_ZONE_NAME", "geo_matched_zone", "COMMERCIAL_ZONE"]
+ENDPOINTS = {"A": "SUBSTATION_A_GLOBALID", "B": "SUBSTATION_B_GLOBALID"}
+
+
+def getFirstPositions(ids):
+    """
+    get Series of the first position of each non-null id, indexed by id
+    """
+    ids = pd.Series(ids, dtype=object).reset_index(drop=True).dropna()
+    ids = ids[~ids.duplicated(keep="first")]
+    return pd.Series(ids.index.values, index=ids.values)
+
+
+def buildSubstationEntities(substations_and_taps, substation_labels, pnode_list=None):
+    """
+    build entity table of substations, taps and labels, one row per id in
+        order of substations and taps, then labels without a point.
+        substation_labels and pnode_list may be None if not loaded.
+
+    return DataFrame with SUBSTATION_GLOBALID, is_tap, label name, pnode
+        ids, SUBSTATION_COLUMNS and positions in substations_and_taps and
+        substation_labels (-1 if not there).
+    """
+    if substation_labels is None:
+        substation_labels = pd.DataFrame(columns=["SUBSTATION_GLOBALID", "NAME"])
+    points = getFirstPositions(substations_and_taps["SUBSTATION_GLOBALID"])
+    labels = getFirstPositions(substation_labels["SUBSTATION_GLOBALID"])
+    ids = points.index.append(labels.index[~labels.index.isin(points.index)])
+
+    entities = pd.DataFrame({"SUBSTATION_GLOBALID": ids})
+    entities["substation_position"] = points.reindex(ids).fillna(-1).astype(np.int64).values
+    entities["label_position"] = labels.reindex(ids).fillna(-1).astype(np.int64).values
+
+    # attributes of points, or of labels for entities without a point
+    has_point = entities["substation_position"].values >= 0
+    has_label = entities["label_position"].values >= 0
+    for column in SUBSTATION_COLUMNS:
+        values = np.full(len(ids), np.nan, dtype=object)
+        for source, positions, found in [(substation_labels, entities["label_position"].values, has_label),
+                                         (substations_and_taps, entities["substation_position"].values, has_point)]:
+            if column in source.columns:
+                values[found] = source[column].astype(object).values[positions[found]]
+        entities[column] = values
+    entities["is_tap"] = False
+    if "SUBSTATION_TYPE" in substations_and_taps.columns:
+        types = substations_and_taps["SUBSTATION_TYPE"].astype(object).values
+        entities.loc[has_point, "is_tap"] = types[entities["substation_position"].values[has_point]] == "1"
+    entities["label_name"] = np.nan
+    entities.loc[has_label, "label_name"] = \
+        substation_labels["NAME"].astype(object).values[entities["label_position"].values[has_label]]
+
+    # pnodes matched to each substation
+    entities["pnode_ids"] = [()] * len(ids)
+    if pnode_list is not None and "system_map_substation_id" in pnode_list.columns:
+        matched = pnode_list.dropna(subset=["system_map_substation_id"])
+        pnodes = matched.groupby(matched["system_map_substation_id"].astype(object))["pnode_id"].agg(tuple)
+        entities["pnode_ids"] = [x if isinstance(x, tuple) else () for x in pnodes.reindex(ids).values]
+    return entities
+
+
+class SubstationEntities:
+    """
+    substation entity table with a hash index of ids to entity positions.
+
+    line endpoint positions are computed once per line layer and reused.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.index = pd.Index(table["SUBSTATION_GLOBALID"].values)
+        self.columns = {x: table[x].values for x in table.columns}
+        self.line_positions = {}
+
+
+    def __len__(self):
+        return self.table.shape[0]
+
+
+    def positions(self, ids):
+        """
+        get entity positions of ids, -1 for missing ones
+        """
+        return self.index.get_indexer(pd.Index(pd.Series(ids, dtype=object)))
+
+
+    def take(self, positions, column):
+        """
+        get values of column at positions, NaN at -1
+        """
+        values = self.columns[column]
+        taken = values[np.maximum(positions, 0)].astype(object)
+        taken[positions < 0] = np.nan
+        return taken
+
+
+    def getLinePositions(self, lines, name=None):
+        """
+        get (lines, 2) array of entity positions of line endpoints A and B.
+            if name is given, positions are memoized for that line layer
+            object.
+        """
+        cached = self.line_positions.get(name)
+        if name is not None and cached is not None and cached[0] is lines:
+            return cached[1]
+        positions = np.column_stack([self.positions(lines[x]) for x in ENDPOINTS.values()])
+        if name is not None:
+            self.line_positions[name] = (lines, positions)
+        return positions
+
+
+    def getEndpointAttributes(self, lines, columns, name=None):
+        """
+        get DataFrame of columns of both endpoints of lines, named e.g.
+            NAME_SUBSTATION_A and NAME_SUBSTATION_B, indexed like lines.
+        """
+        positions = self.getLinePositions(lines, name)
+        attributes = {}
+        for column in columns:
+            for i, endpoint in enumerate(ENDPOINTS):
+                attributes["{}_SUBSTATION_{}".format(column, endpoint)] = self.take(positions[:, i], column)
+        return pd.DataFrame(attributes, index=lines.index)
+
+
+    def getLineSubstationPositions(self, lines, name=None):
+        """
+        get sorted positions in substations and taps of substations that are
+            endpoints of lines
+        """
+        positions = self.getLinePositions(lines, name).ravel()
+        positions = self.columns["substation_position"][positions[positions >= 0]]
+        return np.unique(positions[positions >= 0])
@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from substation_entities import SubstationEntities, buildSubstationEntities, getFirstPositions
+
+
+class SubstationEntitiesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.substations = pd.DataFrame({"SUBSTATION_GLOBALID": ["S1", "S2", "T1", "S2"],
+                                         "NAME": ["ONE", "TWO", "TAP", "TWO"],
+                                         "VOLTAGE": [230, 500, 138, 500],
+                                         "SUBSTATION_TYPE": ["0", "0", "1", "0"]})
+        self.labels = pd.DataFrame({"SUBSTATION_GLOBALID": ["S2", "S1", "L1"],
+                                    "NAME": ["Two", "One", "Label Only"]})
+        self.pnodes = pd.DataFrame({"pnode_id": [10, 11, 12],
+                                    "system_map_substation_id": ["S1", "S1", None]})
+        self.lines = pd.DataFrame({"SUBSTATION_A_GLOBALID": ["S1", "T1", "X"],
+                                   "SUBSTATION_B_GLOBALID": ["S2", "L1", "S1"]}, index=[5, 6, 7])
+        self.entities = SubstationEntities(buildSubstationEntities(self.substations, self.labels, self.pnodes))
+
+    def testFirstPositions(self):
+        positions = getFirstPositions(["a", None, "b", "a"])
+        self.assertEqual(positions.to_dict(), {"a": 0, "b": 2})
+
+    def testTable(self):
+        table = self.entities.table
+        self.assertEqual(list(table["SUBSTATION_GLOBALID"]), ["S1", "S2", "T1", "L1"])
+        self.assertEqual(list(table["substation_position"]), [0, 1, 2, -1])
+        self.assertEqual(list(table["label_position"]), [1, 0, -1, 2])
+        self.assertEqual(list(table["is_tap"]), [False, False, True, False])
+        self.assertEqual(table["NAME"].iloc[3], "Label Only")
+        self.assertTrue(pd.isnull(table["label_name"].iloc[2]))
+        self.assertEqual(list(table["pnode_ids"]), [(10, 11), (), (), ()])
+
+    def testWithoutLabels(self):
+        table = buildSubstationEntities(self.substations, None)
+        self.assertEqual(list(table["SUBSTATION_GLOBALID"]), ["S1", "S2", "T1"])
+        self.assertTrue(table["label_name"].isnull().all())
+
+    def testTake(self):
+        positions = self.entities.positions(["T1", "X", "S1"])
+        self.assertEqual(list(positions), [2, -1, 0])
+        names = self.entities.take(positions, "NAME")
+        self.assertEqual(names[0], "TAP")
+        self.assertTrue(pd.isnull(names[1]))
+
+    def testEndpointAttributes(self):
+        attributes = self.entities.getEndpointAttributes(self.lines, ["label_name"], name="lines")
+        self.assertEqual(list(attributes.index), [5, 6, 7])
+        self.assertEqual(list(attributes["label_name_SUBSTATION_B"]), ["Two", "Label Only", "One"])
+        self.assertTrue(pd.isnull(attributes["label_name_SUBSTATION_A"][7]))
+        self.assertIs(self.entities.getLinePositions(self.lines, "lines"),
+                      self.entities.getLinePositions(self.lines, "lines"))
+
+    def testLineSubstationPositions(self):
+        positions = self.entities.getLineSubstationPositions(self.lines)
+        np.testing.assert_array_equal(positions, [0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,351 @@
+"""
+Synthetic PJM system map exports for benchmarks.
+
+Substations are placed on a jittered grid in the system map projection and
+lines connect grid neighbours, so the size of every layer grows linearly
+with scale; scale 1 has 100 substations and scale 100 about as many as the
+full system map. Exports are written in the ESRI JSON format of the system
+map and carry the defects the cleaning stages handle: missing and wrong
+substation ids, lines broken in two, non-member lines without ids that end
+in yards, and missing lengths. OASIS equiplists and a pnode list with
+perturbed substation names are generated alongside.
+"""
+
+import os
+import json
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+SUBSTATIONS_PER_SCALE = 100
+GRID_SPACING = 10000.0
+ORIGIN = (-9600000.0, 4500000.0)
+SPATIAL_REFERENCE = {"wkid": 102100, "latestWkid": 3857}
+LINE_VOLTAGES = [138.0, 230.0, 345.0, 500.0]
+YARD_HALF_WIDTH = 350.0
+# (COMMERCIAL_ZONE, PLANNING_ZONE_NAME), laid out on a 7 x 3 grid
+ZONES = [('Atlantic City Electric Company', 'AEC'), ('American Electric Power Co., Inc.', 'AEP'),
+         ('Allegheny Power', 'APS'), ('American Transmission Systems, Inc.', 'ATSI'),
+         ('Baltimore Gas and Electric Company', 'BGE'), ('Commonwealth Edison Company', 'ComEd'),
+         ('The Dayton Power and Light Co.', 'Dayton'), ('Duke Energy Ohio Kentucky', 'DEOK'),
+         ('Virginia Electric and Power Co.', 'Dominion'), ('Delmarva Power and Light Company', 'DPL'),
+         ('Duquesne Light Company', 'DL'), ('Eastern Kentucky Power Cooperative', 'EKPC'),
+         ('Jersey Central Power and Light Company', 'JCPL'), ('Metropolitan Edison Company', 'ME'),
+         ('Ohio Valley Electric Corporation', 'OVEC HQ'), ('PECO Energy Company', 'PECO'),
+         ('Pennsylvania Electric Company', 'PENELEC'), ('Potomac Electric Power Company', 'PEPCO'),
+         ('PPL Electric Utilities Corporation', 'PPL'), ('Public Service Electric and Gas Company', 'PSEG'),
+         ('Rockland Electric Company', 'RE')]
+ZONE_GRID = (7, 3)
+SYLLABLES = ["ash", "bel", "cor", "dun", "el", "far", "glen", "hal", "iv", "jun", "kel", "lin",
+             "mor", "nor", "oak", "pen", "quin", "ros", "sal", "tur", "val", "wes", "yor", "zan"]
+
+
+def makeGlobalId(rng):
+    "make ESRI style GLOBALID from rng"
+    return "{" + str(uuid.UUID(int=int(rng.integers(0, 2 ** 63)) << 64 | int(rng.integers(0, 2 ** 63)))).upper() + "}"
+
+
+def makeNames(n, rng):
+    """
+    make n unique station names of two or three syllables
+    """
+    names = []
+    seen = {}
+    for k in rng.integers(2, 4, size=n):
+        name = "".join(rng.choice(SYLLABLES, size=k)).capitalize()
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else "{} {}".format(name, seen[name]))
+    return names
+
+
+def makeFeature(attributes, geometryType, geometry):
+    """
+    make ESRI feature. None attributes are exported as "Null".
+    """
+    attributes = {k: "Null" if v is None else str(v) for k, v in attributes.items()}
+    geometry = dict(geometry, spatialReference=SPATIAL_REFERENCE)
+    return {"attributes": attributes, "geometryType": geometryType, "geometry": geometry}
+
+
+def writeExport(directory, name, features):
+    with open(os.path.join(directory, name + ".json"), "w") as f:
+        json.dump({"results": features}, f)
+
+
+def getSquare(x, y, half_width):
+    return [[[x - half_width, y + half_width], [x + half_width, y + half_width],
+             [x + half_width, y - half_width], [x - half_width, y - half_width],
+             [x - half_width, y + half_width]]]
+
+
+def makeSubstations(scale, rng):
+    """
+    make substations on a jittered grid. return DataFrame.
+    """
+    n = SUBSTATIONS_PER_SCALE * scale
+    side = int(np.ceil(np.sqrt(n)))
+    row, column = np.divmod(np.arange(n), side)
+    jitter = rng.uniform(-0.2, 0.2, size=(n, 2)) * GRID_SPACING
+    substations = pd.DataFrame({"row": row, "column": column,
+                                "x": ORIGIN[0] + column * GRID_SPACING + jitter[:, 0],
+                                "y": ORIGIN[1] - row * GRID_SPACING + jitter[:, 1]})
+
+    # zones split the grid into rectangles
+    zone_column = np.minimum(column * ZONE_GRID[0] // side, ZONE_GRID[0] - 1)
+    zone_row = np.minimum(row * ZONE_GRID[1] // max(row.max() + 1, 1), ZONE_GRID[1] - 1)
+    substations["zone"] = zone_row * ZONE_GRID[0] + zone_column
+    # members are in the zones of the western four zone columns
+    substations["member"] = zone_column < 4
+    substations["name"] = makeNames(n, rng)
+    substations["voltage"] = rng.choice(LINE_VOLTAGES, size=n)
+    substations["id"] = [makeGlobalId(rng) for _ in range(n)]
+    return substations
+
+
+def makeZoneFeatures(substations):
+    """
+    make zone polygons covering the substations
+    """
+    side = substations["column"].max() + 1
+    rows = substations["row"].max() + 1
+    width = side * GRID_SPACING / ZONE_GRID[0]
+    height = rows * GRID_SPACING / ZONE_GRID[1]
+    left = ORIGIN[0] - GRID_SPACING / 2
+    top = ORIGIN[1] + GRID_SPACING / 2
+
+    features = []
+    for i, (commercial_zone, planning_zone) in enumerate(ZONES):
+        zone_row, zone_column = divmod(i, ZONE_GRID[0])
+        x0 = left + zone_column * width
+        y0 = top - zone_row * height
+        # zones on the edge of the grid extend past it
+        x1 = x0 + width + (GRID_SPACING if zone_column == ZONE_GRID[0] - 1 else 0)
+        y1 = y0 - height - (GRID_SPACING if zone_row == ZONE_GRID[1] - 1 else 0)
+        rings = [[[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]]
+        features.append(makeFeature({"ZONE_PLANNING_KEY": i + 1, "COMMERCIAL_ZONE": commercial_zone,
+                                     "PLANNING_ZONE_NAME": planning_zone, "ZONE_ID": 200 + i,
+                                     "PJM_ZONE_GLOBALID": "{{ZONE-{}}}".format(i), "SHAPE": "Polygon"},
+                                    "esriGeometryPolygon", {"rings": rings}))
+    return features
+
+
+def makeSubstationFeatures(substations, member):
+    """
+    make substation features, those of members carry their planning zone
+    """
+    features = []
+    for i, x in substations[substations["member"] == member].iterrows():
+        commercial_zone, planning_zone = ZONES[x["zone"]]
+        attributes = {"FAC_ID": "{}{:g}".format(x["name"][:4].upper(), x["voltage"]),
+                      "MEMBER": int(member), "NAME": x["name"], "STATE": "PA",
+                      "SUBSTATION_GLOBALID": x["id"], "SUBSTATION_TYPE": 0,
+                      "SYM_CODE": "{:g}".format(x["voltage"]), "VOLTAGE": "{:g}".format(x["voltage"]),
+                      "COMMERCIAL_ZONE": commercial_zone}
+        if member:
+            attributes.update({"PLANNING_ZONE_NAME": planning_zone,
+                               "PJM_ZONE_GLOBALID": "{{ZONE-{}}}".format(x["zone"])})
+        attributes.update({"SHAPE": "Point", "SUBSTATION_KEY": 10000 + i, "ESRI_OID": i + 1})
+        features.append(makeFeature(attributes, "esriGeometryPoint", {"x": x["x"], "y": x["y"]}))
+    return features
+
+
+def makeYardFeatures(substations):
+    """
+    make square yards around substations
+    """
+    features = []
+    for i, x in substations.iterrows():
+        features.append(makeFeature({"YARD KEY": 20000 + i, "FAC_ID": x["name"][:4].upper(),
+                                     "SUBSTATION_GLOBALID": x["id"], "VOLTAGE": "{:g}".format(x["voltage"]),
+                                     "YARD_GLOBALID": "{{YARD-{}}}".format(i), "SHAPE": "Polygon"},
+                                    "esriGeometryPolygon", {"rings": getSquare(x["x"], x["y"], YARD_HALF_WIDTH)}))
+    return features
+
+
+def makeLines(substations, rng):
+    """
+    make lines between grid neighbours, with defects to be cleaned.
+
+    return DataFrame with one row per exported line, i.e. broken lines
+        have two rows.
+    """
+    position = {(r, c): i for i, (r, c) in enumerate(zip(substations["row"], substations["column"]))}
+    pairs = [(i, position[(r, c + 1)]) for (r, c), i in position.items() if (r, c + 1) in position]
+    pairs += [(i, position[(r + 1, c)]) for (r, c), i in position.items() if (r + 1, c) in position]
+    pairs = [pairs[i] for i in np.flatnonzero(rng.random(len(pairs)) < 0.7)]
+
+    # broken lines don't share substations, so their end points pair up uniquely
+    records = substations.to_dict("records")
+    used = set()
+    lines = []
+    for a, b in pairs:
+        sub_a = records[a]
+        sub_b = records[b]
+        member = bool(sub_a["member"] and sub_b["member"])
+        start = np.array([sub_a["x"], sub_a["y"]])
+        end = np.array([sub_b["x"], sub_b["y"]])
+        direction = (end - start) / np.linalg.norm(end - start)
+        normal = np.array([-direction[1], direction[0]])
+        path = [start + (end - start) * t + normal * rng.uniform(-500, 500) for t in (0.25, 0.5, 0.75)]
+        line = {"a": sub_a["id"], "b": sub_b["id"], "member": member,
+                "voltage": rng.choice(LINE_VOLTAGES), "defect": None}
+
+        roll = rng.random()
+        if not member:
+            # non-member lines carry no ids, and some end inside yards only
+            line["a"] = line["b"] = None
+            if roll < 0.3:
+                start = start + direction * 200
+                end = end - direction * 200
+                line["defect"] = "yard"
+        elif roll < 0.05 and a not in used and b not in used:
+            used.update([a, b])
+            gap = direction * 50
+            for piece in [[start, path[0], path[1] - gap], [path[1] + gap, path[2], end]]:
+                lines.append(dict(line, a=line["a"] if piece[0] is start else None,
+                                  b=line["b"] if piece[-1] is end else None,
+                                  path=piece, defect="broken"))
+            continue
+        elif roll < 0.10:
+            line["a"] = None
+            line["defect"] = "missing_id"
+        elif roll < 0.12:
+            line["b"] = substations["id"].values[rng.integers(len(substations))]
+            line["defect"] = "wrong_id"
+
+        lines.append(dict(line, path=[start] + path + [end]))
+
+    lines = pd.DataFrame(lines)
+    lines["id"] = [makeGlobalId(rng) for _ in range(lines.shape[0])]
+    lengths = [np.linalg.norm(np.diff(np.array(x), axis=0), axis=1).sum() / 1000 for x in lines["path"]]
+    lines["length_km"] = np.where(rng.random(lines.shape[0]) < 0.05, np.nan, lengths)
+    return lines
+
+
+def makeLineFeatures(lines, member):
+    """
+    make line features of members or non-members
+    """
+    features = []
+    for i, x in lines[lines["member"] == member].iterrows():
+        length = None if np.isnan(x["length_km"]) else x["length_km"]
+        miles = None if length is None else length / 1.609344
+        attributes = {"COMPANY_ID": "04110", "LENGTH_KM": length, "LINE_ID": "LINE{}".format(i),
+                      "MEMBER": int(member), "MILES": miles, "NAME": "Synthetic Co.",
+                      "SUBSTATION_A_GLOBALID": x["a"], "SUBSTATION_B_GLOBALID": x["b"],
+                      "SYM_CODE": "{:g}".format(x["voltage"]), "TO_LINE_NAME": None,
+                      "TRANSMISSION_LINE_GLOBALID": x["id"], "VOLTAGE": "{:g}".format(x["voltage"]),
+                      "SHAPE": "Polyline", "TRANSMISSION_LINE_KEY": 40000 + i, "ESRI_OID": i + 1}
+        paths = [[list(map(float, p)) for p in x["path"]]]
+        features.append(makeFeature(attributes, "esriGeometryPolyline", {"paths": paths}))
+    return features
+
+
+def makeTapFeatures(lines, rng):
+    """
+    make taps on interior vertices of member lines with both ids
+    """
+    candidates = lines[lines["member"] & lines["defect"].isnull()]
+    candidates = candidates.loc[rng.permutation(candidates.index)[:len(candidates) // 5]]
+    features = []
+    for i, (index, x) in enumerate(candidates.iterrows()):
+        point = x["path"][2]
+        attributes = {"FAC_ID": None, "MEMBER": 1, "NAME": 10000 + i, "STATE": "PA",
+                      "SUBSTATION_GLOBALID": makeGlobalId(rng), "SUBSTATION_TYPE": 1,
+                      "SYM_CODE": "Tap", "VOLTAGE": None, "COMMERCIAL_ZONE": None,
+                      "SHAPE": "Point", "SUBSTATION_KEY": 100000 + i, "ESRI_OID": i + 1}
+        features.append(makeFeature(attributes, "esriGeometryPoint", {"x": point[0], "y": point[1]}))
+    return features
+
+
+def makeEquipList(substations, lines, equipment_type):
+    """
+    make OASIS equiplist of member lines or transformers of member substations
+    """
+    stations = dict(zip(substations["id"], substations["name"].str.upper().str.replace(" ", "").str[:8]))
+    zones = dict(zip(substations["id"], substations["zone"].map(lambda x: ZONES[x][1])))
+    rows = []
+    if equipment_type == "LINE":
+        complete = lines[lines["member"] & lines["defect"].isnull()]
+        for i, x in complete.iterrows():
+            station_a = stations[x["a"]]
+            station_b = stations[x["b"]]
+            rows.append(["LINE", zones[x["a"]], zones[x["a"]], station_a, "{:g} KV".format(x["voltage"]),
+                         "{}-{}".format(station_a[:3], station_b[:3]),
+                         "{}-{} {:04d}".format(station_a, station_b, i)])
+    else:
+        for i, x in substations[substations["member"]].iterrows():
+            station = stations[x["id"]]
+            rows.append(["XFMR", zones[x["id"]], zones[x["id"]], station, "{:g} KV".format(x["voltage"]),
+                         "T1", "{} TRAN 1".format(station)])
+    return pd.DataFrame(rows, columns=["TYPE", "COMPANY", "ZONE", "STATION", "VOLTAGE", "NAME", "LONG NAME"])
+
+
+def makePnodeList(substations, rng):
+    """
+    make pnode list of member substations, as returned by the lmp bus model
+        before matching. some names are upper cased or lose a character.
+    """
+    members = substations[substations["member"]]
+    members = members.loc[rng.permutation(members.index)[:int(len(members) * 0.6)]]
+    names = []
+    for name in members["name"]:
+        name = name.replace(" ", "")
+        roll = rng.random()
+        if roll < 0.3:
+            name = name.upper()
+        elif roll < 0.4 and len(name) > 4:
+            k = rng.integers(1, len(name) - 1)
+            name = name[:k] + name[k + 1:]
+        names.append(name)
+    return pd.DataFrame({"pnode_id": [str(1000000 + i) for i in range(len(members))],
+                         "zone": members["zone"].map(lambda x: ZONES[x][1]).values,
+                         "substation": names,
+                         "voltage": members["voltage"].values,
+                         "equipment": "GEN",
+                         "type": "BUS"})
+
+
+def generateSystemMap(directory, scale=1, seed=0):
+    """
+    generate synthetic system map exports of a given scale in
+        directory/pjm_system_map_export and OASIS equiplists in directory/oasis.
+
+    return dictionary of the pnode list and the number of rows of each
+        generated layer.
+    """
+    rng = np.random.default_rng(seed)
+    export_directory = os.path.join(directory, "pjm_system_map_export")
+    oasis_directory = os.path.join(directory, "oasis")
+    for x in [export_directory, oasis_directory]:
+        if not os.path.exists(x):
+            os.makedirs(x)
+
+    substations = makeSubstations(scale, rng)
+    lines = makeLines(substations, rng)
+    labels = {True: "pjm_substation_labels", False: "non_pjm_substation_labels"}
+
+    layers = {"pjm_zones": makeZoneFeatures(substations),
+              "pjm_substations": makeSubstationFeatures(substations, True),
+              "non_pjm_substations": makeSubstationFeatures(substations, False),
+              "taps": makeTapFeatures(lines, rng),
+              "yards": makeYardFeatures(substations),
+              "pjm_backbone_lines": makeLineFeatures(lines, True),
+              "non_member_backbone_lines": makeLineFeatures(lines, False)}
+    for member, name in labels.items():
+        layers[name] = makeSubstationFeatures(substations, member)
+    for name, features in layers.items():
+        writeExport(export_directory, name, features)
+
+    counts = {name: len(features) for name, features in layers.items()}
+    for equipment_type in ["LINE", "XFMR"]:
+        equiplist = makeEquipList(substations, lines, equipment_type)
+        equiplist.to_csv(os.path.join(oasis_directory, "equiplist_{}.csv".format(equipment_type)),
+                         index=False, encoding="utf-8-sig")
+        counts["equiplist_{}".format(equipment_type)] = equiplist.shape[0]
+
+    pnode_list = makePnodeList(substations, rng)
+    counts["pnode_list"] = pnode_list.shape[0]
+    return {"pnode_list": pnode_list, "counts": counts}
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from json_reader import readExports
+from synthetic import generateSystemMap
+
+
+class SyntheticTest(unittest.TestCase):
+
+    def testGenerateSystemMap(self):
+        with tempfile.TemporaryDirectory() as directory:
+            generated = generateSystemMap(directory, scale=1, seed=1)
+            counts = generated["counts"]
+            export_directory = os.path.join(directory, "pjm_system_map_export")
+
+            substations = readExports([os.path.join(export_directory, x + ".json")
+                                       for x in ["pjm_substations", "non_pjm_substations"]])
+            self.assertEqual(substations.shape[0], 100)
+            self.assertEqual(substations["SUBSTATION_GLOBALID"].nunique(), 100)
+            self.assertTrue((substations.geom_type == "Point").all())
+
+            lines = readExports([os.path.join(export_directory, "pjm_backbone_lines.json")])
+            self.assertEqual(lines.shape[0], counts["pjm_backbone_lines"])
+            self.assertTrue((lines.geom_type == "LineString").all())
+            # some member lines miss a substation, non-member lines miss all
+            self.assertTrue((lines["SUBSTATION_A_GLOBALID"] == "Null").any())
+            non_member = readExports([os.path.join(export_directory, "non_member_backbone_lines.json")])
+            self.assertTrue((non_member["SUBSTATION_A_GLOBALID"] == "Null").all())
+
+            zones = readExports([os.path.join(export_directory, "pjm_zones.json")])
+            self.assertEqual(zones.shape[0], 21)
+            self.assertTrue(zones.unary_union.contains(substations.unary_union))
+
+            equiplist = pd.read_csv(os.path.join(directory, "oasis", "equiplist_LINE.csv"), encoding="utf-8-sig")
+            self.assertEqual(list(equiplist.columns), ["TYPE", "COMPANY", "ZONE", "STATION", "VOLTAGE", "NAME", "LONG NAME"])
+            self.assertEqual(equiplist.shape[0], counts["equiplist_LINE"])
+
+            pnode_list = generated["pnode_list"]
+            self.assertEqual(list(pnode_list.columns), ["pnode_id", "zone", "substation", "voltage", "equipment", "type"])
+            self.assertTrue(pnode_list["zone"].isin(zones["PLANNING_ZONE_NAME"]).all())
+
+    def testDeterministic(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = generateSystemMap(os.path.join(directory, "first"), scale=1, seed=2)
+            second = generateSystemMap(os.path.join(directory, "second"), scale=1, seed=2)
+            self.assertEqual(first["counts"], second["counts"])
+            self.assertTrue(first["pnode_list"].equals(second["pnode_list"]))
+            for name in ["pjm_backbone_lines.json", "taps.json"]:
+                contents = [open(os.path.join(directory, x, "pjm_system_map_export", name)).read()
+                            for x in ["first", "second"]]
+                self.assertEqual(contents[0], contents[1])
+
+    def testScale(self):
+        with tempfile.TemporaryDirectory() as directory:
+            counts = generateSystemMap(directory, scale=4)["counts"]
+            self.assertEqual(counts["yards"], 400)
+            self.assertEqual(counts["pjm_substations"] + counts["non_pjm_substations"], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,310 @@
+"""
+Precomputed topology of a network for islanding checks of outages.
+
+One iterative Tarjan DFS over the network finds its bridges, articulation
+points and biconnected blocks, so whether the outage of a single line or
+substation islands part of the grid is a lookup instead of a connected
+components search.
+
+For outages of several lines, every line gets a random 64 bit label from
+the same DFS: lines off the DFS tree get random labels, and a tree line
+gets the XOR of the labels of the off-tree lines whose cycles pass through
+it. A set of lines is an edge cut exactly when the XOR of its labels is
+zero, barring a 2^-64 chance per subset. Removing a set of lines thus
+islands part of the grid if and only if some of their labels are linearly
+dependent over GF(2), which IslandingCheck tests line by line with an XOR
+basis. Bridges are the lines with label zero.
+
+Parallel lines are separate edges, so a pair of parallel lines is not a
+bridge. Self loops never island anything and are in no block.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+
+class Topology:
+    """
+    bridges, articulation points, blocks and cut labels of an undirected
+        multigraph of edges between vertices u and v, e.g. lines between
+        substations A and B.
+
+    vertices and edge_ids are Indexes of the vertices and edges, and arrays
+        of edge or vertex attributes are in their order.
+    """
+
+    def __init__(self, u, v, edge_ids=None, seed=0):
+        u = pd.Series(u, dtype=object).values
+        v = pd.Series(v, dtype=object).values
+        if pd.isnull(u).any() or pd.isnull(v).any():
+            raise(ValueError("Edges must have both vertices"))
+        codes, self.vertices = pd.factorize(np.concatenate([u, v]))
+        self.vertices = pd.Index(self.vertices, dtype=object)
+        self.u, self.v = codes[:len(u)], codes[len(u):]
+        self.edge_ids = pd.Index(edge_ids if edge_ids is not None else np.arange(len(u)))
+        if len(self.edge_ids) != len(u):
+            raise(ValueError("Got {} edge ids for {} edges".format(len(self.edge_ids), len(u))))
+        if not self.edge_ids.is_unique:
+            raise(ValueError("Edge ids must be unique"))
+
+        self.buildAdjacency()
+        self.search()
+        self.labelEdges(seed)
+
+
+    def buildAdjacency(self):
+        """
+        build CSR adjacency of vertices to neighbors and edge positions,
+            without self loops
+        """
+        n = len(self.vertices)
+        edges = np.flatnonzero(self.u != self.v)
+        heads = np.concatenate([self.u[edges], self.v[edges]])
+        order = np.argsort(heads, kind="stable")
+        self.neighbors = np.concatenate([self.v[edges], self.u[edges]])[order]
+        self.adjacent_edges = np.concatenate([edges, edges])[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(heads, minlength=n))])
+
+
+    def search(self):
+        """
+        iterative Tarjan DFS, setting discovery order, low links, DFS tree,
+            subtree sizes, components, bridges, articulation points and
+            blocks of edges.
+        """
+        # python lists, the loop indexes them one element at a time
+        n, m = len(self.vertices), len(self.edge_ids)
+        disc, low, parent, parent_edge = [-1] * n, [0] * n, [-1] * n, [-1] * n
+        size, children, component, articulation = [1] * n, [0] * n, [-1] * n, [False] * n
+        bridge, block, tree = [False] * m, [-1] * m, [False] * m
+        neighbors, adjacent_edges = self.neighbors.tolist(), self.adjacent_edges.tolist()
+        end = self.indptr[1:].tolist()
+        pointer = self.indptr[:-1].tolist()
+        preorder = []
+        time, blocks = 0, 0
+
+        for root in range(n):
+            if disc[root] >= 0:
+                continue
+            disc[root] = low[root] = time
+            time += 1
+            component[root] = root
+            preorder.append(root)
+            stack, edge_stack = [root], []
+            while stack:
+                x = stack[-1]
+                if pointer[x] < end[x]:
+                    y, e = neighbors[pointer[x]], adjacent_edges[pointer[x]]
+                    pointer[x] += 1
+                    if e == parent_edge[x]:
+                        continue
+                    if disc[y] < 0:
+                        # tree edge
+                        disc[y] = low[y] = time
+                        time += 1
+                        parent[y], parent_edge[y], component[y] = x, e, root
+                        tree[e] = True
+                        preorder.append(y)
+                        edge_stack.append(e)
+                        stack.append(y)
+                    elif disc[y] < disc[x]:
+                        # back edge to an ancestor, seen once from below
+                        low[x] = min(low[x], disc[y])
+                        edge_stack.append(e)
+                    continue
+
+                stack.pop()
+                if not stack:
+                    articulation[x] = children[x] > 1
+                    continue
+                p = stack[-1]
+                low[p] = min(low[p], low[x])
+                size[p] += size[x]
+                children[p] += 1
+                if low[x] > disc[p]:
+                    bridge[parent_edge[x]] = True
+                if low[x] >= disc[p]:
+                    # p separates the subtree of x, whose edges form a block
+                    if p != root:
+                        articulation[p] = True
+                    while True:
+                        e = edge_stack.pop()
+                        block[e] = blocks
+                        if e == parent_edge[x]:
+                            break
+                    blocks += 1
+
+        self.disc, self.low = np.array(disc, dtype=np.int64), np.array(low, dtype=np.int64)
+        self.parent, self.parent_edge = np.array(parent, dtype=np.int64), np.array(parent_edge, dtype=np.int64)
+        self.subtree_size = np.array(size, dtype=np.int64)
+        self.component = pd.factorize(np.array(component, dtype=np.int64))[0]
+        self.tree, self.bridge = np.array(tree, dtype=bool), np.array(bridge, dtype=bool)
+        self.articulation, self.block = np.array(articulation, dtype=bool), np.array(block, dtype=np.int64)
+        self.preorder = np.array(preorder, dtype=np.int64)
+
+
+    def labelEdges(self, seed=0):
+        """
+        set random cut labels of edges, see module docstring
+        """
+        m = len(self.edge_ids)
+        rng = np.random.default_rng(seed)
+        labels = np.zeros(m, dtype=np.uint64)
+        off_tree = ~self.tree
+        labels[off_tree] = rng.integers(1, np.iinfo(np.uint64).max, size=int(off_tree.sum()), dtype=np.uint64,
+                                        endpoint=True)
+
+        # XOR of labels of off-tree edges at each vertex, self loops cancel out
+        accumulated = np.zeros(len(self.vertices), dtype=np.uint64)
+        np.bitwise_xor.at(accumulated, self.u[off_tree], labels[off_tree])
+        np.bitwise_xor.at(accumulated, self.v[off_tree], labels[off_tree])
+
+        # a tree edge has the XOR over the subtree below it, children first
+        accumulated = [int(x) for x in accumulated]
+        parent, parent_edge = self.parent.tolist(), self.parent_edge.tolist()
+        tree_labels = {}
+        for x in self.preorder[::-1].tolist():
+            if parent[x] >= 0:
+                tree_labels[parent_edge[x]] = accumulated[x]
+                accumulated[parent[x]] ^= accumulated[x]
+        labels[list(tree_labels)] = np.array(list(tree_labels.values()), dtype=np.uint64)
+        self.labels = labels
+
+
+    def getEdgePositions(self, edges):
+        """
+        get positions of edge ids, raise ValueError for unknown ones
+        """
+        positions = self.edge_ids.get_indexer(pd.Index(list(edges)))
+        if (positions < 0).any():
+            raise(ValueError("Unknown edges: {}".format(list(pd.Index(list(edges))[positions < 0][:5]))))
+        return positions
+
+
+    def isBridge(self, edge):
+        """
+        whether the outage of edge islands part of the network
+        """
+        return bool(self.bridge[self.edge_ids.get_loc(edge)])
+
+
+    def isArticulationPoint(self, vertex):
+        """
+        whether the outage of vertex with its edges islands other vertices
+        """
+        return bool(self.articulation[self.vertices.get_loc(vertex)])
+
+
+    def getBridges(self):
+        return self.edge_ids[self.bridge]
+
+
+    def getArticulationPoints(self):
+        return self.vertices[self.articulation]
+
+
+    def getBlocks(self):
+        """
+        get Series of the biconnected block of each edge, -1 for self loops
+        """
+        return pd.Series(self.block, index=self.edge_ids, name="block")
+
+
+    def getIsland(self, edge):
+        """
+        get vertices cut off by the outage of a bridge, on the side away from
+            the root of its DFS tree. empty if edge is not a bridge.
+        """
+        position = self.edge_ids.get_loc(edge)
+        if not self.bridge[position]:
+            return self.vertices[:0]
+        child = self.u[position] if self.parent_edge[self.u[position]] == position else self.v[position]
+        start = self.disc[child]
+        return self.vertices[self.preorder[start:start + self.subtree_size[child]]]
+
+
+    def isIslanding(self, edges):
+        """
+        whether the outage of all of edges islands part of the network
+        """
+        edges = list(edges)
+        if len(edges) == 1:
+            return self.isBridge(edges[0])
+        check = IslandingCheck(self)
+        for edge in edges:
+            if check.add(edge):
+                return True
+        return False
+
+
+    def screenOutages(self, outages):
+        """
+        get boolean array of whether each outage, a list of edges, islands
+            part of the network
+        """
+        return np.array([self.isIslanding(x) for x in outages], dtype=bool)
+
+
+    def getIslands(self, edges):
+        """
+        get vertices islanded by the outage of edges: every part of a split
+            component except its largest one.
+
+        return list of Indexes of vertices, largest first.
+        """
+        removed = np.zeros(len(self.edge_ids), dtype=bool)
+        removed[self.getEdgePositions(edges)] = True
+        n = len(self.vertices)
+        graph = sparse.csr_matrix((np.ones(int((~removed).sum())), (self.u[~removed], self.v[~removed])), shape=(n, n))
+        labels = connected_components(graph, directed=False)[1]
+
+        parts = pd.DataFrame({"component": self.component, "part": labels})
+        sizes = parts.groupby(["component", "part"]).size().sort_values(ascending=False, kind="mergesort")
+        islands = sizes[sizes.index.get_level_values("component").duplicated(keep="first")]
+        return [self.vertices[labels == part] for component, part in islands.index]
+
+
+class IslandingCheck:
+    """
+    incremental islanding check of a growing set of outaged edges, see
+        module docstring. copy a check to branch off outage sets that share
+        edges, e.g. N-1-1 outages.
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.basis = []
+        self.edges = set()
+        self.islanding = False
+
+
+    def add(self, edge):
+        """
+        add the outage of edge, return whether the outages island part of
+            the network
+        """
+        position = self.topology.edge_ids.get_loc(edge)
+        if self.islanding or position in self.edges:
+            return self.islanding
+        self.edges.add(position)
+
+        # reduce by the basis, kept in descending order with distinct top bits
+        label = int(self.topology.labels[position])
+        for element in self.basis:
+            label = min(label, label ^ element)
+        if label == 0:
+            self.islanding = True
+        else:
+            self.basis.append(label)
+            self.basis.sort(reverse=True)
+        return self.islanding
+
+
+    def copy(self):
+        check = IslandingCheck(self.topology)
+        check.basis = list(self.basis)
+        check.edges = set(self.edges)
+        check.islanding = self.islanding
+        return check
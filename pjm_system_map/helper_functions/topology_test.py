@@ -0,0 +1,91 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from topology import Topology, IslandingCheck
+
+
+class TopologyTest(unittest.TestCase):
+
+    def setUp(self):
+        # triangle a-b-c, bridge c-d, square d-e-f-g with parallel lines e-f, spur g-h
+        edges = [("ab", "a", "b"), ("bc", "b", "c"), ("ca", "c", "a"), ("cd", "c", "d"),
+                 ("de", "d", "e"), ("ef1", "e", "f"), ("ef2", "e", "f"), ("fg", "f", "g"),
+                 ("gd", "g", "d"), ("gh", "g", "h"), ("xy", "x", "y"), ("xx", "x", "x")]
+        self.ids = [x[0] for x in edges]
+        self.topology = Topology([x[1] for x in edges], [x[2] for x in edges], self.ids)
+
+    def testBridges(self):
+        self.assertEqual(sorted(self.topology.getBridges()), ["cd", "gh", "xy"])
+        self.assertTrue(self.topology.isBridge("cd"))
+        self.assertFalse(self.topology.isBridge("ef1"))
+        self.assertFalse(self.topology.isBridge("xx"))
+
+    def testArticulationPoints(self):
+        self.assertEqual(sorted(self.topology.getArticulationPoints()), ["c", "d", "g"])
+        self.assertFalse(self.topology.isArticulationPoint("x"))
+
+    def testBlocks(self):
+        blocks = self.topology.getBlocks()
+        self.assertEqual(len(set(blocks[["ab", "bc", "ca"]])), 1)
+        self.assertEqual(len(set(blocks[["de", "ef1", "ef2", "fg", "gd"]])), 1)
+        self.assertNotEqual(blocks["ab"], blocks["de"])
+        self.assertEqual(blocks["xx"], -1)
+
+    def testIsland(self):
+        self.assertEqual(sorted(self.topology.getIsland("gh")), ["h"])
+        island = sorted(self.topology.getIsland("cd"))
+        self.assertIn(island, [["a", "b", "c"], ["d", "e", "f", "g", "h"]])
+        self.assertEqual(len(self.topology.getIsland("ab")), 0)
+
+    def testMultipleOutages(self):
+        self.assertFalse(self.topology.isIslanding(["ef1", "ab"]))
+        self.assertFalse(self.topology.isIslanding(["ef1", "fg"]))
+        # e is still reached through d
+        self.assertFalse(self.topology.isIslanding(["ef1", "ef2"]))
+        self.assertTrue(self.topology.isIslanding(["ab", "ca"]))
+        self.assertTrue(self.topology.isIslanding(["de", "ef1", "ef2"]))
+        self.assertEqual(list(self.topology.screenOutages([["ab"], ["gh"], ["fg", "gd"]])), [False, True, True])
+        islands = self.topology.getIslands(["fg", "gd"])
+        self.assertEqual([sorted(x) for x in islands], [["g", "h"]])
+        with self.assertRaises(ValueError):
+            self.topology.getIslands(["zz"])
+
+    def testIncremental(self):
+        check = IslandingCheck(self.topology)
+        self.assertFalse(check.add("de"))
+        self.assertFalse(check.add("de"))
+        branch = check.copy()
+        self.assertFalse(check.add("ef1"))
+        self.assertTrue(check.add("ef2"))
+        self.assertTrue(check.islanding)
+        self.assertFalse(branch.islanding)
+        self.assertTrue(branch.add("gd"))
+
+    def testAgainstSearch(self):
+        # every outage of up to three edges of a random multigraph
+        rng = np.random.default_rng(0)
+        u, v = rng.integers(0, 8, 16), rng.integers(0, 8, 16)
+        topology = Topology(u, v)
+
+        def components(removed):
+            parent = list(range(8))
+
+            def find(x):
+                while parent[x] != x:
+                    x = parent[x]
+                return x
+            for i in range(len(u)):
+                if i not in removed:
+                    parent[find(u[i])] = find(v[i])
+            return len(set(find(x) for x in set(u) | set(v)))
+
+        base = components(set())
+        for k in [1, 2, 3]:
+            for outage in itertools.combinations(range(len(u)), k):
+                self.assertEqual(topology.isIslanding(list(outage)), components(set(outage)) > base, outage)
+
+
+if __name__ == "__main__":
+    unittest.main()
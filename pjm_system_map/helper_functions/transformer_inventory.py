@@ -0,0 +1,222 @@
+"""
+Transformer inventory from the OASIS XFMR equipment list.
+
+The equipment list has one row per transformer winding. Windings of
+three-winding units are suffixed with -P, -S and -T (primary, secondary
+and tertiary); two-winding units are listed once at their high side. The
+functions below group windings into transformers, join ratings in bulk and
+emit rows that can be added to a PyPSA network as Transformer components.
+
+The exported network has one bus per substation, which lines of all
+voltages attach to. Voltage levels that transformers tie to that bus are
+split off into buses of their own and lines at those levels are re-pointed
+to them, see tieVoltageLevels.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+
+# default electrical parameters in per unit on s_nom base
+DEFAULT_X = 0.1
+DEFAULT_R = 0.005
+# rating assumed when no rating can be found
+DEFAULT_S_NOM = 2000.0
+
+# planning zone of OASIS equiplist zones, zones outside PJM are left out
+EQUIPLIST_ZONES = {"AE": "AEC", "AEP-AP": "AEP", "AEP-IM": "AEP", "AEP-KY": "AEP", "AEP-OH": "AEP",
+                   "APSS": "APS", "BC": "BGE", "COMED": "ComEd", "DAYTON": "Dayton", "DEOK": "DEOK",
+                   "DOM-C": "Dominion", "DOM-E": "Dominion", "DOM-N": "Dominion", "DOM-S": "Dominion",
+                   "DOM-W": "Dominion", "DPL": "DPL", "DUQU": "DL", "EKPC": "EKPC", "FE": "ATSI",
+                   "FECL": "ATSI", "FEOE": "ATSI", "FEPA": "ATSI", "JC-N": "JCPL", "JC-S": "JCPL", "ME": "ME",
+                   "OVEC": "OVEC HQ", "PE": "PECO", "PEP": "PEPCO", "PL-N": "PPL", "PL-S": "PPL",
+                   "PN": "PENELEC", "PS-N": "PSEG", "PS-S": "PSEG", "RECO": "RE",
+                   "SMECO": "PEPCO", "UGI": "PPL"}
+
+
+def normalizeDescription(description):
+    """
+    collapse white space so equiplist LONG NAME and rating descriptions can be joined.
+    """
+    return description.astype(str).str.upper().str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def parseTransformerWindings(xfmr_equiplist):
+    """
+    split equiplist XFMR entries into transformer name and winding.
+    """
+    windings = xfmr_equiplist.copy()
+    names = windings["NAME"].astype(str).str.strip()
+    parsed = names.str.extract(r"^(.+)-([PST])$")
+    windings["transformer_name"] = parsed[0].fillna(names)
+    windings["winding"] = parsed[1]
+    windings["description"] = normalizeDescription(windings["LONG NAME"])
+    return windings
+
+
+def joinWindingRatings(windings, ratings):
+    """
+    join winding ratings in bulk on normalized description.
+
+    ratings are averaged over conditions, as is done for line ratings.
+    """
+    if ratings is None:
+        windings["rating"] = np.nan
+        return windings
+
+    ratings = ratings.copy()
+    ratings["description"] = normalizeDescription(ratings["description"])
+    ratings = ratings.groupby("description")["day_normal"].mean().rename("rating")
+    return windings.merge(ratings, how="left", left_on="description", right_index=True)
+
+
+def getTransformerInventory(xfmr_equiplist, line_equiplist, ratings=None):
+    """
+    get one row per transformer with high and low side voltage and rating.
+
+    three-winding units take their highest and lowest winding voltage.
+    two-winding units listed only at the high side take the highest line
+        voltage below it at the same station as low side. units whose low
+        side cannot be found are dropped.
+    """
+    keys = ["COMPANY", "ZONE", "STATION", "transformer_name"]
+
+    windings = parseTransformerWindings(xfmr_equiplist)
+    windings = joinWindingRatings(windings, ratings)
+
+    inventory = windings.groupby(keys).agg(
+                    v_nom0=("VOLTAGE", "max"),
+                    v_nom1=("VOLTAGE", "min"),
+                    windings=("VOLTAGE", "size"),
+                    s_nom=("rating", "max"),
+                    description=("description", "first")).reset_index()
+
+    # find low side for units listed at high side only, at the same station
+    # of the same zone, as station names repeat across zones
+    single = inventory["v_nom0"] == inventory["v_nom1"]
+    station_voltages = pd.concat([line_equiplist[["ZONE", "STATION", "VOLTAGE"]],
+                                  xfmr_equiplist[["ZONE", "STATION", "VOLTAGE"]]]).drop_duplicates()
+    candidates = inventory.loc[single, keys + ["v_nom0"]].merge(station_voltages, on=["ZONE", "STATION"])
+    candidates = candidates[candidates["VOLTAGE"] < candidates["v_nom0"]]
+    low_side = candidates.groupby(keys)["VOLTAGE"].max().rename("low_side")
+    inventory = inventory.merge(low_side, how="left", left_on=keys, right_index=True)
+    inventory.loc[single, "v_nom1"] = inventory.loc[single, "low_side"]
+    inventory = inventory.drop(columns=["low_side"])
+    inventory = inventory.dropna(subset=["v_nom1"])
+    inventory = inventory[inventory["v_nom1"] > 0]
+
+    # stable transformer id
+    inventory["name"] = ("XFMR:" + inventory["COMPANY"].astype(str) + ":" +
+                         inventory["STATION"].astype(str).str.strip() + ":" +
+                         inventory["transformer_name"].astype(str))
+
+    return inventory.reset_index(drop=True)
+
+
+def busName(buses, voltages, bus_voltages):
+    """
+    bus name of a substation at a voltage level. the exported bus of a
+        substation, named by its SUBSTATION_KEY, is at the substation voltage;
+        other voltage levels are named e.g. "69759_138".
+    """
+    buses = pd.Series(buses).astype(str).reset_index(drop=True)
+    voltages = pd.Series(voltages).reset_index(drop=True)
+    levels = buses + "_" + voltages.map(lambda x: "{:g}".format(x))
+    return levels.where(~np.isclose(voltages.values, pd.Series(bus_voltages).values.astype(float)), buses).values
+
+
+def makePyPSATransformers(inventory, station_substations, substation_buses, s_nom_default=DEFAULT_S_NOM):
+    """
+    make PyPSA transformer rows from inventory.
+
+    station_substations maps equiplist stations to SUBSTATION_GLOBALID with
+        columns zone, STATION and SUBSTATION_GLOBALID, where zone is the
+        planning zone. stations are joined by zone and name; transformers at
+        stations without a map substation, or with several, are dropped.
+    substation_buses has the exported bus of each substation with columns
+        SUBSTATION_GLOBALID, bus and VOLTAGE, see busName.
+    """
+    inventory = inventory.assign(zone=inventory["ZONE"].map(EQUIPLIST_ZONES))
+    station_substations = station_substations.dropna().drop_duplicates()
+    station_substations = station_substations[~station_substations.duplicated(subset=["zone", "STATION"], keep=False)]
+    transformers = inventory.merge(station_substations, how="inner", on=["zone", "STATION"])
+    transformers = transformers.merge(substation_buses[["SUBSTATION_GLOBALID", "bus", "VOLTAGE"]],
+                                      how="inner", on="SUBSTATION_GLOBALID")
+
+    transformers["bus"] = transformers["bus"].astype(str)
+    transformers["bus0"] = busName(transformers["bus"], transformers["v_nom0"], transformers["VOLTAGE"])
+    transformers["bus1"] = busName(transformers["bus"], transformers["v_nom1"], transformers["VOLTAGE"])
+    transformers["rating_filled"] = transformers["s_nom"].isnull()
+    transformers["s_nom"] = transformers["s_nom"].fillna(s_nom_default)
+    transformers["x"] = DEFAULT_X
+    transformers["r"] = DEFAULT_R
+
+    columns = ["name", "bus0", "bus1", "s_nom", "x", "r", "v_nom0", "v_nom1", "bus",
+               "SUBSTATION_GLOBALID", "STATION", "COMPANY", "ZONE", "windings", "rating_filled"]
+    return transformers[columns].set_index("name")
+
+
+def tieVoltageLevels(transformers, lines, bus_voltages):
+    """
+    split exported buses by voltage where transformers tie the levels
+        together.
+
+    lines have columns bus0 and bus1, the exported buses of the substations
+        at their ends, and VOLTAGE. bus_voltages is a Series of the voltage
+        of each exported bus. a voltage level of a substation that carries
+        lines gets a bus of its own, see busName, if transformers between
+        levels that carry lines connect it to the exported bus of the
+        substation, directly or through other levels. other transformers are
+        dropped, and lines at other levels stay at the exported bus, so no
+        level is cut off from its substation.
+
+    return transformers and lines with bus0 and bus1 at their voltage level.
+    """
+    lines = lines.copy()
+    bus_voltages = pd.Series(bus_voltages.values, index=bus_voltages.index.astype(str))
+    levels = {}
+    for end in ["bus0", "bus1"]:
+        buses = lines[end].astype(str)
+        levels[end] = pd.Series(busName(buses, lines["VOLTAGE"], buses.map(bus_voltages)), index=lines.index)
+
+    # transformers between levels that carry lines or the exported bus
+    carrying = pd.concat([levels["bus0"], levels["bus1"], transformers["bus"]])
+    transformers = transformers[transformers["bus0"].isin(carrying) & transformers["bus1"].isin(carrying) &
+                                (transformers["bus0"] != transformers["bus1"])]
+
+    # keep transformers connected to the exported bus of their substation
+    nodes = pd.Index(pd.concat([transformers["bus"], transformers["bus0"], transformers["bus1"]]).unique())
+    graph = sparse.coo_matrix((np.ones(transformers.shape[0]), (nodes.get_indexer(transformers["bus0"]),
+                                                                nodes.get_indexer(transformers["bus1"]))),
+                              shape=(len(nodes), len(nodes)))
+    components = connected_components(graph, directed=False)[1]
+    tied = components[nodes.get_indexer(transformers["bus0"])] == components[nodes.get_indexer(transformers["bus"])]
+    transformers = transformers[tied]
+
+    split = pd.concat([transformers["bus0"], transformers["bus1"]])
+    for end in ["bus0", "bus1"]:
+        lines[end] = lines[end].astype(str).where(~levels[end].isin(split), levels[end])
+    return transformers, lines
+
+
+def makePyPSATransformerBuses(transformers, buses):
+    """
+    attach transformers to exported PyPSA buses.
+
+    buses are the exported buses with columns name and voltage. transformer
+        ends at other voltage levels get new buses that copy the other
+        columns of the exported bus of their substation. transformers at
+        substations that are not exported, e.g. off the backbone, are dropped.
+
+    return transformers and new buses.
+    """
+    transformers = transformers[transformers["bus"].isin(buses["name"].astype(str))]
+    ends = pd.concat([transformers[["bus0", "v_nom0", "bus"]].set_axis(["name", "voltage", "bus"], axis=1),
+                      transformers[["bus1", "v_nom1", "bus"]].set_axis(["name", "voltage", "bus"], axis=1)])
+    ends = ends[~ends["name"].isin(buses["name"].astype(str))].drop_duplicates(subset=["name"])
+
+    parents = buses.assign(bus=buses["name"].astype(str)).drop(columns=["name", "voltage"])
+    new_buses = ends.merge(parents, how="inner", on="bus")
+    return transformers, new_buses[list(buses.columns)].reset_index(drop=True)
@@ -0,0 +1,103 @@
+import unittest
+
+import pandas as pd
+
+from transformer_inventory import (getTransformerInventory, makePyPSATransformers, makePyPSATransformerBuses,
+                                   tieVoltageLevels)
+
+
+class TransformerInventoryTest(unittest.TestCase):
+
+    def setUp(self):
+        # ALPHA is a station name in two zones
+        self.xfmr_equiplist = pd.DataFrame({
+            "COMPANY": ["AE", "PN", "AE", "AE", "AE", "AE"],
+            "ZONE": ["AE", "PN", "AE", "AE", "AE", "AE"],
+            "STATION": ["ALPHA", "ALPHA", "BETA", "BETA", "BETA", "GAMMA"],
+            "NAME": ["T1", "T9", "T2-P", "T2-S", "T2-T", "T3"],
+            "LONG NAME": ["ALPHA  T1", "ALPHA T9", "BETA T2-P", "BETA T2-S", "BETA T2-T", "GAMMA T3"],
+            "VOLTAGE": [230.0, 345.0, 500.0, 230.0, 13.0, 69.0]})
+        self.line_equiplist = pd.DataFrame({
+            "ZONE": ["AE", "AE", "PN", "PN", "AE"],
+            "STATION": ["ALPHA", "ALPHA", "ALPHA", "ALPHA", "GAMMA"],
+            "VOLTAGE": [230.0, 138.0, 345.0, 115.0, 69.0]})
+        self.ratings = pd.DataFrame({"description": ["alpha t1", "ALPHA T1"], "day_normal": [300.0, 400.0]})
+        self.station_substations = pd.DataFrame({"zone": ["AEC", "PENELEC", "AEC", "AEC"],
+                                                 "STATION": ["ALPHA", "ALPHA", "BETA", "BETA"],
+                                                 "SUBSTATION_GLOBALID": ["S1", "S2", "S3", "S3"]})
+        self.substation_buses = pd.DataFrame({"SUBSTATION_GLOBALID": ["S1", "S2", "S3"],
+                                              "bus": [101, 102, 103], "VOLTAGE": [230.0, 345.0, 500.0]})
+
+    def getInventory(self):
+        inventory = getTransformerInventory(self.xfmr_equiplist, self.line_equiplist, self.ratings)
+        return inventory.set_index("name")
+
+    def testInventory(self):
+        inventory = self.getInventory()
+        self.assertEqual(sorted(inventory.index), ["XFMR:AE:ALPHA:T1", "XFMR:AE:BETA:T2", "XFMR:PN:ALPHA:T9"])
+        self.assertEqual(inventory.loc["XFMR:AE:BETA:T2", "windings"], 3)
+        self.assertEqual(list(inventory.loc["XFMR:AE:BETA:T2", ["v_nom0", "v_nom1"]]), [500.0, 13.0])
+        self.assertEqual(inventory.loc["XFMR:AE:ALPHA:T1", "s_nom"], 350.0)
+        self.assertTrue(pd.isnull(inventory.loc["XFMR:AE:BETA:T2", "s_nom"]))
+
+    def testLowSide(self):
+        # the low side is looked up at the station of the same zone only
+        inventory = self.getInventory()
+        self.assertEqual(inventory.loc["XFMR:AE:ALPHA:T1", "v_nom1"], 138.0)
+        self.assertEqual(inventory.loc["XFMR:PN:ALPHA:T9", "v_nom1"], 115.0)
+        # GAMMA has no voltage below its unit
+        self.assertNotIn("XFMR:AE:GAMMA:T3", inventory.index)
+
+    def testPyPSATransformers(self):
+        inventory = getTransformerInventory(self.xfmr_equiplist, self.line_equiplist, self.ratings)
+        transformers = makePyPSATransformers(inventory, self.station_substations, self.substation_buses,
+                                             s_nom_default=1000.0)
+        self.assertEqual(transformers.loc["XFMR:AE:ALPHA:T1", "SUBSTATION_GLOBALID"], "S1")
+        self.assertEqual(transformers.loc["XFMR:PN:ALPHA:T9", "SUBSTATION_GLOBALID"], "S2")
+        self.assertEqual(list(transformers.loc["XFMR:AE:ALPHA:T1", ["bus0", "bus1"]]), ["101", "101_138"])
+        self.assertEqual(list(transformers.loc["XFMR:PN:ALPHA:T9", ["bus0", "bus1"]]), ["102", "102_115"])
+        self.assertEqual(list(transformers.loc["XFMR:AE:BETA:T2", ["bus0", "bus1"]]), ["103", "103_13"])
+        self.assertEqual(transformers.loc["XFMR:AE:BETA:T2", "s_nom"], 1000.0)
+        self.assertTrue(transformers.loc["XFMR:AE:BETA:T2", "rating_filled"])
+        self.assertFalse(transformers.loc["XFMR:AE:ALPHA:T1", "rating_filled"])
+
+    def testAmbiguousStation(self):
+        station_substations = pd.concat([self.station_substations,
+                                         pd.DataFrame({"zone": ["AEC"], "STATION": ["ALPHA"],
+                                                       "SUBSTATION_GLOBALID": ["S4"]})])
+        inventory = getTransformerInventory(self.xfmr_equiplist, self.line_equiplist, self.ratings)
+        transformers = makePyPSATransformers(inventory, station_substations, self.substation_buses)
+        self.assertEqual(sorted(transformers.index), ["XFMR:AE:BETA:T2", "XFMR:PN:ALPHA:T9"])
+
+    def testPyPSABuses(self):
+        inventory = getTransformerInventory(self.xfmr_equiplist, self.line_equiplist, self.ratings)
+        transformers = makePyPSATransformers(inventory, self.station_substations, self.substation_buses)
+        # BETA is not exported
+        buses = pd.DataFrame({"name": [101, 102], "voltage": [230.0, 345.0], "x": [1.0, 2.0]})
+        transformers, new_buses = makePyPSATransformerBuses(transformers, buses)
+        self.assertEqual(sorted(transformers.index), ["XFMR:AE:ALPHA:T1", "XFMR:PN:ALPHA:T9"])
+        self.assertEqual(list(new_buses.columns), ["name", "voltage", "x"])
+        self.assertEqual(sorted(new_buses["name"]), ["101_138", "102_115"])
+        self.assertEqual(new_buses.set_index("name").loc["102_115", "x"], 2.0)
+
+    def testTieVoltageLevels(self):
+        # K1 is at 500 kV with lines at 500, 230 and 138 kV. K2 is at 345 kV
+        # and its 230/138 kV unit is not tied to 345 kV.
+        transformers = pd.DataFrame({"bus": ["K1", "K1", "K1", "K2"],
+                                     "bus0": ["K1", "K1_230", "K1", "K2_230"],
+                                     "bus1": ["K1_230", "K1_138", "K1_69", "K2_138"]},
+                                    index=["T1", "T2", "T3", "T4"])
+        lines = pd.DataFrame({"bus0": ["K1", "K1", "K1", "K2"], "bus1": ["K3", "K2", "K3", "K3"],
+                              "VOLTAGE": [500.0, 230.0, 138.0, 138.0]}, index=["L1", "L2", "L3", "L4"])
+        bus_voltages = pd.Series([500.0, 345.0, 138.0], index=["K1", "K2", "K3"])
+        transformers, lines = tieVoltageLevels(transformers, lines, bus_voltages)
+        # there are no lines at 69 kV
+        self.assertEqual(list(transformers.index), ["T1", "T2"])
+        self.assertEqual(lines.loc["L1"].tolist(), ["K1", "K3", 500.0])
+        self.assertEqual(lines.loc["L2"].tolist(), ["K1_230", "K2", 230.0])
+        self.assertEqual(lines.loc["L3"].tolist(), ["K1_138", "K3", 138.0])
+        self.assertEqual(lines.loc["L4"].tolist(), ["K2", "K3", 138.0])
+
+
+if __name__ == "__main__":
+    unittest.main()